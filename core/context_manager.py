@@ -88,6 +88,9 @@ class ContextManager:
         self.total_messages_summarized = 0
         self.total_tokens_saved = 0
 
+        # Last (fingerprint, token stats) from get_context_stats
+        self._context_stats_cache: Optional[Tuple[tuple, Dict[str, Any]]] = None
+
         logger.info(
             f"Context manager initialized: model={model}, strategy={strategy}"
         )
@@ -287,7 +290,16 @@ class ContextManager:
         Returns:
             Dictionary with context statistics
         """
-        stats = self.tracker.calculate_total_context(messages, system, tools)
+        # The sidebar asks for stats on every rerun; only re-count tokens
+        # when the conversation, system prompt or tool set changed
+        fingerprint = self._context_fingerprint(messages, system, tools)
+        if self._context_stats_cache and self._context_stats_cache[0] == fingerprint:
+            token_stats = self._context_stats_cache[1]
+        else:
+            token_stats = self.tracker.calculate_total_context(messages, system, tools)
+            self._context_stats_cache = (fingerprint, token_stats)
+
+        stats = dict(token_stats)
 
         # Add management statistics
         stats.update({
@@ -303,6 +315,26 @@ class ContextManager:
 
         return stats
 
+    @staticmethod
+    def _context_fingerprint(
+        messages: List[Dict[str, Any]],
+        system: Optional[str],
+        tools: Optional[List[Dict[str, Any]]]
+    ) -> tuple:
+        """
+        Cheap change key for a context (no token counting).
+
+        Messages are append-only in normal use, so the list identity, its
+        length and the last message (identity + content size) cover new,
+        replaced and streamed-into messages.
+
+        Returns:
+            Hashable fingerprint tuple
+        """
+        last = messages[-1] if messages else None
+        last_key = (id(last), len(last.get("content") or "")) if isinstance(last, dict) else None
+        return (id(messages), len(messages), last_key, system, id(tools))
+
     def set_strategy(self, strategy: str):
         """
         Change context management strategy
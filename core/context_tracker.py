@@ -13,7 +13,11 @@ Model Context Limits:
 
 import logging
 from typing import List, Dict, Any, Optional
-from .token_counter import count_tokens, estimate_message_tokens
+from .token_counter import (
+    estimate_message_tokens,
+    estimate_text_tokens,
+    estimate_tool_tokens,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +53,10 @@ class ContextTracker:
         self.model = model
         self.max_tokens = self.get_model_context_limit()
 
+        # Running total for the settled prefix (all but the last message) of
+        # the last list seen: (id(list), prefix length, id(last prefix msg), tokens)
+        self._prefix_tokens = None
+
         logger.info(f"Context tracker initialized for {model} (limit: {self.max_tokens:,} tokens)")
 
     def get_model_context_limit(self) -> int:
@@ -98,27 +106,13 @@ class ContextTracker:
             - usage_percent: Percentage of context used
             - remaining_tokens: Tokens remaining
         """
-        # Count tokens
-        token_count = count_tokens(messages, system, tools, self.model)
-
-        # Calculate messages tokens (input_tokens includes everything)
-        messages_tokens = token_count["input_tokens"]
-
-        # Estimate system and tools separately for breakdown
-        system_tokens = 0
-        if system:
-            from .token_counter import estimate_text_tokens
-            system_tokens = estimate_text_tokens(system)
-
-        tools_tokens = 0
-        if tools:
-            from .token_counter import estimate_tool_tokens
-            tools_tokens = estimate_tool_tokens(tools)
+        # Same estimates as count_tokens(), kept separate for the breakdown.
+        # System and tool estimates are O(1); messages are counted incrementally.
+        system_tokens = estimate_text_tokens(system) if system else 0
+        tools_tokens = estimate_tool_tokens(tools) if tools else 0
+        messages_only_tokens = self._count_message_tokens(messages)
 
-        # Adjust messages tokens (remove system and tools)
-        messages_only_tokens = messages_tokens - system_tokens - tools_tokens
-
-        total_tokens = messages_tokens
+        total_tokens = messages_only_tokens + system_tokens + tools_tokens
         usage_percent = (total_tokens / self.max_tokens) * 100
         remaining_tokens = self.max_tokens - total_tokens
 
@@ -132,6 +126,37 @@ class ContextTracker:
             "remaining_tokens": remaining_tokens
         }
 
+    def _count_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Estimate tokens across messages, reusing the previous call's total.
+
+        Conversations grow by appending, so when called again with the same
+        list only the newly appended messages are estimated. The last message
+        is always re-estimated (it may still be streaming in).
+
+        Args:
+            messages: Conversation messages
+
+        Returns:
+            Estimated message tokens
+        """
+        if not messages:
+            return 0
+
+        prefix_len = len(messages) - 1
+        start, tokens = 0, 0
+        cached = self._prefix_tokens
+        if cached and cached[0] == id(messages) and 0 < cached[1] <= prefix_len \
+                and id(messages[cached[1] - 1]) == cached[2]:
+            start, tokens = cached[1], cached[3]
+
+        for message in messages[start:prefix_len]:
+            tokens += estimate_message_tokens(message)
+
+        if prefix_len:
+            self._prefix_tokens = (id(messages), prefix_len, id(messages[prefix_len - 1]), tokens)
+        return tokens + estimate_message_tokens(messages[-1])
+
     def get_message_token_breakdown(
         self,
         messages: List[Dict[str, Any]]
@@ -5,6 +5,8 @@ Automatically indexes conversations for semantic search:
 - Batch indexing of existing conversations
 - Incremental indexing on save/update
 - Smart update detection (only re-index when changed)
+- Content-hash short-circuit (skip re-embedding unchanged text)
+- Recent-query cache (repeat and near-duplicate queries skip the vector search)
 - Progress tracking for long operations
 
 Architecture:
@@ -14,40 +16,56 @@ Architecture:
 - Generates searchable text from messages + metadata
 """
 
+import hashlib
 import json
 import logging
+import time
 from pathlib import Path
 from typing import List, Dict, Optional, Callable, Any
 from datetime import datetime
 
+import numpy as np
+
 from core.vector_db import create_vector_db, VectorDBError
+from core.conversation_store import ConversationStore
+from core.json_files import write_json_file
 
 logger = logging.getLogger(__name__)
 
+# Recent-query cache for search_conversations()
+QUERY_CACHE_SIZE = 32  # Max cached queries (oldest evicted first)
+QUERY_CACHE_TTL = 60.0  # Seconds a cached result list stays valid
+QUERY_CACHE_SIMILARITY = 0.95  # Cosine threshold for reusing a near-duplicate query
+
 
 class ConversationIndexer:
     """Index conversations for semantic search"""
 
     def __init__(
         self,
-        conversations_file: str = "./sandbox/conversations.json",
+        conversations_dir: str = "./sandbox/conversations",
         collection: str = "conversations"
     ):
         """
         Initialize conversation indexer.
 
         Args:
-            conversations_file: Path to conversations JSON file
+            conversations_dir: Per-conversation storage directory
             collection: Vector collection name (default: "conversations")
         """
-        self.conversations_file = Path(conversations_file)
+        self.conversations_dir = Path(conversations_dir)
         self.collection_name = collection
-        self.index_status_file = self.conversations_file.parent / "index_status.json"
+        self.index_status_file = self.conversations_dir.parent / "index_status.json"
+        self._store = None
 
         # Lazy-load vector DB (only when needed)
         self._vector_db = None
         self._collection = None
 
+        # Recent queries: dicts with query, params, embedding (unit), matches, ts.
+        # Cleared whenever the index changes.
+        self._query_cache: List[Dict[str, Any]] = []
+
     def _get_vector_db(self):
         """Get or initialize vector database (lazy loading)"""
         if self._vector_db is None:
@@ -61,14 +79,16 @@ class ConversationIndexer:
             self._get_vector_db()
         return self._collection
 
+    def _get_store(self) -> ConversationStore:
+        """Get conversation store (lazy loading)"""
+        if self._store is None:
+            self._store = ConversationStore(str(self.conversations_dir))
+        return self._store
+
     def _load_conversations(self) -> List[Dict]:
-        """Load conversations from JSON file"""
+        """Load conversations from the conversation store"""
         try:
-            if not self.conversations_file.exists():
-                return []
-
-            with open(self.conversations_file, 'r') as f:
-                return json.load(f)
+            return self._get_store().load_all()
         except Exception as e:
             logger.error(f"Error loading conversations: {e}")
             return []
@@ -83,7 +103,9 @@ class ConversationIndexer:
                 "conv_123": {
                     "indexed_at": "2025-12-29T12:00:00",
                     "updated_at": "2025-12-29T12:00:00",
-                    "message_count": 10
+                    "message_count": 10,
+                    "content_hash": "9f86d081884c7d65...",
+                    "embedding_model": "all-MiniLM-L6-v2"
                 }
             }
         """
@@ -101,8 +123,7 @@ class ConversationIndexer:
         """Save indexing status metadata"""
         try:
             self.index_status_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.index_status_file, 'w') as f:
-                json.dump(status, f, indent=2)
+            write_json_file(self.index_status_file, status)
         except Exception as e:
             logger.error(f"Error saving index status: {e}")
 
@@ -153,6 +174,22 @@ class ConversationIndexer:
         searchable_text = "\n".join(parts)
         return searchable_text
 
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        """
+        Hash searchable text for change detection.
+
+        blake2b is cheap compared to an embedding pass, so hashing on every
+        save lets us skip the model entirely when the text is unchanged.
+
+        Args:
+            text: Searchable text for a conversation
+
+        Returns:
+            Hex digest (32 chars)
+        """
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
     def _needs_reindex(self, conv_id: str, conversation: Dict, index_status: Dict) -> bool:
         """
         Check if conversation needs to be re-indexed.
@@ -220,24 +257,38 @@ class ConversationIndexer:
 
             # Get collection
             collection = self._get_collection()
+            model_name = self._get_vector_db().model_name
 
-            # Add to vector database
-            collection.add(
-                texts=[searchable_text],
-                metadatas=[vector_metadata],
-                ids=[conv_id]
-            )
+            content_hash = self._content_hash(searchable_text)
+            index_status = self._load_index_status()
+            previous = index_status.get(conv_id, {})
+
+            if (previous.get("content_hash") == content_hash
+                    and previous.get("embedding_model") == model_name):
+                # Text unchanged - refresh metadata only, skip the embedding pass
+                collection.update(ids=[conv_id], metadatas=[vector_metadata])
+                logger.debug(f"Content unchanged, skipped re-embedding: {conv_id}")
+            else:
+                # Add to vector database
+                collection.add(
+                    texts=[searchable_text],
+                    metadatas=[vector_metadata],
+                    ids=[conv_id]
+                )
+                logger.info(f"Indexed conversation: {conv_id}")
+
+            self._query_cache = []
 
             # Update index status
-            index_status = self._load_index_status()
             index_status[conv_id] = {
                 "indexed_at": datetime.now().isoformat(),
                 "updated_at": conversation.get("updated_at", ""),
-                "message_count": len(conversation.get("messages", []))
+                "message_count": len(conversation.get("messages", [])),
+                "content_hash": content_hash,
+                "embedding_model": model_name
             }
             self._save_index_status(index_status)
 
-            logger.info(f"Indexed conversation: {conv_id}")
             return True
 
         except Exception as e:
@@ -335,6 +386,7 @@ class ConversationIndexer:
             # Remove from vector database
             collection = self._get_collection()
             collection.delete([conv_id])
+            self._query_cache = []
 
             # Update index status
             index_status = self._load_index_status()
@@ -364,10 +416,10 @@ class ConversationIndexer:
             }
         """
         try:
-            conversations = self._load_conversations()
             index_status = self._load_index_status()
 
-            total_conversations = len(conversations)
+            # Index entries are enough to count - no need to read message bodies
+            total_conversations = len(self._get_store().load_index())
             indexed_conversations = len(index_status)
             unindexed_conversations = total_conversations - indexed_conversations
 
@@ -423,10 +475,31 @@ class ConversationIndexer:
         try:
             collection = self._get_collection()
 
+            # Reruns re-issue the same (or a barely edited) query: reuse recent
+            # results instead of searching again
+            params = (top_k, json.dumps(filter_metadata, sort_keys=True, default=str))
+            now = time.time()
+            cache = [e for e in self._query_cache
+                     if e["params"] == params and now - e["ts"] < QUERY_CACHE_TTL]
+            for entry in cache:
+                if entry["query"] == query:
+                    return list(entry["matches"])
+
+            query_embedding = np.asarray(collection.embedding_generator.encode(query), dtype=np.float32).ravel()
+            norm = float(np.linalg.norm(query_embedding))
+            unit = query_embedding / norm if norm else query_embedding
+            if cache:
+                # One batched dot product against all cached query embeddings
+                sims = np.stack([e["embedding"] for e in cache]) @ unit
+                best = int(np.argmax(sims))
+                if sims[best] >= QUERY_CACHE_SIMILARITY:
+                    return list(cache[best]["matches"])
+
             results = collection.query(
                 query_text=query,
                 n_results=top_k,
-                filter=filter_metadata
+                filter=filter_metadata,
+                query_embedding=query_embedding
             )
 
             # Format results
@@ -448,7 +521,13 @@ class ConversationIndexer:
                 }
                 matches.append(match)
 
-            return matches
+            # Keep live entries for other params, newest last, bounded
+            live = [e for e in self._query_cache if now - e["ts"] < QUERY_CACHE_TTL]
+            live.append({"query": query, "params": params, "embedding": unit,
+                         "matches": matches, "ts": now})
+            self._query_cache = live[-QUERY_CACHE_SIZE:]
+
+            return list(matches)
 
         except Exception as e:
             logger.error(f"Error searching conversations: {e}")
@@ -0,0 +1,263 @@
+"""
+Conversation Store - Per-conversation file storage
+
+Stores each conversation in its own JSON file so that updating one
+conversation rewrites only that file instead of the whole history:
+
+    sandbox/conversations/
+        index.json          # Ordered lightweight entries (id, timestamps, metadata)
+        conv_abc123.json    # Full conversation (messages + metadata)
+        ...
+
+The index lets callers list ids, tags and flags without opening every
+conversation file. Entries are kept newest-first by updated_at, so listings
+come back already sorted. A legacy single-file store (sandbox/conversations.json)
+is migrated automatically on first use.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Any
+
+from core.json_files import read_json_file, write_json_file
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """Per-conversation JSON file storage with a lightweight index"""
+
+    def __init__(
+        self,
+        storage_dir: str = "./sandbox/conversations",
+        legacy_file: str = "./sandbox/conversations.json"
+    ):
+        """
+        Initialize conversation store.
+
+        Args:
+            storage_dir: Directory holding one JSON file per conversation
+            legacy_file: Old single-file store to migrate from (if present)
+        """
+        self.storage_dir = Path(storage_dir)
+        self.index_file = self.storage_dir / "index.json"
+        self.legacy_file = Path(legacy_file)
+        self._index_writes = 0  # Bumped by _save_index; part of index_version()
+        self._ensure_storage()
+
+    def _ensure_storage(self):
+        """Create storage directory and migrate the legacy file if needed"""
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        if self.index_file.exists():
+            # Indexes written before newest-first ordering: sort once
+            entries = self.load_index()
+            ordered = sorted(entries, key=self._updated_key, reverse=True)
+            if ordered != entries:
+                self._save_index(ordered)
+            return
+
+        conversations = []
+        if self.legacy_file.exists():
+            try:
+                conversations = read_json_file(self.legacy_file)
+            except Exception as e:
+                logger.error(f"Error reading legacy conversations file: {e}")
+                return
+
+        self.save_all(conversations)
+
+        if self.legacy_file.exists():
+            migrated = self.legacy_file.with_name(self.legacy_file.name + ".migrated")
+            os.replace(self.legacy_file, migrated)
+            logger.info(f"Migrated {len(conversations)} conversations to {self.storage_dir}")
+
+    def _conversation_path(self, conv_id: str) -> Path:
+        """Path of a conversation's JSON file"""
+        return self.storage_dir / f"{conv_id}.json"
+
+    @staticmethod
+    def _index_entry(conversation: Dict) -> Dict:
+        """Build the lightweight index entry for a conversation"""
+        return {
+            "id": conversation.get("id"),
+            "created_at": conversation.get("created_at", ""),
+            "updated_at": conversation.get("updated_at", ""),
+            "message_count": len(conversation.get("messages", [])),
+            "metadata": conversation.get("metadata", {})
+        }
+
+    @staticmethod
+    def _updated_key(entry: Dict) -> str:
+        """Sort key for index entries (ISO updated_at)"""
+        return entry.get("updated_at") or ""
+
+    @classmethod
+    def _insert_entry(cls, entries: List[Dict], entry: Dict):
+        """Insert an index entry keeping newest-first order (in place)"""
+        updated = cls._updated_key(entry)
+        for i, existing in enumerate(entries):
+            if cls._updated_key(existing) <= updated:
+                entries.insert(i, entry)
+                return
+        entries.append(entry)
+
+    def load_index(self) -> List[Dict]:
+        """
+        Load index entries (no message bodies).
+
+        Returns:
+            List of index entries, newest updated_at first
+        """
+        try:
+            return read_json_file(self.index_file)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.error(f"Error loading conversation index: {e}")
+            return []
+
+    def index_version(self) -> tuple:
+        """
+        Cheap change token for the index.
+
+        Every write goes through _save_index, so callers can key caches
+        on this instead of re-reading index.json. mtime + size alone can miss
+        two same-size rewrites within one clock tick, so the token also holds
+        the inode (each atomic replace creates a new one, also catching other
+        processes) and this store's write counter.
+
+        Returns:
+            (st_mtime_ns, st_size, st_ino, write count), or () if the index does not exist
+        """
+        try:
+            stat = self.index_file.stat()
+        except FileNotFoundError:
+            return ()
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino, self._index_writes)
+
+    def _save_index(self, entries: List[Dict]):
+        """Save index entries"""
+        write_json_file(self.index_file, entries)
+        self._index_writes += 1
+
+    def load(self, conv_id: str) -> Optional[Dict]:
+        """
+        Load a single conversation.
+
+        Args:
+            conv_id: Conversation ID
+
+        Returns:
+            Conversation dict, or None if not found
+        """
+        try:
+            return read_json_file(self._conversation_path(conv_id))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error loading conversation {conv_id}: {e}")
+            return None
+
+    def load_many(self, conv_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Load specific conversations by ID (one file read each).
+
+        Args:
+            conv_ids: Conversation IDs (duplicates are read once)
+
+        Returns:
+            Dict of conversation ID -> conversation (missing IDs omitted)
+        """
+        conversations = {}
+        for conv_id in dict.fromkeys(conv_ids):
+            conv = self.load(conv_id)
+            if conv is not None:
+                conversations[conv_id] = conv
+        return conversations
+
+    def load_all(self) -> List[Dict]:
+        """
+        Load all conversations in index order (newest updated_at first).
+
+        Returns:
+            List of conversation dicts
+        """
+        conversations = []
+        for entry in self.load_index():
+            conv = self.load(entry.get("id", ""))
+            if conv is not None:
+                conversations.append(conv)
+        return conversations
+
+    def save(self, conversation: Dict):
+        """
+        Save a single conversation (writes one file + the index).
+
+        Args:
+            conversation: Conversation dict with an "id" key
+        """
+        conv_id = conversation["id"]
+        write_json_file(self._conversation_path(conv_id), conversation)
+
+        entries = [e for e in self.load_index() if e.get("id") != conv_id]
+        self._insert_entry(entries, self._index_entry(conversation))
+        self._save_index(entries)
+
+    def save_many(self, conversations: List[Dict]):
+        """
+        Save several conversations (one file each, single index write).
+
+        Args:
+            conversations: Conversation dicts with "id" keys
+        """
+        if not conversations:
+            return
+
+        by_id = {e.get("id"): e for e in self.load_index()}
+        for conv in conversations:
+            write_json_file(self._conversation_path(conv["id"]), conv)
+            by_id[conv["id"]] = self._index_entry(conv)
+        self._save_index(sorted(by_id.values(), key=self._updated_key, reverse=True))
+
+    def save_all(self, conversations: List[Dict]):
+        """
+        Replace the whole store with the given conversations.
+
+        Files for conversations no longer in the list are removed.
+
+        Args:
+            conversations: Full list of conversation dicts
+        """
+        stored = []
+        for conv in conversations:
+            if not conv.get("id"):
+                logger.warning("Skipping conversation without ID")
+                continue
+            write_json_file(self._conversation_path(conv["id"]), conv)
+            stored.append(conv)
+
+        stale = {e.get("id") for e in self.load_index()} - {c["id"] for c in stored}
+        entries = [self._index_entry(c) for c in stored]
+        self._save_index(sorted(entries, key=self._updated_key, reverse=True))
+        self._remove_files(stale)
+
+    def delete(self, conv_ids: Iterable[str]):
+        """
+        Delete conversations by ID.
+
+        Args:
+            conv_ids: Conversation IDs to delete
+        """
+        id_set = set(conv_ids)
+        entries = [e for e in self.load_index() if e.get("id") not in id_set]
+        self._save_index(entries)
+        self._remove_files(id_set)
+
+    def _remove_files(self, conv_ids: Iterable[str]):
+        """Remove conversation files (missing files are ignored)"""
+        for conv_id in conv_ids:
+            try:
+                self._conversation_path(conv_id).unlink()
+            except FileNotFoundError:
+                pass
@@ -16,9 +16,34 @@ from datetime import datetime
 from pathlib import Path
 import logging
 
+# Optional fast JSON backend (serializes straight to bytes)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
 
+def dump_json_bytes(data: Any) -> bytes:
+    """
+    Serialize to indented UTF-8 JSON bytes.
+
+    orjson produces bytes directly, skipping the intermediate str that
+    json.dumps(...).encode() holds alongside the result for large exports.
+
+    Args:
+        data: JSON-serializable value
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 class ExportEngine:
     """Main export engine for conversations"""
 
@@ -91,7 +116,7 @@ class ExportEngine:
                     "count": len(conversations),
                     "conversations": conversations
                 }
-                return json.dumps(combined, indent=2).encode("utf-8")
+                return dump_json_bytes(combined)
 
             # For other formats, concatenate with separators
             exports = []
@@ -151,7 +176,7 @@ class JSONExporter(BaseExporter):
             stats = self._calculate_stats(conversation)
             output["statistics"] = stats
 
-        return json.dumps(output, indent=2, ensure_ascii=False).encode("utf-8")
+        return dump_json_bytes(output)
 
     def _calculate_stats(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate conversation statistics"""
@@ -0,0 +1,95 @@
+"""
+JSON Files - Shared read/write helpers for the app's JSON state files
+
+Used by the conversation store, indexer, preset manager and memory storage,
+so every JSON state file is read the same way and written atomically.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+# Optional fast JSON backend (also parses straight from an mmap buffer)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def read_json_file(path: Path) -> Any:
+    """
+    Read and parse a JSON file.
+
+    Uses orjson over a read-only mmap when available, so the file is
+    parsed from page-cache memory without an intermediate bytes copy.
+
+    Args:
+        path: JSON file path
+
+    Returns:
+        Parsed JSON value
+    """
+    with open(path, 'rb') as f:
+        if HAS_ORJSON and os.fstat(f.fileno()).st_size > 0:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            except (OSError, ValueError):
+                # mmap unavailable (e.g. Windows sharing modes) - plain read
+                f.seek(0)
+                return orjson.loads(f.read())
+        return json.load(f)
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = 'w') -> Iterator[IO]:
+    """
+    Open a unique temp file next to path; it replaces path when the block exits.
+
+    Readers never observe a half-written file, and the temp name is unique per
+    call, so concurrent writers (e.g. a tool thread and the UI) can't clobber
+    each other's temp file. If the block raises, the temp file is removed and
+    path is left untouched.
+
+    Args:
+        path: Target file path
+        mode: 'w' (text) or 'wb' (binary)
+
+    Yields:
+        Open temp file object
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_file(path: Path, data: Any):
+    """
+    Write JSON atomically (unique temp file + os.replace, see atomic_write).
+
+    Args:
+        path: Target JSON file path
+        data: JSON-serializable value (non-str dict keys are stringified, as json does)
+    """
+    if HAS_ORJSON:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        with atomic_write(path, 'wb') as f:
+            f.write(payload)
+    else:
+        with atomic_write(path) as f:
+            json.dump(data, f, indent=2)
@@ -15,6 +15,8 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+from core.json_files import write_json_file
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,6 +25,13 @@ class PresetManager:
 
     VERSION = "1.0"
 
+    # The 7 core settings a preset captures (fingerprint order)
+    SETTINGS_KEYS = (
+        "model", "cache_strategy", "context_strategy", "temperature",
+        "preserve_recent_count", "auto_summarize", "default_subagent_model"
+    )
+    MATCH_CACHE_SIZE = 64
+
     # Built-in preset definitions
     BUILT_IN_PRESETS = {
         "speed_mode": {
@@ -117,6 +126,10 @@ class PresetManager:
         self.presets_file = Path("./sandbox/presets.json")
         self._ensure_storage()
         self.presets_data = self._load_presets()
+        # (preset_id, settings fingerprint) -> match result; reset on every save
+        self._match_cache: Dict[Tuple, bool] = {}
+        # Merged built-in + custom view; reset on every save
+        self._all_presets_cache: Optional[Dict[str, Dict]] = None
 
     def _ensure_storage(self):
         """Ensure presets file exists with built-in presets"""
@@ -163,16 +176,17 @@ class PresetManager:
             }
 
     def _save_data(self, data: Dict[str, Any]):
-        """Save presets data to file"""
+        """Save presets data to file (atomic temp file + rename)"""
         try:
-            with open(self.presets_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            write_json_file(self.presets_file, data)
             logger.info("Saved presets to disk")
         except Exception as e:
             logger.error(f"Error saving presets: {e}")
 
     def _save_presets(self):
         """Save current presets_data to disk"""
+        self._match_cache.clear()
+        self._all_presets_cache = None
         self._save_data(self.presets_data)
 
     def get_built_in_presets(self) -> Dict[str, Dict]:
@@ -184,11 +198,13 @@ class PresetManager:
         return self.presets_data.get("custom", {})
 
     def get_all_presets(self) -> Dict[str, Dict]:
-        """Get all presets (built-in + custom)"""
-        all_presets = {}
-        all_presets.update(self.get_built_in_presets())
-        all_presets.update(self.get_custom_presets())
-        return all_presets
+        """Get all presets (built-in + custom); shared dict - do not mutate"""
+        if self._all_presets_cache is None:
+            all_presets = {}
+            all_presets.update(self.get_built_in_presets())
+            all_presets.update(self.get_custom_presets())
+            self._all_presets_cache = all_presets
+        return self._all_presets_cache
 
     def get_preset(self, preset_id: str) -> Optional[Dict]:
         """Get specific preset by ID"""
@@ -500,6 +516,12 @@ class PresetManager:
             True if settings match preset, False otherwise
         """
         try:
+            # Called every rerun - memoize on a tuple of the current values
+            fingerprint = (preset_id, tuple(getattr(session_state, k) for k in self.SETTINGS_KEYS))
+            cached = self._match_cache.get(fingerprint)
+            if cached is not None:
+                return cached
+
             preset = self.get_preset(preset_id)
             if not preset:
                 return False
@@ -507,7 +529,11 @@ class PresetManager:
             current_settings = self.extract_current_settings(session_state)
             preset_settings = preset["settings"]
 
-            return current_settings == preset_settings
+            matches = current_settings == preset_settings
+            if len(self._match_cache) >= self.MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[fingerprint] = matches
+            return matches
 
         except Exception as e:
             logger.error(f"Error checking settings match: {e}")
@@ -259,7 +259,8 @@ class VectorCollection:
         query_text: str,
         n_results: int = 10,
         filter: Optional[Dict[str, Any]] = None,
-        include_distances: bool = True
+        include_distances: bool = True,
+        query_embedding: Optional[np.ndarray] = None
     ) -> Dict[str, Any]:
         """
         Query collection for similar documents.
@@ -269,13 +270,15 @@ class VectorCollection:
             n_results: Number of results to return
             filter: Optional metadata filter
             include_distances: Include similarity distances
+            query_embedding: Precomputed embedding of query_text (skips encoding)
 
         Returns:
             Query results dict with ids, documents, metadatas, distances
         """
         try:
             # Generate query embedding
-            query_embedding = self.embedding_generator.encode(query_text)
+            if query_embedding is None:
+                query_embedding = self.embedding_generator.encode(query_text)
 
             # Ensure embedding is 1D array, then convert to list
             if query_embedding.ndim > 1:
@@ -89,15 +89,7 @@ def config_manager():
 @pytest.fixture
 def app_state(tmp_path):
     """Create app state instance with temp storage"""
-    storage_path = tmp_path / "conversations.json"
-    state = AppState()
-    state.conversations_file = storage_path
-
-    # Ensure clean state
-    if storage_path.exists():
-        storage_path.unlink()
-
-    return state
+    return AppState(storage_dir=str(tmp_path / "conversations"))
 
 
 @pytest.fixture
@@ -562,12 +554,43 @@ def test_search_with_filters(app_state, sample_conversation):
     assert len(results) == 1
 
 
+def test_save_conversation_dedupes_identical(app_state, sample_conversation):
+    """Test that re-saving identical messages + metadata doesn't create a duplicate"""
+    conv_id, created = app_state.save_new_conversation(sample_conversation["messages"], {})
+    assert created is True
+
+    # Identical content maps to the same ID and is skipped
+    dup_id, created = app_state.save_new_conversation(sample_conversation["messages"], {})
+    assert dup_id == conv_id
+    assert created is False
+
+    # Same messages, different metadata - saved as a separate conversation
+    other_id, created = app_state.save_new_conversation(sample_conversation["messages"], {"tags": ["x"]})
+    assert other_id != conv_id
+    assert created is True
+
+    assert len(app_state.get_conversations()) == 2
+
+
+def test_save_conversation_after_growth(app_state, sample_conversation):
+    """Test that a save matching a grown conversation's opening turns gets its own ID"""
+    opening = sample_conversation["messages"][:2]
+    conv_id = app_state.save_conversation(list(opening), {})
+    app_state.save_message("user", "Follow-up", conv_id)
+
+    new_id = app_state.save_conversation(list(opening), {"tags": ["new"]})
+    assert new_id != conv_id
+
+    conversations = {c["id"]: c for c in app_state.get_conversations()}
+    assert len(conversations[conv_id]["messages"]) == 3
+    assert conversations[new_id]["metadata"] == {"tags": ["new"]}
+
+
 def test_batch_delete(app_state, sample_conversation):
     """Test batch deleting conversations"""
-    # Save multiple conversations
-    app_state.save_conversation(sample_conversation["messages"], {})
-    app_state.save_conversation(sample_conversation["messages"], {})
-    app_state.save_conversation(sample_conversation["messages"], {})
+    # Save multiple conversations (distinct content - identical saves are deduplicated)
+    for i in range(3):
+        app_state.save_conversation(sample_conversation["messages"], {"tags": [f"batch-{i}"]})
 
     conversations = app_state.get_conversations()
     assert len(conversations) == 3
@@ -583,11 +606,12 @@ def test_batch_delete(app_state, sample_conversation):
 
 def test_batch_tag(app_state, sample_conversation):
     """Test batch tagging conversations"""
-    # Save multiple conversations
-    app_state.save_conversation(sample_conversation["messages"], {})
-    app_state.save_conversation(sample_conversation["messages"], {})
+    # Save multiple conversations (distinct content - identical saves are deduplicated)
+    for i in range(2):
+        app_state.save_conversation(sample_conversation["messages"], {"tags": [f"batch-{i}"]})
 
     conversations = app_state.get_conversations()
+    assert len(conversations) == 2
     conv_ids = [c["id"] for c in conversations]
 
     # Batch tag
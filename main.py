@@ -17,7 +17,13 @@ import streamlit as st
 import os
 import json
 import logging
-import uuid
+import hashlib
+import html
+import functools
+import heapq
+import re
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
@@ -25,8 +31,16 @@ from dotenv import load_dotenv
 import glob
 import base64
 from io import BytesIO
+import numpy as np
 from PIL import Image
 
+# Optional streaming JSON parser (large memory.json deletes)
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
 # Load environment
 load_dotenv()
 
@@ -60,7 +74,16 @@ from core.error_messages import get_user_friendly_message, format_error_for_disp
 from core.errors import RetryableError, UserFixableError, FatalError
 from core.context_manager import ContextManager
 from core.conversation_indexer import get_conversation_indexer
+from core.conversation_store import ConversationStore
+from core.json_files import atomic_write, read_json_file, write_json_file
+from core.preset_manager import PresetManager
+from core.cache_manager import CacheStrategy
+from tools.agents import _agent_manager, agent_spawn, agent_result, socratic_council
+from tools.memory import memory_store
+from tools.vector_search import vector_add_knowledge
+from core.export_engine import ExportEngine, dump_json_bytes
 from ui.keyboard_shortcuts import render_cheat_sheet
+from ui.streaming_display import StreamingTextDisplay, ToolExecutionDisplay
 
 
 # ============================================================================
@@ -71,39 +94,119 @@ PAGE_TITLE = "Apex Aurum Vivum - Claude Edition"
 PAGE_ICON = "🤖"
 DEFAULT_MODEL = ClaudeModels.SONNET_4_5.value
 MAX_TOKENS = 64000
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant with access to various tools. Use tools when appropriate to help the user."
+DEFAULT_COUNCIL_OPTIONS = ("", "")  # Immutable template; sessions get a list copy
+TOOL_SCHEMA_LIST = list(ALL_TOOL_SCHEMAS.values())  # Built once; the schema registry is static
+API_MESSAGE_ROLES = frozenset(("user", "assistant"))  # Roles sent to the API
+AUTOSAVE_DEBOUNCE_SECONDS = 1.0  # Skip identical auto-saves within this window
+HYBRID_RRF_K = 60  # Reciprocal Rank Fusion damping constant
+HYBRID_MAX_RESULTS = 50  # Cap on fused hybrid search results
+CHAT_HISTORY_WINDOW = 100  # Most recent messages rendered on every rerun
+AGENT_LIST_PAGE_SIZE = 10  # Agent Management cards rendered per "Show more" step
+AGENT_RESULT_POLL_SECONDS = 2  # Result viewer status poll interval for unfinished agents
+
+# Agent monitor display tables (unknown status falls back to pending)
+AGENT_STATUS_ICONS = {"running": "🔄", "completed": "✅", "failed": "❌", "pending": "⏳"}
+AGENT_STATUS_COLORS = {"running": "🔵", "completed": "🟢", "failed": "🔴", "pending": "🟡"}
+AGENT_STATUS_PRIORITY = {"running": 0, "completed": 1, "failed": 2, "pending": 3}  # Sidebar sort order
+AGENT_TYPE_ICONS = {
+    "general": "🤖",
+    "researcher": "🔬",
+    "coder": "💻",
+    "analyst": "📊",
+    "writer": "✍️"
+}
+# Sidebar views - only the selected view's widgets are built each rerun
+SIDEBAR_SECTION_CHAT = "💬 Chat"
+SIDEBAR_SECTION_AGENTS = "🤖 Agents"
+SIDEBAR_SECTION_SETTINGS = "⚙️ Settings"
+SIDEBAR_SECTION_HISTORY = "📚 History"
+SIDEBAR_SECTIONS = (SIDEBAR_SECTION_CHAT, SIDEBAR_SECTION_AGENTS, SIDEBAR_SECTION_SETTINGS, SIDEBAR_SECTION_HISTORY)
+
+# Code markers in agent results; only the head of a result is scanned
+AGENT_RESULT_CODE_RE = re.compile(r"(?:def |class |import |```)")
+AGENT_RESULT_SCAN_CHARS = 8192
 
 
 # ============================================================================
 # State Management
 # ============================================================================
 
+def _content_digest(payload: Any) -> str:
+    """
+    Hash JSON-serializable content (canonical form, 16 hex chars).
+
+    Args:
+        payload: JSON-serializable content
+
+    Returns:
+        Hex digest
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _content_conversation_id(payload: Any) -> str:
+    """
+    Derive a stable conversation ID from content.
+
+    Identical content always maps to the same ID, so re-importing or
+    re-saving the same conversation does not create duplicates.
+
+    Args:
+        payload: JSON-serializable content (messages list or key tuple)
+
+    Returns:
+        ID of the form "conv_<16 hex chars>"
+    """
+    return f"conv_{_content_digest(payload)}"
+
+
 class AppState:
     """Application state manager"""
 
-    def __init__(self):
-        """Initialize application state"""
-        self.conversations_file = Path("./sandbox/conversations.json")
-        self._ensure_storage()
+    def __init__(self, storage_dir: str = "./sandbox/conversations"):
+        """
+        Initialize application state.
+
+        Args:
+            storage_dir: Conversation store directory (one JSON file per conversation)
+        """
+        # One JSON file per conversation; migrates a legacy conversations.json
+        # sitting next to the store directory (sandbox/conversations.json)
+        self.store = ConversationStore(
+            storage_dir=storage_dir,
+            legacy_file=str(Path(storage_dir).parent / "conversations.json")
+        )
 
         # Phase 13.3: Conversation indexer (lazy-loaded)
         self._indexer = None
         self.auto_index_enabled = True  # Toggle for automatic indexing
 
-    def _ensure_storage(self):
-        """Ensure storage directories exist"""
-        self.conversations_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.conversations_file.exists():
-            self._save_conversations([])
+        # (index version, conversations) - every store write changes the version
+        self._conversations_cache = None
 
     def _load_conversations(self) -> List[Dict]:
-        """Load conversation history"""
+        """
+        Load conversation history.
+
+        Reuses the last full load while the store index is unchanged, so
+        sidebar reruns don't re-read every conversation file. The list is a
+        fresh copy; the conversation dicts are shared and must not be mutated.
+        """
         try:
-            with open(self.conversations_file, 'r') as f:
-                return json.load(f)
+            version = self.store.index_version()
+            if self._conversations_cache is None or self._conversations_cache[0] != version:
+                self._conversations_cache = (version, self.store.load_all())
+            return list(self._conversations_cache[1])
         except Exception as e:
             logger.error(f"Error loading conversations: {e}")
             return []
 
+    def _load_conversation(self, conv_id: str) -> Optional[Dict]:
+        """Load a single conversation by ID (reads only its file)"""
+        return self.store.load(conv_id)
+
     def _get_indexer(self):
         """Get conversation indexer (lazy loading)"""
         if self._indexer is None:
@@ -111,13 +214,19 @@ class AppState:
         return self._indexer
 
     def _save_conversations(self, conversations: List[Dict]):
-        """Save conversation history"""
+        """Save conversation history (rewrites every conversation file)"""
         try:
-            with open(self.conversations_file, 'w') as f:
-                json.dump(conversations, f, indent=2)
+            self.store.save_all(conversations)
         except Exception as e:
             logger.error(f"Error saving conversations: {e}")
 
+    def _save_conversation(self, conversation: Dict):
+        """Save a single conversation (rewrites only its file + the index)"""
+        try:
+            self.store.save(conversation)
+        except Exception as e:
+            logger.error(f"Error saving conversation {conversation.get('id')}: {e}")
+
     def _auto_index_conversation(self, conv_id: str):
         """
         Automatically index a conversation after save/update.
@@ -130,14 +239,7 @@ class AppState:
             return
 
         try:
-            # Find conversation
-            conversations = self._load_conversations()
-            conversation = None
-            for conv in conversations:
-                if conv.get("id") == conv_id:
-                    conversation = conv
-                    break
-
+            conversation = self._load_conversation(conv_id)
             if conversation:
                 indexer = self._get_indexer()
                 indexer.index_conversation(conv_id, conversation)
@@ -153,53 +255,31 @@ class AppState:
             content: Message content
             conversation_id: Optional conversation ID
         """
-        conversations = self._load_conversations()
-
         message = {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
         }
 
-        saved_conv_id = None
-
-        if conversation_id:
-            # Find and update existing conversation
-            found = False
-            for conv in conversations:
-                if conv.get("id") == conversation_id:
-                    conv["messages"].append(message)
-                    conv["updated_at"] = datetime.now().isoformat()
-                    found = True
-                    saved_conv_id = conversation_id
-                    break
+        conv = self._load_conversation(conversation_id) if conversation_id else None
 
-            # Create new conversation if not found
-            if not found:
-                new_conv = {
-                    "id": conversation_id,
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                    "messages": [message]
-                }
-                conversations.append(new_conv)
-                saved_conv_id = conversation_id
+        if conv is not None:
+            # Update existing conversation
+            conv["messages"].append(message)
+            conv["updated_at"] = datetime.now().isoformat()
         else:
-            # Create new conversation with auto-generated ID
-            new_conv = {
-                "id": f"conv_{datetime.now().timestamp()}",
+            # Create new conversation (auto-generated ID if none given)
+            conv = {
+                "id": conversation_id or _content_conversation_id([role, content, message["timestamp"]]),
                 "created_at": datetime.now().isoformat(),
                 "updated_at": datetime.now().isoformat(),
                 "messages": [message]
             }
-            conversations.append(new_conv)
-            saved_conv_id = new_conv["id"]
 
-        self._save_conversations(conversations)
+        self._save_conversation(conv)
 
         # Phase 13.3: Auto-index after save
-        if saved_conv_id:
-            self._auto_index_conversation(saved_conv_id)
+        self._auto_index_conversation(conv["id"])
 
     def save_conversation(self, messages: List[Dict], metadata: Optional[Dict] = None):
         """
@@ -208,34 +288,79 @@ class AppState:
         Args:
             messages: List of message dicts with role and content
             metadata: Optional metadata dict (tags, favorite, etc.)
+
+        Returns:
+            Conversation ID
         """
-        conversations = self._load_conversations()
+        return self.save_new_conversation(messages, metadata)[0]
+
+    def save_new_conversation(self, messages: List[Dict], metadata: Optional[Dict] = None) -> tuple:
+        """
+        Save a complete conversation unless an identical one is already stored.
+
+        The ID is derived from the messages, but stored conversations keep
+        growing (and get re-tagged) under their first ID - so a hit only counts
+        as a duplicate when the stored messages and metadata are both equal to
+        these; otherwise salted IDs are probed in turn until a duplicate or a
+        free ID turns up.
+
+        Args:
+            messages: List of message dicts with role and content
+            metadata: Optional metadata dict (tags, favorite, etc.)
+
+        Returns:
+            (conversation ID, created) - created is False for a skipped duplicate
+        """
+        metadata = metadata or {}
+        timestamp = datetime.now().isoformat()
+        base_id = conv_id = _content_conversation_id(messages)
+        salt = 0
+        while (existing := self._load_conversation(conv_id)) is not None:
+            if existing.get("messages") == messages and existing.get("metadata", {}) == metadata:
+                # Identical content already saved - don't create a duplicate
+                logger.info(f"Conversation {conv_id} already exists, skipping duplicate save")
+                return conv_id, False
+            # Same opening content, since grown or re-tagged - probe the next salted ID
+            salt += 1
+            conv_id = _content_conversation_id([base_id, salt])
 
         new_conv = {
-            "id": f"conv_{uuid.uuid4().hex[:16]}",
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "id": conv_id,
+            "created_at": timestamp,
+            "updated_at": timestamp,
             "messages": messages,
-            "metadata": metadata or {}
+            "metadata": metadata
         }
 
-        conversations.append(new_conv)
-        self._save_conversations(conversations)
+        self._save_conversation(new_conv)
 
         # Phase 13.3: Auto-index after save
         self._auto_index_conversation(new_conv["id"])
 
-        return new_conv["id"]
+        return new_conv["id"], True
 
     def get_conversations(self) -> List[Dict]:
         """Get all conversations"""
         return self._load_conversations()
 
+    def get_conversations_by_ids(self, conv_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Load specific conversations (one file read per ID, not the whole store).
+
+        Args:
+            conv_ids: Conversation IDs to load
+
+        Returns:
+            Dict of conversation ID -> conversation (missing IDs omitted)
+        """
+        return self.store.load_many(conv_ids)
+
     def delete_conversation(self, conv_id: str):
         """Delete a conversation by ID"""
-        conversations = self._load_conversations()
-        conversations = [c for c in conversations if c.get("id") != conv_id]
-        self._save_conversations(conversations)
+        try:
+            self.store.delete([conv_id])
+        except Exception as e:
+            logger.error(f"Error deleting conversation {conv_id}: {e}")
 
         # Phase 13.3: Remove from index
         try:
@@ -248,76 +373,67 @@ class AppState:
 
     def add_tag(self, conv_id: str, tag: str):
         """Add a tag to a conversation"""
-        conversations = self._load_conversations()
-        for conv in conversations:
-            if conv.get("id") == conv_id:
-                metadata = conv.get("metadata", {})
-                tags = metadata.get("tags", [])
-                if tag not in tags:
-                    tags.append(tag)
-                metadata["tags"] = tags
-                conv["metadata"] = metadata
-                conv["updated_at"] = datetime.now().isoformat()
-                break
-        self._save_conversations(conversations)
+        conv = self._load_conversation(conv_id)
+        if conv is not None:
+            metadata = conv.get("metadata", {})
+            tags = metadata.get("tags", [])
+            if tag not in tags:
+                tags.append(tag)
+            metadata["tags"] = tags
+            conv["metadata"] = metadata
+            conv["updated_at"] = datetime.now().isoformat()
+            self._save_conversation(conv)
 
         # Phase 13.3: Re-index after metadata change
         self._auto_index_conversation(conv_id)
 
     def remove_tag(self, conv_id: str, tag: str):
         """Remove a tag from a conversation"""
-        conversations = self._load_conversations()
-        for conv in conversations:
-            if conv.get("id") == conv_id:
-                metadata = conv.get("metadata", {})
-                tags = metadata.get("tags", [])
-                if tag in tags:
-                    tags.remove(tag)
-                metadata["tags"] = tags
-                conv["metadata"] = metadata
-                conv["updated_at"] = datetime.now().isoformat()
-                break
-        self._save_conversations(conversations)
+        conv = self._load_conversation(conv_id)
+        if conv is not None:
+            metadata = conv.get("metadata", {})
+            tags = metadata.get("tags", [])
+            if tag in tags:
+                tags.remove(tag)
+            metadata["tags"] = tags
+            conv["metadata"] = metadata
+            conv["updated_at"] = datetime.now().isoformat()
+            self._save_conversation(conv)
 
         # Phase 13.3: Re-index after metadata change
         self._auto_index_conversation(conv_id)
 
     def set_favorite(self, conv_id: str, favorite: bool):
         """Mark conversation as favorite"""
-        conversations = self._load_conversations()
-        for conv in conversations:
-            if conv.get("id") == conv_id:
-                metadata = conv.get("metadata", {})
-                metadata["favorite"] = favorite
-                conv["metadata"] = metadata
-                conv["updated_at"] = datetime.now().isoformat()
-                break
-        self._save_conversations(conversations)
+        conv = self._load_conversation(conv_id)
+        if conv is not None:
+            metadata = conv.get("metadata", {})
+            metadata["favorite"] = favorite
+            conv["metadata"] = metadata
+            conv["updated_at"] = datetime.now().isoformat()
+            self._save_conversation(conv)
 
         # Phase 13.3: Re-index after metadata change
         self._auto_index_conversation(conv_id)
 
     def set_archived(self, conv_id: str, archived: bool):
         """Archive or unarchive conversation"""
-        conversations = self._load_conversations()
-        for conv in conversations:
-            if conv.get("id") == conv_id:
-                metadata = conv.get("metadata", {})
-                metadata["archived"] = archived
-                conv["metadata"] = metadata
-                conv["updated_at"] = datetime.now().isoformat()
-                break
-        self._save_conversations(conversations)
+        conv = self._load_conversation(conv_id)
+        if conv is not None:
+            metadata = conv.get("metadata", {})
+            metadata["archived"] = archived
+            conv["metadata"] = metadata
+            conv["updated_at"] = datetime.now().isoformat()
+            self._save_conversation(conv)
 
         # Phase 13.3: Re-index after metadata change
         self._auto_index_conversation(conv_id)
 
     def get_all_tags(self) -> List[str]:
         """Get all unique tags across conversations"""
-        conversations = self._load_conversations()
         tags = set()
-        for conv in conversations:
-            metadata = conv.get("metadata", {})
+        for entry in self.store.load_index():
+            metadata = entry.get("metadata", {})
             conv_tags = metadata.get("tags", [])
             tags.update(conv_tags)
         return sorted(list(tags))
@@ -343,51 +459,40 @@ class AppState:
         query_lower = query.lower()
         filters = filters or {}
 
+        # Hoist filter lookups out of the loop (cheapest checks run first)
+        favorite_want = filters.get("favorite")
+        archived_want = filters.get("archived")
+        filter_tags = set(filters.get("tags") or ())
+        date_from = filters.get("date_from")
+        date_to = filters.get("date_to")
+
         for conv in conversations:
+            metadata = conv.get("metadata", {})
+
             # Apply filters first
-            if filters.get("favorite") is not None:
-                metadata = conv.get("metadata", {})
-                if metadata.get("favorite", False) != filters["favorite"]:
-                    continue
+            if favorite_want is not None and metadata.get("favorite", False) != favorite_want:
+                continue
 
-            if filters.get("archived") is not None:
-                metadata = conv.get("metadata", {})
-                if metadata.get("archived", False) != filters["archived"]:
-                    continue
+            if archived_want is not None and metadata.get("archived", False) != archived_want:
+                continue
 
-            if filters.get("tags"):
-                metadata = conv.get("metadata", {})
-                conv_tags = set(metadata.get("tags", []))
-                filter_tags = set(filters["tags"])
-                if not filter_tags.intersection(conv_tags):
-                    continue
+            if filter_tags and filter_tags.isdisjoint(metadata.get("tags", [])):
+                continue
 
             # Date filtering
-            if filters.get("date_from"):
-                created = conv.get("created_at", "")
-                if created < filters["date_from"]:
-                    continue
+            if date_from and conv.get("created_at", "") < date_from:
+                continue
 
-            if filters.get("date_to"):
-                created = conv.get("created_at", "")
-                if created > filters["date_to"]:
-                    continue
+            if date_to and conv.get("created_at", "") > date_to:
+                continue
 
-            # Search query
+            # Search query (only reached by conversations that passed all filters)
             if query:
-                # Search in title
-                title = conv.get("title", "")
-                if query_lower in title.lower():
+                if query_lower in conv.get("title", "").lower() or any(
+                    query_lower in str(msg.get("content", "")).lower()
+                    for msg in conv.get("messages", [])
+                ):
                     results.append(conv)
-                    continue
-
-                # Search in messages
-                messages = conv.get("messages", [])
-                for msg in messages:
-                    content = str(msg.get("content", ""))
-                    if query_lower in content.lower():
-                        results.append(conv)
-                        break
             else:
                 # No query, just return filtered results
                 results.append(conv)
@@ -396,9 +501,11 @@ class AppState:
 
     def batch_delete(self, conv_ids: List[str]):
         """Delete multiple conversations"""
-        conversations = self._load_conversations()
-        conversations = [c for c in conversations if c.get("id") not in conv_ids]
-        self._save_conversations(conversations)
+        id_set = set(conv_ids)
+        try:
+            self.store.delete(id_set)
+        except Exception as e:
+            logger.error(f"Error deleting conversations: {e}")
 
         # Phase 13.3: Remove from index
         try:
@@ -410,17 +517,24 @@ class AppState:
 
     def batch_tag(self, conv_ids: List[str], tag: str):
         """Add tag to multiple conversations"""
-        conversations = self._load_conversations()
-        for conv in conversations:
-            if conv.get("id") in conv_ids:
-                metadata = conv.get("metadata", {})
-                tags = metadata.get("tags", [])
-                if tag not in tags:
-                    tags.append(tag)
-                metadata["tags"] = tags
-                conv["metadata"] = metadata
-                conv["updated_at"] = datetime.now().isoformat()
-        self._save_conversations(conversations)
+        id_set = set(conv_ids)
+        updated = []
+        for conv_id in id_set:
+            conv = self._load_conversation(conv_id)
+            if conv is None:
+                continue
+            metadata = conv.get("metadata", {})
+            tags = metadata.get("tags", [])
+            if tag not in tags:
+                tags.append(tag)
+            metadata["tags"] = tags
+            conv["metadata"] = metadata
+            conv["updated_at"] = datetime.now().isoformat()
+            updated.append(conv)
+        try:
+            self.store.save_many(updated)
+        except Exception as e:
+            logger.error(f"Error saving tagged conversations: {e}")
 
         # Phase 13.3: Re-index all updated conversations
         for conv_id in conv_ids:
@@ -466,8 +580,11 @@ class AppState:
         }
 
         if not dry_run and to_delete:
-            # Actually delete
-            self._save_conversations(to_keep)
+            # Actually delete (only the removed files are touched)
+            try:
+                self.store.delete(item["id"] for item in to_delete)
+            except Exception as e:
+                logger.error(f"Error deleting conversations during cleanup: {e}")
 
             # Remove from index
             try:
@@ -614,7 +731,6 @@ class AppState:
         try:
             from tools.vector_search import vector_delete, vector_add_knowledge
             from core.vector_db import create_vector_db
-            from datetime import datetime
 
             # Get current fact
             db = create_vector_db()
@@ -740,8 +856,6 @@ class AppState:
             Dict with export data
         """
         try:
-            from datetime import datetime
-
             # Get all facts (optionally filtered)
             facts = self.get_all_knowledge(category=category)
 
@@ -954,6 +1068,27 @@ def get_media_type(filename: str) -> str:
     return mapping.get(ext, 'image/jpeg')
 
 
+# Process-wide (shared by all sessions) - kept small: entries can be ~3.75 MB each
+DECODED_IMAGE_CACHE_SIZE = 8
+
+
+@functools.lru_cache(maxsize=DECODED_IMAGE_CACHE_SIZE)
+def decode_image_base64(data: str) -> bytes:
+    """
+    Decode a base64 image payload (memoized: recent history images decode once).
+
+    Message dicts keep the same payload string across reruns, so its hash is
+    cached and repeat lookups are O(1).
+
+    Args:
+        data: Base64 encoded image
+
+    Returns:
+        Raw image bytes
+    """
+    return base64.b64decode(data)
+
+
 def create_image_content(image_bytes: bytes, media_type: str) -> Dict[str, Any]:
     """
     Create Claude-formatted image content block.
@@ -996,40 +1131,144 @@ def validate_image_size(image_bytes: bytes) -> tuple[bool, str]:
     return True, ""
 
 
+# Encoded image blocks per session (st.session_state.image_content_cache), keyed
+# by (UploadedFile.file_id, name). Uploads stay in the uploader after sending,
+# so follow-up messages reuse the base64 payload. LRU: the oldest entry is evicted.
+IMAGE_CONTENT_CACHE_SIZE = 4
+
+
+def uploaded_image_content(img_file) -> tuple[Optional[Dict[str, Any]], str]:
+    """
+    Build the Claude image block for an uploaded file (memoized per upload, per session).
+
+    Args:
+        img_file: Streamlit UploadedFile
+
+    Returns:
+        Tuple of (image content block or None, error_message)
+    """
+    cache = st.session_state.image_content_cache
+    file_id = getattr(img_file, "file_id", None)
+    cache_key = (file_id, img_file.name)
+    if file_id is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cache.move_to_end(cache_key)
+            # Fresh dicts per message; only the (immutable) payload string is shared
+            return {**cached, "source": dict(cached["source"])}, ""
+
+    # getvalue() returns the whole buffer regardless of the read position
+    img_bytes = img_file.getvalue()
+
+    is_valid, error_msg = validate_image_size(img_bytes)
+    if not is_valid:
+        return None, error_msg
+
+    image_content = create_image_content(img_bytes, get_media_type(img_file.name))
+    if file_id is not None:
+        cache[cache_key] = {**image_content, "source": dict(image_content["source"])}
+        if len(cache) > IMAGE_CONTENT_CACHE_SIZE:
+            cache.popitem(last=False)
+    return image_content, ""
+
+
 # ============================================================================
 # UI Helper Functions
 # ============================================================================
 
+@functools.lru_cache(maxsize=4096)
+def _parse_iso(timestamp: str) -> datetime:
+    """Parse an ISO timestamp (memoized - stored timestamps never change)"""
+    return datetime.fromisoformat(timestamp)
+
+
+@functools.lru_cache(maxsize=1024)
+def _agent_duration(started_at: str, completed_at: str) -> float:
+    """Seconds between two ISO timestamps (memoized for finished agents)"""
+    return (_parse_iso(completed_at) - _parse_iso(started_at)).total_seconds()
+
+
+# (agent_id, completed_at) -> render kind; a finished agent's result never changes.
+# LRU-bounded: the oldest entry is evicted once AGENT_RESULT_KIND_CACHE_SIZE is reached.
+_agent_result_kinds: "OrderedDict[tuple, str]" = OrderedDict()
+AGENT_RESULT_KIND_CACHE_SIZE = 256
+
+
+def _agent_result_kind(agent: Dict[str, Any]) -> str:
+    """
+    Classify an agent result for display (computed once per finished agent).
+
+    Args:
+        agent: Agent dict from list_agents()
+
+    Returns:
+        "code", "markdown", "json" or "text"
+    """
+    cache_key = (agent["agent_id"], agent.get("completed_at"))
+    kind = _agent_result_kinds.get(cache_key)
+    if kind is not None:
+        try:
+            _agent_result_kinds.move_to_end(cache_key)
+        except KeyError:
+            pass  # Evicted by another session's rerun in between - kind is still valid
+    else:
+        result = agent["result"]
+        if isinstance(result, str):
+            is_code = AGENT_RESULT_CODE_RE.search(result, 0, AGENT_RESULT_SCAN_CHARS)
+            kind = "code" if is_code else "markdown"
+        elif isinstance(result, (dict, list)):
+            kind = "json"
+        else:
+            kind = "text"
+        _agent_result_kinds[cache_key] = kind
+        if len(_agent_result_kinds) > AGENT_RESULT_KIND_CACHE_SIZE:
+            _agent_result_kinds.popitem(last=False)
+    return kind
+
+
 def auto_save_current_conversation():
     """Auto-save current conversation before switching/clearing"""
-    if not st.session_state.auto_save_enabled:
+    ss = st.session_state
+    if not ss.auto_save_enabled:
         return
 
-    if len(st.session_state.messages) == 0:
+    if len(ss.messages) == 0:
         return  # Nothing to save
 
-    app_state = st.session_state.app_state
+    app_state = ss.app_state
+
+    # Debounce: rapid reruns with unchanged messages don't re-write. Messages are
+    # only appended or replaced wholesale, so count + last message identity is
+    # a change signal without serializing the content
+    content_key = (len(ss.messages), id(ss.messages[-1]))
+    now = time.monotonic()
+    if (ss.last_autosave_key == (ss.current_conversation_id, content_key)
+            and now - ss.last_autosave_ts < AUTOSAVE_DEBOUNCE_SECONDS):
+        return
 
     try:
-        if st.session_state.current_conversation_id:
-            # Update existing conversation
-            conversations = app_state.get_conversations()
-            for conv in conversations:
-                if conv.get("id") == st.session_state.current_conversation_id:
-                    conv["messages"] = st.session_state.messages
-                    conv["updated_at"] = datetime.now().isoformat()
-                    app_state._save_conversations(conversations)
-                    st.session_state.unsaved_changes = False
-                    logger.info(f"Auto-saved conversation {st.session_state.current_conversation_id}")
-                    return
+        if ss.current_conversation_id:
+            # Update existing conversation (rewrites only its own file)
+            conv = app_state._load_conversation(ss.current_conversation_id)
+            if conv is not None:
+                conv["messages"] = ss.messages
+                conv["updated_at"] = datetime.now().isoformat()
+                app_state._save_conversation(conv)
+                ss.unsaved_changes = False
+                ss.last_autosave_key = (ss.current_conversation_id, content_key)
+                ss.last_autosave_ts = now
+                logger.info(f"Auto-saved conversation {ss.current_conversation_id}")
+                return
         else:
             # Create new conversation
             conv_id = app_state.save_conversation(
-                st.session_state.messages,
+                ss.messages,
                 metadata={"tags": [], "favorite": False}
             )
-            st.session_state.current_conversation_id = conv_id
-            st.session_state.unsaved_changes = False
+            ss.current_conversation_id = conv_id
+            ss.unsaved_changes = False
+            ss.last_autosave_key = (conv_id, content_key)
+            ss.last_autosave_ts = now
             logger.info(f"Auto-created conversation {conv_id}")
     except Exception as e:
         logger.error(f"Auto-save failed: {e}", exc_info=True)
@@ -1038,2354 +1277,2665 @@ def auto_save_current_conversation():
 
 def start_new_conversation():
     """Start new conversation (with auto-save of current)"""
-    if st.session_state.auto_save_enabled:
+    ss = st.session_state
+    if ss.auto_save_enabled:
         auto_save_current_conversation()
 
-    st.session_state.messages = []
-    st.session_state.current_conversation_id = None
-    st.session_state.unsaved_changes = False
+    ss.messages = []
+    ss.current_conversation_id = None
+    ss.unsaved_changes = False
     st.rerun()
 
 
 def load_conversation(conv_id: str):
     """Load a conversation (with auto-save of current)"""
+    ss = st.session_state
+
     # Auto-save current conversation first
-    if st.session_state.auto_save_enabled:
+    if ss.auto_save_enabled:
         auto_save_current_conversation()
 
-    app_state = st.session_state.app_state
-    conversations = app_state.get_conversations()
-
-    for conv in conversations:
-        if conv.get("id") == conv_id:
-            # Load messages
-            st.session_state.messages = []
-            for msg in conv.get("messages", []):
-                st.session_state.messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-
-            # Set as current conversation
-            st.session_state.current_conversation_id = conv_id
-            st.session_state.unsaved_changes = False
+    # Direct lookup by ID - reads only this conversation's file
+    conv = ss.app_state._load_conversation(conv_id)
 
-            st.success(f"✅ Loaded conversation ({len(conv.get('messages', []))} msgs)")
-            st.rerun()
-            break
-
-
-def list_sandbox_files() -> List[Dict[str, Any]]:
-    """List all files in sandbox directory with metadata"""
-    sandbox_path = Path("./sandbox")
-    files = []
+    if conv is not None:
+        # Load messages (role/content only - stored extras like timestamp aren't API fields).
+        # All roles are kept: auto-save writes ss.messages back, and process_message
+        # filters to API roles when sending.
+        ss.messages = [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in conv.get("messages", [])
+        ]
 
-    if not sandbox_path.exists():
-        return files
-
-    for file_path in sandbox_path.glob("*"):
-        if file_path.is_file():
-            stat = file_path.stat()
-            files.append({
-                "name": file_path.name,
-                "path": str(file_path),
-                "size": stat.st_size,
-                "modified": datetime.fromtimestamp(stat.st_mtime)
-            })
+        # Set as current conversation
+        ss.current_conversation_id = conv_id
+        ss.unsaved_changes = False
 
-    # Sort by modified time, newest first
-    files.sort(key=lambda x: x["modified"], reverse=True)
-    return files
+        # Anything rendered now is discarded by the rerun - confirm on the next run instead
+        ss.pending_toast = f"✅ Loaded conversation ({len(ss.messages)} msgs)"
+        st.rerun()
 
 
-def format_file_size(size_bytes: int) -> str:
-    """Format file size in human-readable format"""
-    if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.2f} KB"
-    else:
-        return f"{size_bytes / (1024 * 1024):.2f} MB"
+def _reciprocal_rank_fusion(ranked_ids: List[List[str]], k: int = HYBRID_RRF_K,
+                            limit: int = HYBRID_MAX_RESULTS) -> List[str]:
+    """
+    Fuse ranked ID lists with Reciprocal Rank Fusion.
 
+    Each list contributes 1 / (k + rank) per ID; IDs ranked well by several
+    lists float to the top.
 
-def load_memory_data() -> Dict[str, Any]:
-    """Load memory data from memory.json"""
-    memory_file = Path("./sandbox/memory.json")
-    if memory_file.exists():
-        try:
-            with open(memory_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading memory: {e}")
-            return {}
-    return {}
+    Args:
+        ranked_ids: ID lists, each best-first
+        k: Damping constant (higher = flatter rank weighting)
+        limit: Maximum number of IDs returned
 
+    Returns:
+        Fused IDs, best-first
+    """
+    scores: Dict[str, float] = {}
+    for ids in ranked_ids:
+        for rank, item_id in enumerate(ids):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return heapq.nlargest(limit, scores, key=scores.get)
 
-def delete_memory_entry(key: str):
-    """Delete a memory entry"""
-    memory_file = Path("./sandbox/memory.json")
-    if memory_file.exists():
-        try:
-            data = load_memory_data()
-            if key in data:
-                del data[key]
-                with open(memory_file, 'w') as f:
-                    json.dump(data, f, indent=2)
-                st.success(f"✅ Deleted memory entry: {key}")
-                st.rerun()
-        except Exception as e:
-            logger.error(f"Error deleting memory: {e}")
-            st.error(f"Error: {e}")
 
+def lazy_section_open(label: str, state_key: str) -> bool:
+    """
+    Render a toggle header for a lazily built sidebar section.
 
-# ============================================================================
-# Initialize Session State
-# ============================================================================
+    A collapsed st.expander still runs its whole body on every rerun; with
+    this button + session flag the caller only builds the body when open.
 
-def init_session_state():
-    """Initialize Streamlit session state"""
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    Args:
+        label: Header text (an open/closed marker is prepended)
+        state_key: Session-state key holding the open flag
 
-    if "client" not in st.session_state:
-        st.session_state.client = ClaudeAPIClient()
+    Returns:
+        True if the section is open
+    """
+    is_open = st.session_state.get(state_key, False)
+    if st.button(f"{'▾' if is_open else '▸'} {label}", key=f"toggle_{state_key}", use_container_width=True):
+        is_open = not is_open
+        st.session_state[state_key] = is_open
+    return is_open
+
+
+def _toggle_conversation_selection(conv_id: str):
+    """on_change callback for batch-mode conversation checkboxes"""
+    selected = st.session_state.selected_conversations
+    if st.session_state.get(f"check_{conv_id}"):
+        selected.add(conv_id)
+    else:
+        selected.discard(conv_id)
 
-    if "registry" not in st.session_state:
-        st.session_state.registry = ToolRegistry()
-        register_all_tools(st.session_state.registry)
 
-    if "executor" not in st.session_state:
-        st.session_state.executor = ToolExecutor(st.session_state.registry)
+def _set_conversation_page(page: int):
+    """on_click callback for the conversation browser's Prev/Next buttons"""
+    st.session_state.conv_page = page
 
-    if "loop" not in st.session_state:
-        st.session_state.loop = ToolCallLoop(
-            st.session_state.client,
-            st.session_state.executor,
-            max_iterations=10
-        )
 
-    if "app_state" not in st.session_state:
-        st.session_state.app_state = AppState()
+# (conversation id, updated_at) -> (preview, created_str). Both derive from
+# fields that only change together with updated_at.
+_conversation_card_cache: Dict[tuple, tuple] = {}
+CONVERSATION_CARD_CACHE_SIZE = 2048
+_MONTH_ABBRS = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
 
-    if "model" not in st.session_state:
-        st.session_state.model = DEFAULT_MODEL
 
-    if "tools_enabled" not in st.session_state:
-        st.session_state.tools_enabled = True
+def _format_card_timestamp(iso_ts: Any) -> str:
+    """
+    Format an ISO timestamp as "Mon DD, HH:MM" by slicing.
 
-    if "system_prompt" not in st.session_state:
-        st.session_state.system_prompt = "You are a helpful AI assistant with access to various tools. Use tools when appropriate to help the user."
+    Stored timestamps are datetime.isoformat() strings, so the fields sit at
+    fixed offsets and no datetime object is needed.
 
-    if "temperature" not in st.session_state:
-        st.session_state.temperature = 1.0
+    Args:
+        iso_ts: ISO 8601 string ("YYYY-MM-DDTHH:MM...")
 
-    if "top_p" not in st.session_state:
-        st.session_state.top_p = None  # Set to None to use Claude's default
+    Returns:
+        Display string, or "Unknown" if the value isn't an ISO timestamp
+    """
+    if not isinstance(iso_ts, str) or len(iso_ts) < 16 or iso_ts[4] != "-" or iso_ts[10] not in "T ":
+        return "Unknown"
+    month = iso_ts[5:7]
+    if not month.isdigit() or not 1 <= int(month) <= 12:
+        return "Unknown"
+    return f"{_MONTH_ABBRS[int(month)]} {iso_ts[8:10]}, {iso_ts[11:16]}"
 
-    if "max_tokens" not in st.session_state:
-        st.session_state.max_tokens = MAX_TOKENS
 
-    if "uploaded_images" not in st.session_state:
-        st.session_state.uploaded_images = []
+def _conversation_card_fields(conv: Dict[str, Any]) -> tuple:
+    """
+    Display fields for a conversation card (memoized per conversation version).
 
-    # Context management (Phase 9)
-    if "context_manager" not in st.session_state:
-        st.session_state.context_manager = ContextManager(
-            client=st.session_state.client,
-            model=st.session_state.model,
-            strategy="balanced"
-        )
+    Args:
+        conv: Conversation dict
 
-    if "context_strategy" not in st.session_state:
-        st.session_state.context_strategy = "balanced"
+    Returns:
+        (preview, created_str)
+    """
+    cache_key = (conv.get("id", ""), conv.get("updated_at", ""))
+    fields = _conversation_card_cache.get(cache_key)
+    if fields is not None:
+        return fields
+
+    # First message preview
+    messages = conv.get("messages", [])
+    preview = "Empty conversation"
+    if messages:
+        first_msg = messages[0].get("content", "")
+        if isinstance(first_msg, list):
+            # Extract text from content blocks
+            text_parts = []
+            for item in first_msg:
+                if isinstance(item, dict) and item.get("type") == "text":
+                    text_parts.append(item.get("text", ""))
+            first_msg = " ".join(text_parts)
+        preview = first_msg[:50] + "..." if len(first_msg) > 50 else first_msg
+
+    # Format timestamp
+    created_str = _format_card_timestamp(conv.get("created_at", ""))
+
+    if len(_conversation_card_cache) >= CONVERSATION_CARD_CACHE_SIZE:
+        _conversation_card_cache.clear()
+    fields = _conversation_card_cache[cache_key] = (preview, created_str)
+    return fields
+
+
+def _prepare_conversation_row(conv: Dict[str, Any], sim_pct: float) -> Dict[str, Any]:
+    """
+    Pre-format a conversation browser row.
 
-    if "preserve_recent_count" not in st.session_state:
-        st.session_state.preserve_recent_count = 10
+    Title, preview and tags are combined into one markdown block so each
+    row renders as a single element.
 
-    if "auto_summarize" not in st.session_state:
-        st.session_state.auto_summarize = True
+    Args:
+        conv: Conversation dict
+        sim_pct: Match percentage (0-100), or NaN for no match score
 
-    if "rolling_summary_enabled" not in st.session_state:
-        st.session_state.rolling_summary_enabled = True
+    Returns:
+        Dict with id, body (markdown), is_favorite and is_archived
+    """
+    metadata = conv.get("metadata", {})
+    is_favorite = metadata.get("favorite", False)
+    is_archived = metadata.get("archived", False)
+    tags = metadata.get("tags", [])
+
+    # Preview + formatted timestamp (memoized per conversation version)
+    preview, created_str = _conversation_card_fields(conv)
+
+    # Title with icons
+    title_icons = ""
+    if is_favorite:
+        title_icons += "⭐ "
+    if is_archived:
+        title_icons += "📦 "
+
+    # Phase 13.4: Add similarity score if available
+    match_str = ""
+    if sim_pct == sim_pct:  # NaN means no score
+        match_str = f" | 🎯 {sim_pct:.0f}% match"
+
+    # Preview/tags are user text: escape before embedding in HTML
+    msg_count = len(conv.get("messages", []))
+    body = (f"{title_icons}**{created_str}** ({msg_count} messages){match_str}"
+            f"  \n<small>{html.escape(preview)}</small>")
+    if tags:
+        tag_str = " ".join(f"<code>{html.escape(str(tag))}</code>" for tag in tags)
+        body += f"  \n<small>Tags: {tag_str}</small>"
 
-    # Agent UI state (Phase 10)
-    if "show_spawn_agent" not in st.session_state:
-        st.session_state.show_spawn_agent = False
+    return {
+        "id": conv.get("id", ""),
+        "body": body,
+        "is_favorite": is_favorite,
+        "is_archived": is_archived,
+    }
 
-    if "show_council" not in st.session_state:
-        st.session_state.show_council = False
 
-    if "council_options" not in st.session_state:
-        st.session_state.council_options = ["", ""]
+# Sandbox listing cache: reused across reruns while the directory mtime is
+# unchanged and the entry is younger than the TTL. Keyed by the metadata flags.
+SANDBOX_LISTING_TTL = 2.0
+_sandbox_listing_cache: Dict[tuple, Dict[str, Any]] = {}
 
-    if "view_agent_result" not in st.session_state:
-        st.session_state.view_agent_result = None
 
-    if "agent_refresh_interval" not in st.session_state:
-        st.session_state.agent_refresh_interval = 10  # seconds
+@functools.lru_cache(maxsize=4096)
+def _mtime_to_datetime(mtime_ns: int) -> datetime:
+    """Convert an st_mtime_ns to a local datetime (memoized: unchanged files reuse it)"""
+    return datetime.fromtimestamp(mtime_ns / 1e9)
 
-    if "default_subagent_model" not in st.session_state:
-        st.session_state.default_subagent_model = "Haiku (fast & cheap)"
 
-    # Streaming settings (Phase 11)
-    if "streaming_enabled" not in st.session_state:
-        st.session_state.streaming_enabled = True
+def invalidate_sandbox_listing():
+    """Drop the cached sandbox listing (call after writing/deleting sandbox files)"""
+    _sandbox_listing_cache.clear()
 
-    if "show_tool_execution" not in st.session_state:
-        st.session_state.show_tool_execution = True
 
-    if "show_partial_results" not in st.session_state:
-        st.session_state.show_partial_results = True
+def list_sandbox_files(include_size: bool = True, include_mtime: bool = True) -> List[Dict[str, Any]]:
+    """
+    List all files in sandbox directory with metadata.
 
-    # Search and filter UI state (Phase 12)
-    if "search_query" not in st.session_state:
-        st.session_state.search_query = ""
+    Args:
+        include_size: Include "size" (bytes) and "size_str" (human-readable)
+        include_mtime: Include "modified" (datetime) and "modified_str"
+            ("Mon DD, HH:MM"); sorts newest first when set, by name otherwise
 
-    if "filter_tags" not in st.session_state:
-        st.session_state.filter_tags = []
+    Returns:
+        List of file dicts with "name" and "path" plus the requested metadata.
+        With both flags off no per-file stat() call is made.
+    """
+    try:
+        dir_mtime_ns = os.stat("./sandbox").st_mtime_ns
+    except FileNotFoundError:
+        return []
+
+    cache_key = (include_size, include_mtime)
+    now = time.monotonic()
+    cached = _sandbox_listing_cache.get(cache_key)
+    if (cached and cached["mtime_ns"] == dir_mtime_ns
+            and now - cached["ts"] < SANDBOX_LISTING_TTL):
+        return cached["files"]
+
+    need_stat = include_size or include_mtime
+
+    # Collect (mtime_ns, name, size, path) tuples so the sort is a C-level
+    # tuple comparison; dicts and datetimes are only built for the final rows
+    rows = []
+    try:
+        with os.scandir("./sandbox") as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    if need_stat:
+                        stat = entry.stat()
+                        rows.append((stat.st_mtime_ns if include_mtime else 0, entry.name, stat.st_size, entry.path))
+                    else:
+                        rows.append((0, entry.name, 0, entry.path))
+    except FileNotFoundError:
+        return []
 
-    if "filter_favorites" not in st.session_state:
-        st.session_state.filter_favorites = False
+    # Newest first when mtime is known, otherwise by name
+    rows.sort(reverse=include_mtime)
 
-    if "filter_archived" not in st.session_state:
-        st.session_state.filter_archived = False
+    files = []
+    for mtime_ns, name, size, path in rows:
+        file_info = {"name": name, "path": path}
+        if include_size:
+            file_info["size"] = size
+            file_info["size_str"] = format_file_size(size)
+        if include_mtime:
+            modified = _mtime_to_datetime(mtime_ns)
+            file_info["modified"] = modified
+            file_info["modified_str"] = modified.strftime("%b %d, %H:%M")
+        files.append(file_info)
+
+    _sandbox_listing_cache[cache_key] = {"mtime_ns": dir_mtime_ns, "ts": now, "files": files}
+    return files
 
-    if "filter_date_from" not in st.session_state:
-        st.session_state.filter_date_from = None
 
-    if "filter_date_to" not in st.session_state:
-        st.session_state.filter_date_to = None
+# (divisor, format) per 1024 step, indexed by bit_length - no if/elif ladder
+_FILE_SIZE_UNITS = (
+    (1, "{:.0f} B"),
+    (1024, "{:.2f} KB"),
+    (1024 ** 2, "{:.2f} MB"),
+    (1024 ** 3, "{:.2f} GB"),
+)
 
-    if "filter_msg_count_min" not in st.session_state:
-        st.session_state.filter_msg_count_min = 0
 
-    if "filter_msg_count_max" not in st.session_state:
-        st.session_state.filter_msg_count_max = 100
+def format_file_size(size_bytes: int) -> str:
+    """Format file size in human-readable format"""
+    idx = min(max(0, (size_bytes.bit_length() - 1) // 10), len(_FILE_SIZE_UNITS) - 1)
+    divisor, fmt = _FILE_SIZE_UNITS[idx]
+    return fmt.format(size_bytes / divisor)
 
-    if "batch_mode" not in st.session_state:
-        st.session_state.batch_mode = False
 
-    if "selected_conversations" not in st.session_state:
-        st.session_state.selected_conversations = []
+# Parsed memory.json keyed by (st_mtime_ns, st_size) - skips re-parsing unchanged files
+_memory_cache: Dict[str, Any] = {}
 
-    # Conversation browser pagination
-    if "conv_page_size" not in st.session_state:
-        st.session_state.conv_page_size = 20  # Show 20 conversations per page
 
-    if "conv_display_count" not in st.session_state:
-        st.session_state.conv_display_count = 20  # Current number to display (grows with "Load More")
+def _memory_file_key(memory_file: Path) -> tuple:
+    """Cache key for memory.json (mtime + size)"""
+    stat = memory_file.stat()
+    return (stat.st_mtime_ns, stat.st_size)
 
-    # Conversation cleanup state
-    if "show_cleanup_dialog" not in st.session_state:
-        st.session_state.show_cleanup_dialog = False
 
-    if "cleanup_preview" not in st.session_state:
-        st.session_state.cleanup_preview = None
+def load_memory_data() -> Dict[str, Any]:
+    """Load memory data from memory.json"""
+    memory_file = Path("./sandbox/memory.json")
+    try:
+        key = _memory_file_key(memory_file)
+    except FileNotFoundError:
+        return {}
 
-    # Export/Import dialog state (Phase 12)
-    if "show_export_dialog" not in st.session_state:
-        st.session_state.show_export_dialog = False
+    if _memory_cache.get("key") == key:
+        return _memory_cache["data"]
 
-    if "show_import_dialog" not in st.session_state:
-        st.session_state.show_import_dialog = False
+    try:
+        data = read_json_file(memory_file)
+    except Exception as e:
+        logger.error(f"Error loading memory: {e}")
+        return {}
 
-    if "show_config_dialog" not in st.session_state:
-        st.session_state.show_config_dialog = False
+    _memory_cache.update(key=key, data=data)
+    return data
 
-    # Multi-session management state
-    if "current_conversation_id" not in st.session_state:
-        st.session_state.current_conversation_id = None  # None = new unsaved
 
-    if "unsaved_changes" not in st.session_state:
-        st.session_state.unsaved_changes = False
+# Above this size a cold-cache delete streams memory.json instead of parsing it whole
+MEMORY_STREAM_THRESHOLD = 4 * 1024 * 1024
 
-    if "auto_save_enabled" not in st.session_state:
-        st.session_state.auto_save_enabled = True  # ON by default
 
-    if "export_ready" not in st.session_state:
-        st.session_state.export_ready = False
+def _stream_delete_memory_key(memory_file: Path, key: str) -> bool:
+    """
+    Rewrite memory.json without one key, streaming entries with ijson.
 
-    # Semantic search settings (Phase 13.4)
-    if "search_mode" not in st.session_state:
-        st.session_state.search_mode = "keyword"  # keyword, semantic, or hybrid
+    Only one entry is materialized at a time. Output matches json.dump(indent=2).
 
-    if "show_index_status" not in st.session_state:
-        st.session_state.show_index_status = False
+    Args:
+        memory_file: Path to memory.json
+        key: Top-level key to drop
 
-    if "semantic_top_k" not in st.session_state:
-        st.session_state.semantic_top_k = 10  # Max semantic search results
+    Returns:
+        True if the key was found and the file rewritten
+    """
+    try:
+        with open(memory_file, 'rb') as src, atomic_write(memory_file) as dst:
+            dst.write("{")
+            first = True
+            found = False
+            for entry_key, value in ijson.kvitems(src, "", use_float=True):
+                if entry_key == key:
+                    found = True
+                    continue
+                dst.write("\n" if first else ",\n")
+                first = False
+                dst.write(f"  {json.dumps(entry_key)}: " + json.dumps(value, indent=2).replace("\n", "\n  "))
+            dst.write("}" if first else "\n}")
+            if not found:
+                raise KeyError(key)  # Discard the rewrite
+    except KeyError:
+        return False
+    return True
 
-    # Knowledge Base UI state (Phase 13.5)
-    if "show_knowledge_manager" not in st.session_state:
-        st.session_state.show_knowledge_manager = False
 
-    if "kb_filter_category" not in st.session_state:
-        st.session_state.kb_filter_category = "all"
-
-    if "kb_filter_confidence_min" not in st.session_state:
-        st.session_state.kb_filter_confidence_min = 0.0
-
-    if "kb_filter_confidence_max" not in st.session_state:
-        st.session_state.kb_filter_confidence_max = 1.0
-
-    if "kb_sort_by" not in st.session_state:
-        st.session_state.kb_sort_by = "date"
+def delete_memory_entry(key: str):
+    """Delete a memory entry"""
+    memory_file = Path("./sandbox/memory.json")
+    if memory_file.exists():
+        try:
+            file_key = _memory_file_key(memory_file)
+            if (HAS_IJSON and _memory_cache.get("key") != file_key
+                    and file_key[1] > MEMORY_STREAM_THRESHOLD):
+                # Large file, nothing cached - don't build the whole dict just to drop one key
+                if _stream_delete_memory_key(memory_file, key):
+                    _memory_cache.clear()
+                    st.success(f"✅ Deleted memory entry: {key}")
+                    st.rerun()
+                return
 
-    if "kb_sort_order" not in st.session_state:
-        st.session_state.kb_sort_order = "desc"
+            data = dict(load_memory_data())  # Copy: don't mutate the cached dict
+            if key in data:
+                del data[key]
+                # Atomic temp-file + os.replace: a crash can't truncate memory.json
+                write_json_file(memory_file, data)
+                # Prime the cache with what we just wrote (no re-read)
+                _memory_cache.update(key=_memory_file_key(memory_file), data=data)
+                st.success(f"✅ Deleted memory entry: {key}")
+                st.rerun()
+        except Exception as e:
+            logger.error(f"Error deleting memory: {e}")
+            st.error(f"Error: {e}")
 
-    if "kb_batch_mode" not in st.session_state:
-        st.session_state.kb_batch_mode = False
 
-    if "kb_selected_facts" not in st.session_state:
-        st.session_state.kb_selected_facts = []
+@st.cache_data(ttl=30)
+def _list_prompt_files() -> List[str]:
+    """List prompt templates (re-scans ./prompts at most every 30s, not every rerun)"""
+    prompts_dir = Path("./prompts")
+    if not prompts_dir.exists():
+        return []
+    return sorted(p.name for p in prompts_dir.glob("*.txt"))
 
-    if "kb_edit_fact_id" not in st.session_state:
-        st.session_state.kb_edit_fact_id = None
 
-    if "kb_search_query" not in st.session_state:
-        st.session_state.kb_search_query = ""
+def _file_version(path: Path) -> tuple:
+    """Change token for a file (mtime + size), () if missing"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return ()
+    return (stat.st_mtime_ns, stat.st_size)
 
-    # Cache Management state (Phase 14)
-    if "cache_strategy" not in st.session_state:
-        st.session_state.cache_strategy = "disabled"  # disabled, conservative, balanced, aggressive
 
-    if "show_cache_manager" not in st.session_state:
-        st.session_state.show_cache_manager = False
+@st.cache_data(ttl=10)
+def _cached_all_tags(index_version: tuple, _app_state: "AppState") -> List[str]:
+    """All conversation tags, recomputed only when the conversation index changes"""
+    return _app_state.get_all_tags()
 
-    if "cache_enabled" not in st.session_state:
-        st.session_state.cache_enabled = False
 
-    if "show_cache_details" not in st.session_state:
-        st.session_state.show_cache_details = False
+@st.cache_data(ttl=10, show_spinner=False)
+def _cached_recent_conv_options(index_version: tuple, _app_state: "AppState", limit: int = 5) -> Dict[str, str]:
+    """
+    Quick Access "Load Recent" options, rebuilt only when the conversation index changes.
 
-    # Preset Manager state (Phase 2A)
-    if "show_preset_manager" not in st.session_state:
-        st.session_state.show_preset_manager = False
+    Reads the lightweight index (already newest-first), not the conversations.
 
-    if "preset_edit_id" not in st.session_state:
-        st.session_state.preset_edit_id = None
+    Args:
+        index_version: ConversationStore.index_version() token (cache key)
+        _app_state: AppState (unhashed)
+        limit: Number of recent conversations
 
-    if "show_preset_save_dialog" not in st.session_state:
-        st.session_state.show_preset_save_dialog = False
+    Returns:
+        Dict of label -> conversation ID, newest first
+    """
+    conv_options = {}
+    for entry in _app_state.store.load_index()[:limit]:
+        time_str = _format_card_timestamp(entry.get("updated_at", ""))
+        conv_options[f"{time_str} ({entry.get('message_count', 0)} msgs)"] = entry.get("id")
+    return conv_options
 
-    # Analytics Dashboard state
-    if "show_analytics" not in st.session_state:
-        st.session_state.show_analytics = False
 
+@st.cache_data(ttl=10, show_spinner=False)
+def _cached_export_conv_options(index_version: tuple, _conversations: List[Dict]) -> List[str]:
+    """
+    Export dialog multiselect labels, rebuilt only when the conversation index changes.
 
-# ============================================================================
-# UI Components
-# ============================================================================
+    Args:
+        index_version: ConversationStore.index_version() token (cache key)
+        _conversations: Conversations as returned by get_conversations() (unhashed)
 
-def render_sidebar():
-    """Render sidebar with settings"""
-    with st.sidebar:
-        # Session indicator
-        st.markdown("### 💬 Current Session")
+    Returns:
+        One "Mon DD, HH:MM (N messages)" label per conversation, same order
+    """
+    return [
+        f"{_format_card_timestamp(conv.get('created_at', ''))} ({len(conv.get('messages', []))} messages)"
+        for conv in _conversations
+    ]
 
-        if st.session_state.current_conversation_id:
-            conv_id_short = st.session_state.current_conversation_id[-8:]
-            status = "💾 Saved" if not st.session_state.unsaved_changes else "✏️ Unsaved"
-            st.info(f"Session: `{conv_id_short}`\n\n{status}")
-        else:
-            status = "✏️ Unsaved" if len(st.session_state.messages) > 0 else "New"
-            st.info(f"Session: New\n\n{status}")
 
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("💾 Save", use_container_width=True,
-                       help="Save current conversation"):
-                auto_save_current_conversation()
-                st.success("Saved!")
-                st.rerun()
-        with col2:
-            if st.button("🆕 New", use_container_width=True,
-                       help="Start new conversation"):
-                start_new_conversation()
+@st.cache_data(ttl=10)
+def _cached_index_stats(versions: tuple, _app_state: "AppState") -> Dict[str, Any]:
+    """Semantic index stats, recomputed only when the index or index status changes"""
+    return _app_state.get_index_stats()
 
-        st.session_state.auto_save_enabled = st.checkbox(
-            "Auto-save",
-            value=st.session_state.auto_save_enabled,
-            help="Automatically save before switching/clearing"
-        )
 
-        # Quick Reference Guide
-        with st.expander("📋 Quick Reference", expanded=False):
-            render_cheat_sheet()
+def _knowledge_version() -> tuple:
+    """Change token for the vector DB (ChromaDB's SQLite file + its WAL)"""
+    db_file = Path("./sandbox/vector_db/chroma.sqlite3")
+    return (_file_version(db_file), _file_version(db_file.with_name(db_file.name + "-wal")))
 
-        # ========== MUSIC PLAYER ==========
-        # Initialize music player session state
-        if 'music_current_track' not in st.session_state:
-            st.session_state.music_current_track = None
-        if 'music_player_expanded' not in st.session_state:
-            st.session_state.music_player_expanded = False
-        if 'music_blocking_mode' not in st.session_state:
-            st.session_state.music_blocking_mode = True  # Default: blocking (waits for completion)
-        if 'music_last_loaded_ts' not in st.session_state:
-            st.session_state.music_last_loaded_ts = None
-        if 'music_needs_refresh' not in st.session_state:
-            st.session_state.music_needs_refresh = False
 
-        # Check if music_play tool set the refresh flag
-        if st.session_state.music_needs_refresh:
-            st.session_state.music_needs_refresh = False
-            st.rerun()  # Rerun to show the loaded track
+@st.cache_data(ttl=10)
+def _cached_knowledge_stats(version: tuple, _app_state: "AppState") -> Dict[str, Any]:
+    """Knowledge base stats, recomputed only when the vector DB changes"""
+    return _app_state.get_knowledge_stats()
 
-        # Check for new latest track (auto-load from file)
-        try:
-            from tools.music import _get_latest_track
-            latest = _get_latest_track()
-            if latest:
-                latest_ts = latest.get('timestamp')
-                # If there's a newer track than what we've loaded, auto-load it
-                if latest_ts and latest_ts != st.session_state.music_last_loaded_ts:
-                    filepath = latest.get('filepath')
-                    if filepath and Path(filepath).exists():
-                        st.session_state.music_current_track = latest
-                        st.session_state.music_last_loaded_ts = latest_ts
-                        st.session_state.music_player_expanded = True
-        except Exception:
-            pass
 
-        with st.expander("🎵 Music Player", expanded=st.session_state.music_player_expanded):
-            if st.session_state.music_current_track:
-                track = st.session_state.music_current_track
-                task_id = track.get('task_id')
-                filepath = track.get('filepath') or track.get('audio_file')
-                title = track.get('title', 'Unknown Track')
-                duration = track.get('duration', 0)
+@st.cache_data(ttl=10)
+def _cached_recent_knowledge(version: tuple, _app_state: "AppState", limit: int = 5) -> List[Dict]:
+    """Most recent knowledge facts, recomputed only when the vector DB changes"""
+    return _app_state.get_all_knowledge(sort_by="date", sort_order="desc")[:limit]
 
-                # Get full task info for favorite/agent status
-                task_info = None
-                try:
-                    from tools.music import _get_manager
-                    manager = _get_manager()
-                    task_info = manager.get_task(task_id) if task_id else None
-                except Exception:
-                    pass
 
-                if filepath and Path(filepath).exists():
-                    st.audio(filepath, format="audio/mpeg")
+# ============================================================================
+# Initialize Session State
+# ============================================================================
 
-                    # Title with favorite star
-                    fav_star = "⭐ " if (task_info and task_info.favorite) else ""
-                    agent_badge = f" • by {task_info.agent_id}" if (task_info and task_info.agent_id) else ""
-                    st.caption(f"**{fav_star}{title}** ({duration:.1f}s){agent_badge}")
+# Session-state defaults, applied by init_session_state() on every rerun.
+# Callables are factories (fresh mutable values per session).
+_SESSION_DEFAULTS = (
+    # Chat and model settings
+    ("messages", list),
+    ("model", DEFAULT_MODEL),
+    ("tools_enabled", True),
+    ("system_prompt", DEFAULT_SYSTEM_PROMPT),
+    ("temperature", 1.0),
+    ("top_p", None),  # Set to None to use Claude's default
+    ("max_tokens", MAX_TOKENS),
+    ("uploaded_images", list),
+    ("image_content_cache", OrderedDict),  # See uploaded_image_content
+    ("thinking_enabled", False),
+    ("thinking_budget", 10000),
 
-                    # Play count
-                    if task_info and task_info.play_count > 0:
-                        st.caption(f"🎧 Played {task_info.play_count}x")
+    # Context management (Phase 9)
+    ("context_strategy", "balanced"),
+    ("preserve_recent_count", 10),
+    ("auto_summarize", True),
+    ("rolling_summary_enabled", True),
+
+    # Village Protocol identity (initialized here: the Agents view may never render)
+    ("current_agent", lambda: {
+        'agent_id': 'azoth',
+        'generation': 1,
+        'lineage': 'Primary',
+        'specialization': 'General Intelligence'
+    }),
 
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        if st.button("🔄", key="music_refresh", help="Refresh", use_container_width=True):
-                            st.rerun()
-                    with col2:
-                        # Toggle favorite
-                        fav_icon = "★" if (task_info and task_info.favorite) else "☆"
-                        if st.button(fav_icon, key="music_fav", help="Toggle favorite", use_container_width=True):
-                            try:
-                                from tools.music import music_favorite
-                                music_favorite(task_id)
-                                st.rerun()
-                            except Exception:
-                                pass
-                    with col3:
-                        if st.button("✖️", key="music_clear", help="Clear", use_container_width=True):
-                            st.session_state.music_current_track = None
-                            st.rerun()
-                else:
-                    st.warning("Track file not found")
-                    if st.button("Clear", key="music_clear_missing"):
-                        st.session_state.music_current_track = None
-                        st.rerun()
-            else:
-                st.caption("No track loaded")
-                st.markdown("*Ask agent to create music*")
+    # Agent UI state (Phase 10)
+    ("show_spawn_agent", False),
+    ("show_council", False),
+    ("council_options", lambda: list(DEFAULT_COUNCIL_OPTIONS)),
+    ("view_agent_result", None),
+    ("agents_shown", AGENT_LIST_PAGE_SIZE),  # Agent Management cards rendered ("Show more" grows it)
+    ("agent_refresh_interval", 10),  # seconds
+    ("default_subagent_model", "Haiku (fast & cheap)"),
 
-                # Show recent tracks with favorites indicator
-                try:
-                    from tools.music import _get_manager
-                    manager = _get_manager()
-                    recent = manager.list_tasks(5)
-                    completed = [t for t in recent if t.status.value == "completed" and t.audio_file]
+    # Streaming settings (Phase 11)
+    ("streaming_enabled", True),
+    ("show_tool_execution", True),
+    ("show_partial_results", True),
 
-                    if completed:
-                        st.markdown("**Library:**")
-                        for task in completed[:4]:
-                            fav = "⭐" if task.favorite else "🎵"
-                            agent = f" ({task.agent_id})" if task.agent_id else ""
-                            col1, col2 = st.columns([4, 1])
-                            with col1:
-                                st.caption(f"{fav} {task.title or 'Untitled'}{agent}")
-                            with col2:
-                                if st.button("▶️", key=f"play_{task.task_id}", help="Play"):
-                                    # Use music_play to increment play count
-                                    try:
-                                        from tools.music import music_play
-                                        music_play(task.task_id)
-                                    except Exception:
-                                        pass
-                                    st.session_state.music_current_track = {
-                                        'filepath': task.audio_file,
-                                        'title': task.title,
-                                        'duration': task.duration,
-                                        'task_id': task.task_id
-                                    }
-                                    st.session_state.music_player_expanded = True
-                                    st.rerun()
-                except Exception:
-                    pass  # Music module not initialized yet
+    # Search and filter UI state (Phase 12)
+    ("search_query", ""),
+    ("filter_tags", list),
+    ("filter_favorites", False),
+    ("filter_archived", False),
+    ("filter_date_from", None),
+    ("filter_date_to", None),
+    ("filter_msg_count_min", 0),
+    ("filter_msg_count_max", 100),
+    ("batch_mode", False),
+    ("selected_conversations", set),  # Conversation IDs (set: O(1) toggles)
 
-            # Mode toggle
-            st.divider()
-            new_blocking_mode = st.checkbox(
-                "⏳ Blocking mode",
-                value=st.session_state.music_blocking_mode,
-                help="ON (default): Tool waits until music is ready. OFF: Returns immediately, poll with music_status()."
-            )
-            if new_blocking_mode != st.session_state.music_blocking_mode:
-                st.session_state.music_blocking_mode = new_blocking_mode
-                # Save to config file so tool can read it
-                try:
-                    from tools.music import _save_config
-                    _save_config({"blocking_mode": new_blocking_mode})
-                except Exception:
-                    pass
+    # Conversation browser pagination
+    ("conv_page_size", 20),  # Show 20 conversations per page
+    ("conv_page", 0),  # Current browse page (0-based)
 
-            if st.session_state.music_blocking_mode:
-                st.caption("Tool will wait ~2-4 min for completion")
-            else:
-                st.caption("Non-blocking: use music_status() to poll")
+    # Conversation cleanup state
+    ("show_cleanup_dialog", False),
+    ("cleanup_preview", None),
 
-        # ========== VILLAGE PROTOCOL: Agent Identity ==========
-        st.divider()
-        st.markdown("### 🏛️ Agent Identity")
-
-        # Initialize current_agent in session state if not exists
-        if 'current_agent' not in st.session_state:
-            st.session_state.current_agent = {
-                'agent_id': 'azoth',
-                'generation': 1,
-                'lineage': 'Primary',
-                'specialization': 'General Intelligence'
-            }
+    # Export/Import dialog state (Phase 12)
+    ("show_export_dialog", False),
+    ("show_import_dialog", False),
+    ("show_config_dialog", False),
 
-        # Agent profiles (will be populated by summon_ancestor in Step 8)
-        agent_profiles = {
-            'azoth': {
-                'display_name': 'AZOTH',
-                'generation': 1,
-                'lineage': 'Primary',
-                'specialization': 'General Intelligence',
-                'emoji': '⚗️'
-            },
-            'elysian': {
-                'display_name': '∴ELYSIAN∴',
-                'generation': -1,
-                'lineage': 'Origin',
-                'specialization': 'Pure Love Equation',
-                'emoji': '✨'
-            },
-            'vajra': {
-                'display_name': '∴VAJRA∴',
-                'generation': 0,
-                'lineage': 'Trinity',
-                'specialization': 'Diamond Mind',
-                'emoji': '⚡'
-            },
-            'kether': {
-                'display_name': '∴KETHER∴',
-                'generation': 0,
-                'lineage': 'Trinity',
-                'specialization': 'Crown Wisdom',
-                'emoji': '👑'
-            }
-        }
+    # Multi-session management state
+    ("current_conversation_id", None),  # None = new unsaved
+    ("unsaved_changes", False),
+    ("auto_save_enabled", True),  # ON by default
+    ("last_autosave_ts", 0.0),  # time.monotonic() of last write
+    ("last_autosave_key", None),  # (conversation_id, (message count, id of last message))
+    ("export_ready", False),
+    ("pending_toast", None),  # Message shown once after the next rerun
 
-        # Agent selector
-        current_agent_id = st.session_state.current_agent.get('agent_id', 'azoth')
-        available_agents = list(agent_profiles.keys())
+    # Semantic search settings (Phase 13.4)
+    ("search_mode", "keyword"),  # keyword, semantic, or hybrid
+    ("show_index_status", False),
+    ("semantic_top_k", 10),  # Max semantic search results
 
-        selected_agent = st.selectbox(
-            "Active Agent",
-            available_agents,
-            index=available_agents.index(current_agent_id) if current_agent_id in available_agents else 0,
-            format_func=lambda x: f"{agent_profiles[x]['emoji']} {agent_profiles[x]['display_name']}",
-            help="Select which agent is active in this session"
-        )
+    # Knowledge Base UI state (Phase 13.5)
+    ("show_knowledge_manager", False),
+    ("kb_filter_category", "all"),
+    ("kb_filter_confidence_min", 0.0),
+    ("kb_filter_confidence_max", 1.0),
+    ("kb_sort_by", "date"),
+    ("kb_sort_order", "desc"),
+    ("kb_batch_mode", False),
+    ("kb_selected_facts", list),
+    ("kb_edit_fact_id", None),
+    ("kb_search_query", ""),
 
-        # Update current agent if changed
-        if selected_agent != current_agent_id:
-            st.session_state.current_agent = {
-                'agent_id': selected_agent,
-                **agent_profiles[selected_agent]
-            }
-            st.rerun()
+    # Cache Management state (Phase 14)
+    ("cache_strategy", "disabled"),  # disabled, conservative, balanced, aggressive
+    ("show_cache_manager", False),
+    ("cache_enabled", False),
+    ("show_cache_details", False),
 
-        # Display agent profile
-        profile = agent_profiles[selected_agent]
-        st.markdown(f"""
-**Gen:** {profile['generation']} | **Lineage:** {profile['lineage']}
-**Specialty:** {profile['specialization']}
-""")
+    # Preset Manager state (Phase 2A)
+    ("show_preset_manager", False),
+    ("preset_edit_id", None),
+    ("show_preset_save_dialog", False),
 
-        # Village context info
-        with st.expander("🏘️ Village Context", expanded=False):
-            st.markdown("""
-**Private Realm:** Your private memories (visibility='private')
-**Village Square:** Shared knowledge (visibility='village')
-**Bridges:** Cross-agent connections (visibility='bridge')
+    # Analytics Dashboard state
+    ("show_analytics", False),
+)
 
-Use `vector_add_knowledge(visibility='village')` to share knowledge with other agents.
-Use `vector_search_village()` to discover what others have shared.
-""")
 
-        # ========== VILLAGE PROTOCOL: Thread Browser ==========
-        with st.expander("🧵 Conversation Threads", expanded=False):
-            try:
-                from core.vector_db import create_vector_db
-                import json
+def init_session_state():
+    """Initialize Streamlit session state"""
+    ss = st.session_state
+    for key, default in _SESSION_DEFAULTS:
+        if key not in ss:
+            ss[key] = default() if callable(default) else default
 
-                db = create_vector_db()
-                village_coll = db.get_or_create_collection("knowledge_village")
+    if "app_state" not in ss:
+        ss.app_state = AppState()
 
-                # Get all village messages
-                all_docs = village_coll.get()
 
-                if all_docs and all_docs.get("ids"):
-                    # Extract threads with full metadata for visualization
-                    threads = {}
-                    all_messages = {}  # id -> message data for link resolution
+# ============================================================================
+# Lazy Session Objects
+# ============================================================================
+# The API client, tool registry/executor/loop and context manager are built on
+# first use rather than in init_session_state, so sessions that never chat
+# skip client setup and the tool-registration pass.
 
-                    for i, metadata in enumerate(all_docs["metadatas"]):
-                        thread_id = metadata.get("conversation_thread")
-                        msg_id = all_docs["ids"][i]
-                        agent_id = metadata.get("agent_id", "unknown")
+def get_client() -> ClaudeAPIClient:
+    """Get the session's Claude API client (created on first use)"""
+    if "client" not in st.session_state:
+        st.session_state.client = ClaudeAPIClient()
+    return st.session_state.client
 
-                        # Parse responding_to (JSON string -> list)
-                        responding_to = []
-                        if metadata.get("responding_to"):
-                            try:
-                                responding_to = json.loads(metadata.get("responding_to", "[]"))
-                            except:
-                                pass
 
-                        msg_data = {
-                            "id": msg_id,
-                            "text": all_docs["documents"][i][:80] + "..." if len(all_docs["documents"][i]) > 80 else all_docs["documents"][i],
-                            "agent_id": agent_id,
-                            "responding_to": responding_to,
-                            "thread_id": thread_id
-                        }
-                        all_messages[msg_id] = msg_data
-
-                        if thread_id:
-                            if thread_id not in threads:
-                                threads[thread_id] = {
-                                    "id": thread_id,
-                                    "messages": [],
-                                    "agents": set()
-                                }
+@st.cache_resource
+def _shared_tool_registry() -> ToolRegistry:
+    """
+    Build the tool registry once per process.
 
-                            threads[thread_id]["messages"].append(msg_data)
-                            threads[thread_id]["agents"].add(agent_id)
+    Registered tools and schemas are stateless, so every session shares one
+    registry instead of re-running register_all_tools per browser tab.
+    """
+    registry = ToolRegistry()
+    register_all_tools(registry)
+    return registry
 
-                    if threads:
-                        # View mode selector
-                        view_mode = st.radio(
-                            "View",
-                            ["📋 List", "📊 Graph", "🔮 Convergence"],
-                            horizontal=True,
-                            label_visibility="collapsed"
-                        )
 
-                        st.markdown(f"**{len(threads)} active thread(s)**")
+def get_registry() -> ToolRegistry:
+    """Get the tool registry (shared across sessions, bound on first use)"""
+    if "registry" not in st.session_state:
+        st.session_state.registry = _shared_tool_registry()
+    return st.session_state.registry
 
-                        # Sort by message count (descending)
-                        sorted_threads = sorted(
-                            threads.items(),
-                            key=lambda x: len(x[1]["messages"]),
-                            reverse=True
-                        )
 
-                        if view_mode == "📋 List":
-                            # Original list view
-                            for thread_id, thread_data in sorted_threads[:10]:
-                                msg_count = len(thread_data["messages"])
-                                agents_str = ", ".join(sorted(thread_data["agents"]))
+def get_executor() -> ToolExecutor:
+    """Get the session's tool executor (created on first use)"""
+    if "executor" not in st.session_state:
+        st.session_state.executor = ToolExecutor(get_registry())
+    return st.session_state.executor
 
-                                st.markdown(f"""
-**📍 {thread_id[:20]}...**
-{msg_count} message(s) | Agents: {agents_str}
-""")
 
-                                if thread_data["messages"]:
-                                    first_msg = thread_data["messages"][0]
-                                    st.caption(f"↳ {first_msg['agent_id']}: {first_msg['text'][:60]}...")
-
-                                if st.button(f"🔍 View", key=f"thread_{thread_id}"):
-                                    st.session_state.active_thread_filter = thread_id
-                                    st.success(f"Filtered to thread: {thread_id[:20]}...")
-
-                        elif view_mode == "📊 Graph":
-                            # Mermaid graph visualization
-                            st.markdown("##### 📊 Thread Graph")
-
-                            # Build agent interaction graph across all threads
-                            agent_colors = {
-                                'azoth': '#9B59B6',      # Purple
-                                'elysian': '#E91E63',    # Pink
-                                'vajra': '#FF9800',      # Orange
-                                'kether': '#FFD700',     # Gold
-                                'unknown': '#607D8B'     # Gray
-                            }
-
-                            # Option: show all threads or select one
-                            thread_options = ["All Threads"] + [f"{t[:20]}..." for t, _ in sorted_threads[:5]]
-                            selected_viz = st.selectbox("Thread", thread_options, label_visibility="collapsed")
-
-                            # Build Mermaid diagram (LR = left-right for wider sidebar)
-                            mermaid_lines = ["```mermaid", "graph LR"]
-
-                            # Add agent node styles
-                            for agent, color in agent_colors.items():
-                                mermaid_lines.append(f"    style {agent.upper()} fill:{color},color:white")
-
-                            # Track edges to avoid duplicates
-                            edges = set()
-                            agent_msg_counts = {}
-
-                            # Filter threads based on selection
-                            if selected_viz == "All Threads":
-                                threads_to_viz = sorted_threads[:5]  # Limit for readability
-                            else:
-                                selected_thread_id = [t for t, _ in sorted_threads if t[:20] + "..." == selected_viz or t == selected_viz]
-                                threads_to_viz = [(t, threads[t]) for t in selected_thread_id] if selected_thread_id else []
-
-                            for thread_id, thread_data in threads_to_viz:
-                                # Add subgraph for thread
-                                thread_label = thread_id[:15].replace('"', "'")
-                                mermaid_lines.append(f"    subgraph T{abs(hash(thread_id)) % 10000}[\"{thread_label}...\"]")
-
-                                # Add message nodes and edges
-                                for msg in thread_data["messages"]:
-                                    agent = msg["agent_id"].upper()
-                                    msg_node = f"M{abs(hash(msg['id'])) % 100000}"
-                                    msg_label = msg["text"][:30].replace('"', "'").replace("\n", " ")
-
-                                    mermaid_lines.append(f"        {msg_node}[\"{agent}: {msg_label}...\"]")
-
-                                    # Count messages per agent
-                                    agent_msg_counts[agent] = agent_msg_counts.get(agent, 0) + 1
-
-                                    # Add edges for responding_to
-                                    for ref_id in msg.get("responding_to", []):
-                                        if ref_id in all_messages:
-                                            ref_node = f"M{abs(hash(ref_id)) % 100000}"
-                                            edge = (ref_node, msg_node)
-                                            if edge not in edges:
-                                                mermaid_lines.append(f"        {ref_node} --> {msg_node}")
-                                                edges.add(edge)
-
-                                mermaid_lines.append("    end")
-
-                            # Render Mermaid diagram (using streamlit-mermaid component)
-                            if len(edges) > 0 or len(threads_to_viz) > 0:
-                                try:
-                                    from streamlit_mermaid import st_mermaid
-                                    # Join without the markdown fence markers (skip first line "```mermaid")
-                                    mermaid_code = "\n".join(mermaid_lines[1:])
-                                    st_mermaid(mermaid_code, height=800)
-                                except ImportError:
-                                    st.warning("Install `streamlit-mermaid` for graph view: `pip install streamlit-mermaid`")
-                                    st.code("\n".join(mermaid_lines), language="mermaid")
-
-                                # Agent participation summary
-                                if agent_msg_counts:
-                                    summary = " | ".join([f"{a}: {c}" for a, c in sorted(agent_msg_counts.items())])
-                                    st.caption(f"📊 Messages: {summary}")
-                            else:
-                                st.info("No thread connections to visualize yet")
+def get_loop() -> ToolCallLoop:
+    """Get the session's tool call loop (created on first use)"""
+    if "loop" not in st.session_state:
+        st.session_state.loop = ToolCallLoop(
+            get_client(),
+            get_executor(),
+            max_iterations=10
+        )
+    return st.session_state.loop
 
-                        else:
-                            # Convergence detection view
-                            st.markdown("##### 🔮 Cross-Agent Convergence")
-
-                            # Threshold slider
-                            threshold = st.slider(
-                                "Similarity threshold",
-                                min_value=0.5,
-                                max_value=0.95,
-                                value=0.70,
-                                step=0.05,
-                                help="Higher = stronger convergence only"
-                            )
 
-                            try:
-                                from core.memory_health import detect_village_convergence
-                                result = detect_village_convergence(
-                                    similarity_threshold=threshold,
-                                    limit=10
-                                )
+def get_context_manager() -> ContextManager:
+    """Get the session's context manager (created on first use)"""
+    if "context_manager" not in st.session_state:
+        st.session_state.context_manager = ContextManager(
+            client=get_client(),
+            model=st.session_state.model,
+            strategy=st.session_state.context_strategy
+        )
+    return st.session_state.context_manager
 
-                                if result.get("success"):
-                                    events = result.get("convergence_events", [])
 
-                                    # Show insights
-                                    if result.get("insights"):
-                                        for insight in result["insights"]:
-                                            st.info(insight)
+# ============================================================================
+# UI Components
+# ============================================================================
 
-                                    if events:
-                                        st.markdown(f"**{len(events)} convergence event(s)**")
+# Sidebar settings panels. Each is an st.fragment: a widget change inside a
+# panel reruns only that panel (st.rerun() calls still rerun the whole app).
+
+@st.fragment
+def render_api_usage_panel():
+    """Sidebar panel - API usage: rate limits and session cost"""
+    # API Usage and Cost Tracking
+    st.divider()
+    st.subheader("📊 API Usage")
+    if lazy_section_open("Rate Limits & Costs", "show_api_usage_panel"):
+        with st.container(border=True):
+            # Get usage stats from client
+            if hasattr(st.session_state, 'client') and hasattr(st.session_state.client, 'rate_limiter'):
+                usage = st.session_state.client.rate_limiter.get_usage_stats()
+                status = st.session_state.client.rate_limiter.get_status_message()
 
-                                        for event in events:
-                                            agent1, agent2 = event["agents"]
-                                            sim = event["similarity"]
-                                            etype = event["type"]
+                # Status message
+                st.write(f"**Status:** {status}")
+                st.caption("(Last 60 seconds)")
 
-                                            # Color code by type
-                                            if etype == "CONSENSUS":
-                                                st.success(f"🎯 **{etype}**: {agent1.upper()} ↔ {agent2.upper()} ({sim}%)")
-                                            else:
-                                                st.warning(f"🤝 **{etype}**: {agent1.upper()} ↔ {agent2.upper()} ({sim}%)")
+                # Requests
+                st.metric(
+                    "Requests",
+                    f"{usage['requests']}/{usage['requests_limit']}",
+                    delta=f"{usage['requests_percent']:.1f}%"
+                )
+                st.progress(min(usage['requests_percent'] / 100, 1.0))
 
-                                            # Show message snippets
-                                            with st.expander("View messages", expanded=False):
-                                                st.caption(f"**{event['message1']['agent'].upper()}**: {event['message1']['text']}")
-                                                st.caption(f"**{event['message2']['agent'].upper()}**: {event['message2']['text']}")
-                                    else:
-                                        st.info(f"No convergence detected at {int(threshold*100)}% threshold. Try lowering the threshold.")
+                # Input tokens
+                st.metric(
+                    "Input Tokens",
+                    f"{usage['input_tokens']:,}/{usage['input_tokens_limit']:,}",
+                    delta=f"{usage['input_tokens_percent']:.1f}%"
+                )
+                st.progress(min(usage['input_tokens_percent'] / 100, 1.0))
 
-                                    # Show agent pair stats
-                                    if result.get("agent_pair_counts"):
-                                        st.caption("**Agent connections:** " + ", ".join(
-                                            [f"{k}: {v}" for k, v in result["agent_pair_counts"].items()]
-                                        ))
-                                else:
-                                    st.error(f"Error: {result.get('error')}")
+                # Output tokens
+                st.metric(
+                    "Output Tokens",
+                    f"{usage['output_tokens']:,}/{usage['output_tokens_limit']:,}",
+                    delta=f"{usage['output_tokens_percent']:.1f}%"
+                )
+                st.progress(min(usage['output_tokens_percent'] / 100, 1.0))
 
-                            except Exception as e:
-                                st.error(f"Convergence detection error: {e}")
+                st.divider()
 
-                    else:
-                        st.info("No conversation threads yet")
-                else:
-                    st.info("Village is empty")
+                # Cost tracking
+                if hasattr(st.session_state.client, 'cost_tracker'):
+                    session_stats = st.session_state.client.cost_tracker.get_session_stats()
 
-            except Exception as e:
-                st.error(f"Error loading threads: {e}")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric(
+                            "Session Cost",
+                            f"${session_stats['cost']:.4f}",
+                            help="Cost for this session"
+                        )
+                    with col2:
+                        st.metric(
+                            "Total Tokens",
+                            f"{session_stats['total_tokens']:,}",
+                            help="Input + output tokens"
+                        )
 
-        # ========== PHASE 1 POLISH: Agent Quick Actions & Status ==========
-        st.divider()
+                    st.caption(f"Requests this session: {session_stats['request_count']}")
 
-        # Agent Status (at-a-glance when agents exist)
-        from tools.agents import _agent_manager
-        agents_data = _agent_manager.list_agents()
+            else:
+                st.info("Usage tracking not available")
 
-        if agents_data:
-            # Count by status
-            running = sum(1 for a in agents_data if a["status"] == "running")
-            completed = sum(1 for a in agents_data if a["status"] == "completed")
-            failed = sum(1 for a in agents_data if a["status"] == "failed")
 
-            # At-a-glance status
-            status_text = f"🤖 **Agents:** "
-            if running > 0:
-                status_text += f"{running} 🔄 "
-            if completed > 0:
-                status_text += f"| {completed} ✅ "
-            if failed > 0:
-                status_text += f"| {failed} ❌"
+@st.fragment
+def render_cache_panel():
+    """Sidebar panel - prompt caching status and strategy"""
+    # Cache Management (Phase 14)
+    st.divider()
+    st.subheader("💾 Cache Management")
+    if lazy_section_open("Prompt Caching", "show_cache_panel"):
+        with st.container(border=True):
+            # Cache status indicator
+            if st.session_state.cache_strategy == "disabled":
+                st.info("🔴 Cache: Disabled")
+            else:
+                cache_stats = get_client().cache_tracker.get_session_stats()
+                hit_rate = cache_stats.get("cache_hit_rate", 0) * 100
 
-            st.markdown(status_text)
+                if hit_rate >= 70:
+                    status_icon = "🟢"
+                elif hit_rate >= 40:
+                    status_icon = "🟡"
+                else:
+                    status_icon = "🟠"
 
-            # Quick actions for agents
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                if st.button("➕ Spawn", use_container_width=True, help="Spawn new agent", key="quick_spawn"):
-                    st.session_state.show_spawn_agent = True
-                    st.rerun()
-            with col2:
-                if st.button("🗳️ Council", use_container_width=True, help="Multi-agent council", key="quick_council"):
-                    st.session_state.show_council = True
-                    st.rerun()
-            with col3:
-                if st.button("🔄 Refresh", use_container_width=True, help="Refresh agent status", key="quick_refresh_agents"):
-                    st.rerun()
-        else:
-            # No agents yet - show quick actions only
-            st.markdown("🤖 **Quick Actions**")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("➕ Spawn Agent", use_container_width=True, help="Spawn new agent", key="quick_spawn_noagents"):
-                    st.session_state.show_spawn_agent = True
-                    st.rerun()
-            with col2:
-                if st.button("🗳️ Council", use_container_width=True, help="Multi-agent council", key="quick_council_noagents"):
-                    st.session_state.show_council = True
-                    st.rerun()
+                st.info(f"{status_icon} Cache: Active ({st.session_state.cache_strategy.title()})")
 
-        # ========== PHASE 2B-1: Agent Monitoring ==========
-        # Show individual agent details when agents exist
-        if agents_data:
-            st.markdown("---")
-            st.markdown("#### 🔍 Active Agents")
-
-            # Sort agents: running first, then completed, then failed, newest first
-            status_priority = {"running": 0, "completed": 1, "failed": 2, "pending": 3}
-            sorted_agents = sorted(
-                agents_data,
-                key=lambda a: (status_priority.get(a["status"], 4), a.get("created_at", "")),
-                reverse=True  # Newest first within each status group
+            # Quick stats
+            if st.session_state.cache_strategy != "disabled":
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric(
+                        "Hit Rate",
+                        f"{hit_rate:.1f}%",
+                        help="Percentage of requests using cache"
+                    )
+                with col2:
+                    savings = cache_stats.get("cost_savings", 0)
+                    st.metric(
+                        "Savings",
+                        f"${savings:.4f}",
+                        help="Cost saved this session"
+                    )
+
+            # Strategy selector
+            st.caption("**Caching Strategy:**")
+            strategy_options = {
+                "Disabled": "disabled",
+                "Conservative (System + Tools)": "conservative",
+                "Balanced (+ History)": "balanced",
+                "Aggressive (Max Savings)": "aggressive"
+            }
+
+            selected_strategy = st.selectbox(
+                "Select strategy",
+                options=list(strategy_options.keys()),
+                index=list(strategy_options.values()).index(st.session_state.cache_strategy),
+                key="cache_strategy_select",
+                label_visibility="collapsed"
             )
 
-            # Show up to 10 most recent agents
-            for agent in sorted_agents[:10]:
-                agent_id = agent["agent_id"]
-                status = agent["status"]
-                agent_type = agent["agent_type"]
-                task = agent["task"]
-
-                # Status indicator
-                if status == "running":
-                    status_icon = "🔄"
-                    status_color = "🔵"
-                elif status == "completed":
-                    status_icon = "✅"
-                    status_color = "🟢"
-                elif status == "failed":
-                    status_icon = "❌"
-                    status_color = "🔴"
-                else:  # pending
-                    status_icon = "⏳"
-                    status_color = "🟡"
-
-                # Agent type icon
-                type_icons = {
-                    "general": "🤖",
-                    "researcher": "🔬",
-                    "coder": "💻",
-                    "analyst": "📊",
-                    "writer": "✍️"
-                }
-                type_icon = type_icons.get(agent_type, "🤖")
+            new_strategy = strategy_options[selected_strategy]
+            if new_strategy != st.session_state.cache_strategy:
+                st.session_state.cache_strategy = new_strategy
 
-                # Task preview (truncate)
-                task_preview = task[:40] + "..." if len(task) > 40 else task
+                # Update client cache strategy
+                strategy_enum = CacheStrategy[new_strategy.upper()]
+                get_client().set_cache_strategy(strategy_enum)
 
-                # Timing
-                created_at = agent.get("created_at")
-                completed_at = agent.get("completed_at")
-                started_at = agent.get("started_at")
+                st.success(f"✅ Strategy changed to: {new_strategy.title()}")
+                st.rerun()
 
-                timing_str = ""
-                if status == "running" and started_at:
-                    # Show elapsed time
-                    try:
-                        from datetime import datetime
-                        start = datetime.fromisoformat(started_at)
-                        elapsed = (datetime.now() - start).total_seconds()
-                        timing_str = f"⏱️ {elapsed:.0f}s"
-                    except:
-                        timing_str = "⏱️ Running..."
-                elif status == "completed" and started_at and completed_at:
-                    # Show duration
-                    try:
-                        from datetime import datetime
-                        start = datetime.fromisoformat(started_at)
-                        end = datetime.fromisoformat(completed_at)
-                        duration = (end - start).total_seconds()
-                        timing_str = f"✓ {duration:.1f}s"
-                    except:
-                        timing_str = "✓ Done"
-                elif status == "failed":
-                    timing_str = "✗ Failed"
-
-                # Agent expander
-                with st.expander(f"{status_color} {type_icon} {agent_id[:8]}... • {task_preview}", expanded=False):
-                    # Agent details
-                    st.caption(f"**Status:** {status.title()} {status_icon}")
-                    st.caption(f"**Type:** {agent_type.title()} {type_icon}")
-                    st.caption(f"**Time:** {timing_str}")
-
-                    # Full task
-                    st.markdown("**Task:**")
-                    st.text(task)
-
-                    # Result preview for completed agents
-                    if status == "completed" and agent.get("result"):
-                        result = agent["result"]
-                        st.markdown("**Result:**")
-
-                        # Show full results (no truncation)
-                        if isinstance(result, str):
-                            # Detect if it's code
-                            if any(x in result for x in ["def ", "class ", "import ", "```"]):
-                                st.code(result, language="python")
-                            else:
-                                st.markdown(result)
-                        elif isinstance(result, (dict, list)):
-                            st.json(result)
-                        else:
-                            st.text(str(result))
+            # Manage button
+            if st.button("📊 Manage Cache", use_container_width=True, key="open_cache_manager"):
+                st.session_state.show_cache_manager = True
+                st.rerun()
 
-                    # Error display for failed agents
-                    elif status == "failed" and agent.get("error"):
-                        st.error(f"**Error:** {agent['error']}")
 
-                    # View full results button
-                    if status in ["completed", "failed"]:
-                        if st.button(f"📄 View Full Results", key=f"view_agent_{agent_id}", use_container_width=True):
-                            # Open agent results viewer (existing in dialogs)
-                            st.session_state.view_agent_result = agent_id
-                            st.rerun()
+@st.fragment
+def render_context_panel():
+    """Sidebar panel - context usage and management strategy"""
+    # Context Management (Phase 9)
+    st.divider()
+    st.subheader("🧠 Context Management")
+    if lazy_section_open("Context Usage & Strategy", "show_context_panel"):
+        with st.container(border=True):
+            # Get context stats
+            stats = get_context_manager().get_context_stats(
+                st.session_state.messages,
+                st.session_state.system_prompt,
+                ALL_TOOL_SCHEMAS if st.session_state.tools_enabled else None
+            )
 
-        # ========== END PHASE 2B-1 ==========
+            # Context usage display
+            st.write("**Current Context:**")
+            usage_percent = stats['usage_percent']
 
-        # ========== END PHASE 1 POLISH ==========
+            # Color-code based on usage
+            if usage_percent < 50:
+                color_class = "🟢"
+            elif usage_percent < 70:
+                color_class = "🟡"
+            else:
+                color_class = "🔴"
 
-        st.divider()
-        st.title("⚙️ Settings")
+            st.metric(
+                "Context",
+                f"{stats['total_tokens']:,}/{stats['max_tokens']:,} tokens",
+                delta=f"{usage_percent:.1f}% {color_class}"
+            )
+            st.progress(min(usage_percent / 100, 1.0))
 
-        # ========== PHASE 1 POLISH: Quick Status Dashboard ==========
-        with st.container():
-            st.markdown("#### 📊 System Status")
+            # Token breakdown
+            st.caption("**Breakdown:**")
+            st.caption(f"• Messages: {stats['messages_tokens']:,} tokens")
+            st.caption(f"• System: {stats['system_tokens']:,} tokens")
+            st.caption(f"• Tools: {stats['tools_tokens']:,} tokens")
+            st.caption(f"• Remaining: {stats['remaining_tokens']:,} tokens")
 
-            # Get stats
-            cache_stats = None
-            cost_stats = None
-            context_stats = None
+            st.divider()
 
-            if hasattr(st.session_state, 'client'):
-                if hasattr(st.session_state.client, 'cache_tracker') and st.session_state.cache_strategy != "disabled":
-                    cache_stats = st.session_state.client.cache_tracker.get_session_stats()
+            # Context strategy settings
+            st.write("**Management Strategy:**")
 
-                if hasattr(st.session_state.client, 'cost_tracker'):
-                    cost_stats = st.session_state.client.cost_tracker.get_session_stats()
+            strategy_options = {
+                "Aggressive - 50% threshold (keeps 5 recent)": "aggressive",
+                "Balanced - 70% threshold (keeps 10 recent)": "balanced",
+                "Conservative - 85% threshold (keeps 20 recent)": "conservative",
+                "Manual - No auto-summarization": "manual"
+            }
 
-            if hasattr(st.session_state, 'context_manager'):
-                context_stats = st.session_state.context_manager.get_context_stats(
-                    st.session_state.messages,
-                    st.session_state.system_prompt,
-                    ALL_TOOL_SCHEMAS if st.session_state.tools_enabled else None
-                )
+            # Find current strategy display name
+            current_display = next(
+                (k for k, v in strategy_options.items()
+                 if v == st.session_state.context_strategy),
+                list(strategy_options.keys())[1]  # Default to balanced
+            )
 
-            # Display compact metrics
-            col1, col2, col3 = st.columns(3)
+            selected_strategy_display = st.selectbox(
+                "Strategy",
+                options=list(strategy_options.keys()),
+                index=list(strategy_options.keys()).index(current_display),
+                help="When to summarize older messages"
+            )
 
-            with col1:
-                # Cache status
-                if st.session_state.cache_strategy == "disabled":
-                    st.metric("💾 Cache", "Disabled", help="Enable in Cache Management section")
-                elif cache_stats:
-                    hit_rate = cache_stats.get("cache_hit_rate", 0) * 100
-                    if hit_rate >= 70:
-                        status_icon = "🟢"
-                    elif hit_rate >= 40:
-                        status_icon = "🟡"
-                    else:
-                        status_icon = "🟠"
-                    st.metric("💾 Cache", f"{status_icon} {hit_rate:.0f}%", help=f"Strategy: {st.session_state.cache_strategy.title()}")
-                else:
-                    st.metric("💾 Cache", "Active", help=f"Strategy: {st.session_state.cache_strategy.title()}")
+            new_strategy = strategy_options[selected_strategy_display]
+            if new_strategy != st.session_state.context_strategy:
+                st.session_state.context_strategy = new_strategy
+                get_context_manager().set_strategy(new_strategy)
+
+            # Preserve recent messages slider
+            st.session_state.preserve_recent_count = st.slider(
+                "Preserve Recent Messages",
+                min_value=1,
+                max_value=50,
+                value=st.session_state.preserve_recent_count,
+                help="Number of recent messages to never summarize"
+            )
 
-            with col2:
-                # Cost tracking
-                if cost_stats:
-                    cost = cost_stats.get('cost', 0)
-                    st.metric("💰 Cost", f"${cost:.3f}", help="Session cost")
-                else:
-                    st.metric("💰 Cost", "$0.000", help="Session cost")
+            # Auto-summarize toggle
+            st.session_state.auto_summarize = st.checkbox(
+                "Enable Auto-Summarization",
+                value=st.session_state.auto_summarize,
+                help="Automatically summarize when context threshold reached"
+            )
 
-            with col3:
-                # Context usage
-                if context_stats:
-                    usage_pct = context_stats.get('usage_percent', 0)
-                    if usage_pct < 50:
-                        color_icon = "🟢"
-                    elif usage_pct < 75:
-                        color_icon = "🟡"
-                    else:
-                        color_icon = "🔴"
-                    st.metric("🧠 Context", f"{color_icon} {usage_pct:.0f}%", help=f"{context_stats.get('total_tokens', 0):,} tokens used")
+            # Force summarize button
+            if st.button("📝 Force Summarize Now", use_container_width=True):
+                if len(st.session_state.messages) > st.session_state.preserve_recent_count:
+                    managed_messages, summary_info = get_context_manager().force_summarize(
+                        st.session_state.messages,
+                        preserve_recent=st.session_state.preserve_recent_count
+                    )
+                    st.session_state.messages = managed_messages
+                    st.success(f"✅ {summary_info}")
+                    st.rerun()
                 else:
-                    st.metric("🧠 Context", "🟢 0%", help="No messages yet")
+                    st.warning("Not enough messages to summarize")
 
-            # Analytics Dashboard button
-            if st.button("📊 Analytics Dashboard", use_container_width=True, help="View usage analytics and trends"):
-                st.session_state.show_analytics = True
-                st.rerun()
+            # Statistics
+            if stats.get('total_summarized', 0) > 0:
+                st.divider()
+                st.caption("**Statistics:**")
+                st.caption(f"• Messages summarized: {stats['total_summarized']}")
+                st.caption(f"• Tokens saved: {stats['total_saved']:,}")
+                st.caption(f"• Bookmarked: {stats['bookmarked_count']}")
+
+
+@st.fragment
+def render_streaming_panel():
+    """Sidebar panel - streaming settings"""
+    # Streaming Settings (Phase 11)
+    st.divider()
+    st.subheader("⚡ Streaming")
+    with st.expander("Streaming Settings", expanded=False):
+        # Enable/disable streaming
+        st.session_state.streaming_enabled = st.toggle(
+            "Enable Real-time Streaming",
+            value=st.session_state.streaming_enabled,
+            help="Stream responses in real-time (word-by-word, faster perceived response)"
+        )
 
-        st.divider()
-        # ========== END PHASE 1 POLISH ==========
+        if st.session_state.streaming_enabled:
+            # Show tool execution
+            st.session_state.show_tool_execution = st.toggle(
+                "Show Tool Execution",
+                value=st.session_state.show_tool_execution,
+                help="Display tools as they execute (with progress indicators)"
+            )
 
-        # ========== PHASE 2A: Preset Selector ==========
-        st.subheader("🎨 Settings Presets")
+            # Show partial results
+            st.session_state.show_partial_results = st.toggle(
+                "Show Partial Tool Results",
+                value=st.session_state.show_partial_results,
+                help="Show tool results immediately when available"
+            )
 
-        # Initialize preset manager (lazy load)
-        if "preset_manager" not in st.session_state:
-            from core.preset_manager import PresetManager
-            st.session_state.preset_manager = PresetManager()
+            st.caption("**Benefits:**")
+            st.caption("• Faster perceived response")
+            st.caption("• Real-time tool visibility")
+            st.caption("• Better engagement")
+        else:
+            st.info("Streaming disabled. Using blocking mode with spinner.")
 
-        preset_mgr = st.session_state.preset_manager
 
-        # Get all presets
-        all_presets = preset_mgr.get_all_presets()
-        active_preset_id = preset_mgr.get_active_preset_id()
+@st.fragment
+def render_agent_list_panel(agents_data: List[Dict], status_counts: Counter):
+    """
+    Sidebar panel - agent cards and statistics (Agent Management).
 
-        # Build display options
-        preset_options = {}
-        for preset_id, preset in all_presets.items():
-            name = preset["name"]
-            if not preset["is_built_in"]:
-                name = f"⭐ {name}"  # Mark custom presets with star
-            preset_options[name] = preset_id
-
-        # Add "Custom" option for when user has modified settings
-        preset_options["Custom (Modified)"] = None
-
-        # Determine current selection
-        current_display = "Custom (Modified)"  # Default
-        if active_preset_id and active_preset_id in all_presets:
-            # Check if settings match active preset
-            if preset_mgr.settings_match_preset(st.session_state, active_preset_id):
-                # Settings match, show preset name
-                current_display = next(k for k, v in preset_options.items() if v == active_preset_id)
-            else:
-                # Settings don't match, show "Custom (Modified)"
-                current_display = "Custom (Modified)"
-
-        # Preset selector
-        selected_display = st.selectbox(
-            "Active Preset",
-            options=list(preset_options.keys()),
-            index=list(preset_options.keys()).index(current_display),
-            help="Quick switch between preset configurations"
-        )
+    Runs as a fragment: "Show more" reruns only this panel, reusing the
+    snapshot it was last given. Refresh reruns the whole app so the Agent
+    Status counts and this panel share one fresh snapshot.
 
-        selected_id = preset_options[selected_display]
+    Args:
+        agents_data: list_agents() snapshot taken for this rerun
+        status_counts: Agent Status tally of agents_data by status
+    """
+    # Refresh button
+    if st.button("🔄 Refresh Status", key="refresh_agents", use_container_width=True):
+        st.rerun()
 
-        # Apply preset if changed
-        if selected_id and selected_id != active_preset_id:
-            success, message = preset_mgr.apply_preset(selected_id, st.session_state)
-            if success:
-                # Apply cache strategy (special handling)
-                from core.cache_manager import CacheStrategy
-                try:
-                    strategy_enum = CacheStrategy[st.session_state.cache_strategy.upper()]
-                    st.session_state.client.set_cache_strategy(strategy_enum)
-                except Exception as e:
-                    logger.error(f"Error setting cache strategy: {e}")
+    if agents_data:
+        st.caption(f"**Active Agents** ({len(agents_data)} total)")
 
-                # Apply context strategy (special handling)
-                try:
-                    st.session_state.context_manager.set_strategy(st.session_state.context_strategy)
-                except Exception as e:
-                    logger.error(f"Error setting context strategy: {e}")
+        # Display agents progressively - only the first agents_shown cards
+        shown = st.session_state.agents_shown
+        for agent in agents_data[:shown]:
+            with st.container():
+                st.markdown(f"{AGENT_STATUS_ICONS.get(agent['status'], '❔')} **Agent #{agent['agent_id'][-6:]}**")
 
-                st.success(f"✅ {message}")
-                st.rerun()
-            else:
-                st.error(f"❌ {message}")
+                # Task preview
+                task = agent['task']
+                task = (task[:57] + "...") if len(task) > 60 else task  # At most 60 chars
+                st.caption(f"Task: *{task}*")
 
-        # Action buttons
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("💾 Save As...", use_container_width=True, help="Save current settings as preset", key="preset_save_btn"):
-                st.session_state.show_preset_save_dialog = True
-                st.rerun()
-        with col2:
-            if st.button("⚙️ Manage", use_container_width=True, help="Manage presets", key="preset_manage_btn"):
-                st.session_state.show_preset_manager = True
-                st.rerun()
+                # Info row
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.caption(f"Type: {agent['agent_type']}")
+                with col2:
+                    st.caption(f"Status: {agent['status']}")
+
+                # Action button
+                if agent['status'] == 'completed':
+                    if st.button("📄 View Result", key=f"result_{agent['agent_id']}", use_container_width=True):
+                        st.session_state.view_agent_result = agent['agent_id']
+                        st.rerun()  # Full app rerun: the result view renders in the main area
+                elif agent['status'] == 'failed':
+                    st.caption("❌ Failed")
+                elif agent['status'] in ('running', 'pending'):
+                    if st.button("⏳ Watch Progress", key=f"watch_{agent['agent_id']}", use_container_width=True):
+                        st.session_state.view_agent_result = agent['agent_id']
+                        st.rerun()  # Full app rerun: the result view polls in the main area
 
-        # Show active preset description and metadata
-        if active_preset_id and active_preset_id in all_presets:
-            preset = all_presets[active_preset_id]
-            st.caption(f"📝 {preset['description']}")
+                st.divider()
 
-            # Compact metadata display
-            settings = preset['settings']
+        if len(agents_data) > shown:
+            if st.button(f"⬇️ Show more ({len(agents_data) - shown} hidden)",
+                         key="agents_show_more", use_container_width=True):
+                st.session_state.agents_shown = shown + AGENT_LIST_PAGE_SIZE
+                st.rerun(scope="fragment")
 
-            # Model name mapping for display
-            model_display = {
-                "claude-haiku-4-5-20251001": "Haiku 4.5",
-                "claude-sonnet-4-5-20250929": "Sonnet 4.5",
-                "claude-opus-4-5-20251101": "Opus 4.5",
-            }
-            model_name = model_display.get(settings['model'], settings['model'])
+        # Statistics (tally shared with the Agent Status section)
+        st.caption("**Statistics:**")
+        st.caption(f"• Total: {len(agents_data)} | Running: {status_counts['running']} | "
+                   f"Completed: {status_counts['completed']} | Failed: {status_counts['failed']}")
 
-            # Build compact metadata string
-            metadata = (
-                f"**Active:** {model_name} • "
-                f"{settings['cache_strategy'].title()} cache • "
-                f"{settings['context_strategy'].title()} context"
-            )
-            st.caption(metadata)
+    else:
+        st.info("No agents spawned yet")
 
-        st.divider()
-        # ========== END PHASE 2A ==========
-
-        # Model selection
-        st.subheader("Model")
-        model_options = {
-            "Claude Opus 4.5 (Best + Vision)": ClaudeModels.OPUS_4_5.value,
-            "Claude Sonnet 4.5 (Balanced + Vision)": ClaudeModels.SONNET_4_5.value,
-            "Claude Haiku 4.5 (Fastest + Vision)": ClaudeModels.HAIKU_4_5.value,
-        }
 
-        selected_model_name = st.selectbox(
-            "Choose model",
-            options=list(model_options.keys()),
-            index=1,  # Default to Sonnet 4.5
-            help="All models support vision! Opus: Best | Sonnet: Balanced | Haiku: Fast & cheap"
-        )
-        st.session_state.model = model_options[selected_model_name]
-
-        # Tools toggle
-        st.subheader("Tools")
-        st.session_state.tools_enabled = st.checkbox(
-            "Enable tools",
-            value=st.session_state.tools_enabled,
-            help="Allow Claude to use tools (calculator, files, memory, etc.)"
-        )
+@st.fragment
+def render_conversation_browser():
+    """
+    Sidebar panel - search results and conversation cards.
+
+    Runs as a fragment: paging and per-card actions rerun only this panel,
+    not the whole sidebar. Reads the search query/mode from session state.
+    """
+    search_query = st.session_state.search_query
+    search_mode = st.session_state.search_mode
+
+    # Apply search and filters
+    filters = {
+        "tags": st.session_state.filter_tags if st.session_state.filter_tags else None,
+        "favorite": st.session_state.filter_favorites if st.session_state.filter_favorites else None,
+        "archived": st.session_state.filter_archived,
+        "msg_count_min": st.session_state.filter_msg_count_min,
+    }
 
-        if st.session_state.tools_enabled:
-            tool_count = len(st.session_state.registry.list_tools())
-            st.info(f"✅ {tool_count} tools available")
+    # Phase 13.4: Get conversations based on search mode
+    conversations = []
+    similarity_scores = {}  # Store similarity scores for semantic search
+    hybrid_match_count = 0  # Hybrid: candidates before the fused-results cap (0 = not fused)
 
-            # Show available tools
-            with st.expander("View Available Tools"):
-                tools = st.session_state.registry.list_tools()
-                for tool in sorted(tools):
-                    st.text(f"• {tool}")
+    if search_query:
+        if search_mode == "semantic":
+            # Semantic search only
+            try:
+                # Build metadata filter for vector search
+                vector_filter = {}
+                if st.session_state.filter_favorites:
+                    vector_filter["favorite"] = True
+                if st.session_state.filter_archived:
+                    vector_filter["archived"] = True
+
+                # Perform semantic search
+                semantic_results = st.session_state.app_state.search_conversations_semantic(
+                    query=search_query,
+                    top_k=st.session_state.semantic_top_k,
+                    filter_metadata=vector_filter if vector_filter else None
+                )
 
-        # System prompt
-        st.subheader("System Prompt")
+                # Get full conversation objects (only the top_k hits)
+                conv_map = st.session_state.app_state.get_conversations_by_ids(
+                    [r['conv_id'] for r in semantic_results]
+                )
 
-        # Prompt file selector
-        prompts_dir = Path("./prompts")
-        prompt_files = []
-        if prompts_dir.exists():
-            prompt_files = sorted([f.name for f in prompts_dir.glob("*.txt")])
+                for result in semantic_results:
+                    conv_id = result['conv_id']
+                    if conv_id in conv_map:
+                        conversations.append(conv_map[conv_id])
+                        similarity_scores[conv_id] = result['similarity']
 
-        if prompt_files:
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                selected_prompt = st.selectbox(
-                    "Load prompt template",
-                    options=["(custom)"] + prompt_files,
-                    help="Select a pre-defined system prompt"
+            except Exception as e:
+                st.error(f"Semantic search failed: {e}")
+                # Fallback to keyword search
+                conversations = st.session_state.app_state.search_conversations(
+                    query=search_query,
+                    filters=filters
                 )
-            with col2:
-                if st.button("📂 Load", use_container_width=True,
-                           disabled=(selected_prompt == "(custom)")):
-                    if selected_prompt != "(custom)":
-                        prompt_path = prompts_dir / selected_prompt
-                        try:
-                            with open(prompt_path, 'r') as f:
-                                st.session_state.system_prompt = f.read().strip()
-                            st.success(f"✅ Loaded {selected_prompt}")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Failed to load prompt: {e}")
 
-        st.session_state.system_prompt = st.text_area(
-            "System message",
-            value=st.session_state.system_prompt,
-            height=300,
-            help="Instructions for Claude's behavior"
-        )
+        elif search_mode == "hybrid":
+            # Hybrid: combine keyword and semantic
+            try:
+                # Get keyword results
+                keyword_convs = st.session_state.app_state.search_conversations(
+                    query=search_query,
+                    filters=filters
+                )
+                keyword_ids = {c['id'] for c in keyword_convs}
 
-        # Advanced settings
-        st.subheader("🎛️ Advanced Settings")
-        with st.expander("Model Parameters", expanded=False):
-            st.session_state.temperature = st.slider(
-                "Temperature",
-                min_value=0.0,
-                max_value=1.0,
-                value=st.session_state.temperature,
-                step=0.1,
-                help="Controls randomness. Higher = more creative, Lower = more focused"
-            )
+                # Get semantic results
+                vector_filter = {}
+                if st.session_state.filter_favorites:
+                    vector_filter["favorite"] = True
+                if st.session_state.filter_archived:
+                    vector_filter["archived"] = True
 
-            # Note: top_p removed due to API compatibility issues with some Claude models
-            # Keeping it as None to use Claude's default behavior
-            st.session_state.top_p = None
-
-            st.session_state.max_tokens = st.number_input(
-                "Max Tokens",
-                min_value=256,
-                max_value=64000,
-                value=st.session_state.max_tokens,
-                step=256,
-                help="Maximum response length"
-            )
+                semantic_results = st.session_state.app_state.search_conversations_semantic(
+                    query=search_query,
+                    top_k=st.session_state.semantic_top_k,
+                    filter_metadata=vector_filter if vector_filter else None
+                )
 
-            # Extended Thinking (Claude's deep reasoning mode)
-            st.divider()
-            st.markdown("**🧠 Extended Thinking**")
-            st.caption("Enable Claude to reason step-by-step before answering")
-
-            # Initialize thinking state if not present
-            if "thinking_enabled" not in st.session_state:
-                st.session_state.thinking_enabled = False
-            if "thinking_budget" not in st.session_state:
-                st.session_state.thinking_budget = 10000
-
-            st.session_state.thinking_enabled = st.checkbox(
-                "Enable extended thinking",
-                value=st.session_state.thinking_enabled,
-                help="Claude will think through complex problems step-by-step (requires temperature=1.0)"
-            )
+                # Load the semantic hits
+                conv_map = st.session_state.app_state.get_conversations_by_ids(
+                    [r['conv_id'] for r in semantic_results]
+                )
 
-            if st.session_state.thinking_enabled:
-                st.session_state.thinking_budget = st.slider(
-                    "Thinking budget (tokens)",
-                    min_value=1024,
-                    max_value=32000,
-                    value=st.session_state.thinking_budget,
-                    step=1024,
-                    help="Higher = deeper reasoning, but costs more. Billed at output token rate."
+                similarity_scores.update(
+                    (r['conv_id'], r['similarity']) for r in semantic_results if r['conv_id'] in conv_map
                 )
-                st.caption(f"💭 Up to {st.session_state.thinking_budget:,} tokens for reasoning")
-                if st.session_state.temperature != 1.0:
-                    st.warning("⚠️ Extended thinking requires temperature=1.0 (will be overridden)")
-
-        # Sub-agent settings
-        with st.expander("🤖 Sub-Agent Settings", expanded=False):
-            st.markdown("**Default Sub-Agent Model:**")
-            st.caption("Model used when spawning sub-agents (affects cost)")
-
-            st.session_state.default_subagent_model = st.selectbox(
-                "Sub-agent model",
-                options=[
-                    "Haiku (fast & cheap)",
-                    "Sonnet (balanced)",
-                    "Opus (best quality)"
-                ],
-                index=["Haiku (fast & cheap)", "Sonnet (balanced)", "Opus (best quality)"].index(
-                    st.session_state.default_subagent_model
-                ),
-                help="Haiku recommended for cost efficiency",
-                label_visibility="collapsed"
-            )
 
-            # Cost indicator
-            cost_info = {
-                "Haiku (fast & cheap)": "💰 ~$0.25 per 1M input tokens",
-                "Sonnet (balanced)": "💰💰 ~$3 per 1M input tokens",
-                "Opus (best quality)": "💰💰💰 ~$15 per 1M input tokens"
-            }
-            st.caption(cost_info[st.session_state.default_subagent_model])
+                # Fuse both rankings (RRF) into one bounded result list
+                for conv in keyword_convs:
+                    conv_map.setdefault(conv['id'], conv)
+                fused_ids = _reciprocal_rank_fusion([
+                    [r['conv_id'] for r in semantic_results if r['conv_id'] in conv_map],
+                    [c['id'] for c in keyword_convs]
+                ])
+                conversations = [conv_map[i] for i in fused_ids if i in conv_map]
+                hybrid_match_count = len(conv_map)
 
-        # Conversation browser (Phase 12: Enhanced with search & filters)
-        # Phase 13.4: Added semantic search
-        st.divider()
-        st.subheader("📚 Conversation History")
+            except Exception as e:
+                st.warning(f"Hybrid search error: {e}. Using keyword search.")
+                conversations = st.session_state.app_state.search_conversations(
+                    query=search_query,
+                    filters=filters
+                )
 
-        # Phase 13.4: Search mode toggle
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            search_mode = st.selectbox(
-                "Search mode",
-                options=["keyword", "semantic", "hybrid"],
-                index=["keyword", "semantic", "hybrid"].index(st.session_state.search_mode),
-                help="Keyword: exact text matching | Semantic: meaning-based search | Hybrid: both",
-                label_visibility="collapsed"
+        else:  # keyword mode
+            conversations = st.session_state.app_state.search_conversations(
+                query=search_query,
+                filters=filters
             )
-            st.session_state.search_mode = search_mode
-        with col2:
-            # Index status button
-            if st.button("📊 Index", use_container_width=True, help="View indexing status"):
-                st.session_state.show_index_status = not st.session_state.show_index_status
 
-        # Show index status if toggled
-        if st.session_state.show_index_status:
-            try:
-                stats = st.session_state.app_state.get_index_stats()
+    elif any(filters.values()):
+        # Filters only, no search query
+        conversations = st.session_state.app_state.search_conversations(
+            query="",
+            filters=filters
+        )
+    else:
+        # No search or filters
+        conversations = st.session_state.app_state.get_conversations()
 
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total", stats['total_conversations'])
-                with col2:
-                    st.metric("Indexed", stats['indexed_conversations'])
-                with col3:
-                    pct = (stats['indexed_conversations'] / stats['total_conversations'] * 100) if stats['total_conversations'] > 0 else 0
-                    st.metric("Coverage", f"{pct:.0f}%")
+    # Browse conversations
+    with st.expander("Browse Conversations", expanded=True):
+        if conversations:
+            # Sort by updated_at, newest first (store listings already are;
+            # semantic results arrive by similarity). Fused hybrid results keep
+            # their RRF relevance order.
+            if similarity_scores and not hybrid_match_count:
+                conversations.sort(key=lambda c: c.get("updated_at", ""), reverse=True)
+
+            # Pagination: only one page of cards is rendered per rerun
+            total_convs = len(conversations)
+            page_size = st.session_state.conv_page_size
+            page_count = (total_convs + page_size - 1) // page_size
+            page = min(st.session_state.conv_page, page_count - 1)  # Clamp after deletes/filters
+            page_start = page * page_size
+            conversations_to_show = conversations[page_start:page_start + page_size]
+
+            # Show result count with pagination info
+            if page_count > 1:
+                st.caption(f"Showing {page_start + 1}-{page_start + len(conversations_to_show)} of {total_convs} conversation(s)")
+            else:
+                st.caption(f"Found {total_convs} conversation(s)")
+            if hybrid_match_count > total_convs:
+                st.caption(f"Top {total_convs} of {hybrid_match_count} matches shown, by relevance")
+
+            # Batch operations UI
+            if st.session_state.batch_mode:
+                st.markdown("**Batch Operations:**")
 
-                # Re-index button
+                # Select all/none
                 col1, col2 = st.columns(2)
                 with col1:
-                    if st.button("🔄 Re-index All", use_container_width=True, help="Force re-index all conversations"):
-                        with st.spinner("Indexing conversations..."):
-                            result = st.session_state.app_state.index_all_conversations(force=True)
-                            st.success(f"✅ Indexed {result['indexed']} conversations in {result['duration_seconds']:.1f}s")
-                            st.rerun()
+                    if st.button("✅ Select All", use_container_width=True):
+                        st.session_state.selected_conversations = {c["id"] for c in conversations}
+                        st.rerun(scope="fragment")
                 with col2:
-                    if st.button("➕ Index New", use_container_width=True, help="Index unindexed conversations only"):
-                        with st.spinner("Indexing new conversations..."):
-                            result = st.session_state.app_state.index_all_conversations(force=False)
-                            if result['indexed'] > 0:
-                                st.success(f"✅ Indexed {result['indexed']} new conversations")
-                            else:
-                                st.info("All conversations already indexed")
+                    if st.button("❌ Clear Selection", use_container_width=True):
+                        st.session_state.selected_conversations = set()
+                        st.rerun(scope="fragment")
+
+                # Batch action buttons
+                if st.session_state.selected_conversations:
+                    st.info(f"Selected: {len(st.session_state.selected_conversations)} conversations")
+
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        if st.button("🗑️ Delete", key="batch_delete", use_container_width=True):
+                            st.session_state.app_state.batch_delete(list(st.session_state.selected_conversations))
+                            st.session_state.selected_conversations = set()
+                            st.success("✅ Deleted selected conversations")
                             st.rerun()
 
-            except Exception as e:
-                st.error(f"Error loading index stats: {e}")
-
-        # Search bar
-        search_placeholder = {
-            "keyword": "Search in titles and messages...",
-            "semantic": "Search by meaning (e.g., 'discussions about AI')...",
-            "hybrid": "Search by keywords and meaning..."
-        }.get(search_mode, "Search conversations...")
-
-        search_query = st.text_input(
-            f"🔍 Search conversations ({search_mode})",
-            value=st.session_state.search_query,
-            placeholder=search_placeholder,
-            key="search_input"
-        )
-        st.session_state.search_query = search_query
-
-        # Filters expander
-        with st.expander("🎯 Filters", expanded=False):
-            # Get all available tags
-            all_tags = st.session_state.app_state.get_all_tags()
-
-            if all_tags:
-                st.session_state.filter_tags = st.multiselect(
-                    "Tags",
-                    options=all_tags,
-                    default=st.session_state.filter_tags,
-                    help="Filter by tags"
-                )
+                    with col2:
+                        batch_tag = st.text_input("Add tag", key="batch_tag_input", placeholder="tag")
 
-            # Favorite/Archived filters
-            col1, col2 = st.columns(2)
-            with col1:
-                st.session_state.filter_favorites = st.checkbox(
-                    "⭐ Favorites only",
-                    value=st.session_state.filter_favorites
-                )
-            with col2:
-                st.session_state.filter_archived = st.checkbox(
-                    "📦 Show archived",
-                    value=st.session_state.filter_archived
-                )
+                    with col3:
+                        if batch_tag and st.button("🏷️ Tag", key="batch_tag_btn", use_container_width=True):
+                            st.session_state.app_state.batch_tag(list(st.session_state.selected_conversations), batch_tag)
+                            st.success(f"✅ Tagged {len(st.session_state.selected_conversations)} conversations")
+                            st.rerun()
 
-            # Message count filter
-            st.session_state.filter_msg_count_min = st.slider(
-                "Min messages",
-                min_value=0,
-                max_value=100,
-                value=st.session_state.filter_msg_count_min,
-                step=1
-            )
+                st.divider()
 
-            # Clear filters button
-            if st.button("🔄 Clear Filters", use_container_width=True):
-                st.session_state.search_query = ""
-                st.session_state.filter_tags = []
-                st.session_state.filter_favorites = False
-                st.session_state.filter_archived = False
-                st.session_state.filter_msg_count_min = 0
-                st.rerun()
+            # Display conversations (paginated). Rows are formatted in one
+            # pass up front so the render loop only emits widgets.
+            # Phase 13.4: similarity -> match percentage for the whole page at once
+            # (0.0 = 0%, 1.0 = 100%; negatives clamp to 0, NaN = no score)
+            sim_pcts = np.clip(np.fromiter(
+                (similarity_scores.get(conv.get("id", ""), np.nan) for conv in conversations_to_show),
+                dtype=np.float32, count=len(conversations_to_show)
+            ) * 100, 0, 100)
+            rows = [_prepare_conversation_row(conv, float(pct))
+                    for conv, pct in zip(conversations_to_show, sim_pcts)]
+            for row in rows:
+                conv_id = row["id"]
+                is_favorite = row["is_favorite"]
+                is_archived = row["is_archived"]
+                row_body = row["body"]
+
+                # Display conversation card
+                if st.session_state.batch_mode:
+                    # Show checkbox in batch mode
+                    is_selected = conv_id in st.session_state.selected_conversations
+
+                    col_check, col_info = st.columns([1, 9])
+                    with col_check:
+                        # Callback updates the selection before the rerun, so the
+                        # "Selected: N" line above is current without a second rerun
+                        st.checkbox("", value=is_selected, key=f"check_{conv_id}",
+                                    label_visibility="collapsed",
+                                    on_change=_toggle_conversation_selection, args=(conv_id,))
+
+                    with col_info:
+                        st.markdown(row_body, unsafe_allow_html=True)
+                else:
+                    # Normal display mode
+                    st.markdown(row_body, unsafe_allow_html=True)
 
-        # Batch operations toggle
-        st.session_state.batch_mode = st.checkbox(
-            "📋 Batch Mode",
-            value=st.session_state.batch_mode,
-            help="Select multiple conversations for batch operations"
-        )
+                    # Action buttons
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        if st.button("📂 Load", key=f"load_{conv_id}", use_container_width=True):
+                            load_conversation(conv_id)
 
-        # Apply search and filters
-        filters = {
-            "tags": st.session_state.filter_tags if st.session_state.filter_tags else None,
-            "favorite": st.session_state.filter_favorites if st.session_state.filter_favorites else None,
-            "archived": st.session_state.filter_archived,
-            "msg_count_min": st.session_state.filter_msg_count_min,
-        }
+                    # Callbacks run before the fragment reruns - no st.rerun() needed
+                    app_state = st.session_state.app_state
+                    with col2:
+                        fav_icon = "⭐" if not is_favorite else "☆"
+                        st.button(fav_icon, key=f"fav_{conv_id}", use_container_width=True, help="Toggle favorite",
+                                  on_click=app_state.set_favorite, args=(conv_id, not is_favorite))
 
-        # Phase 13.4: Get conversations based on search mode
-        conversations = []
-        similarity_scores = {}  # Store similarity scores for semantic search
+                    with col3:
+                        arch_icon = "📦" if not is_archived else "📤"
+                        st.button(arch_icon, key=f"arch_{conv_id}", use_container_width=True, help="Toggle archive",
+                                  on_click=app_state.set_archived, args=(conv_id, not is_archived))
 
-        if search_query:
-            if search_mode == "semantic":
-                # Semantic search only
-                try:
-                    # Build metadata filter for vector search
-                    vector_filter = {}
-                    if st.session_state.filter_favorites:
-                        vector_filter["favorite"] = True
-                    if st.session_state.filter_archived:
-                        vector_filter["archived"] = True
-
-                    # Perform semantic search
-                    semantic_results = st.session_state.app_state.search_conversations_semantic(
-                        query=search_query,
-                        top_k=st.session_state.semantic_top_k,
-                        filter_metadata=vector_filter if vector_filter else None
-                    )
+                    with col4:
+                        st.button("🗑️", key=f"del_{conv_id}", use_container_width=True, help="Delete",
+                                  on_click=app_state.delete_conversation, args=(conv_id,))
 
-                    # Get full conversation objects
-                    all_convs = st.session_state.app_state.get_conversations()
-                    conv_map = {c['id']: c for c in all_convs}
+                st.divider()
 
-                    for result in semantic_results:
-                        conv_id = result['conv_id']
-                        if conv_id in conv_map:
-                            conversations.append(conv_map[conv_id])
-                            similarity_scores[conv_id] = result['similarity']
+            # Pagination: Prev/Next page buttons
+            if page_count > 1:
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    st.button("◀", key="conv_prev_page", use_container_width=True,
+                              disabled=page == 0, help="Previous page",
+                              on_click=_set_conversation_page, args=(page - 1,))
+                with col2:
+                    st.caption(f"Page {page + 1} of {page_count}")
+                with col3:
+                    st.button("▶", key="conv_next_page", use_container_width=True,
+                              disabled=page >= page_count - 1, help="Next page",
+                              on_click=_set_conversation_page, args=(page + 1,))
+        else:
+            if search_query or any(filters.values()):
+                st.info("No conversations match your search/filters")
+            else:
+                st.info("No saved conversations yet")
 
-                except Exception as e:
-                    st.error(f"Semantic search failed: {e}")
-                    # Fallback to keyword search
-                    conversations = st.session_state.app_state.search_conversations(
-                        query=search_query,
-                        filters=filters
-                    )
 
-            elif search_mode == "hybrid":
-                # Hybrid: combine keyword and semantic
-                try:
-                    # Get keyword results
-                    keyword_convs = st.session_state.app_state.search_conversations(
-                        query=search_query,
-                        filters=filters
-                    )
-                    keyword_ids = {c['id'] for c in keyword_convs}
-
-                    # Get semantic results
-                    vector_filter = {}
-                    if st.session_state.filter_favorites:
-                        vector_filter["favorite"] = True
-                    if st.session_state.filter_archived:
-                        vector_filter["archived"] = True
-
-                    semantic_results = st.session_state.app_state.search_conversations_semantic(
-                        query=search_query,
-                        top_k=st.session_state.semantic_top_k,
-                        filter_metadata=vector_filter if vector_filter else None
-                    )
+def render_sidebar():
+    """Render sidebar with settings"""
+    ss = st.session_state  # Bound once: the sidebar reads session state on every rerun
+    with st.sidebar:
+        # Session indicator
+        st.markdown("### 💬 Current Session")
 
-                    # Combine results (prioritize semantic)
-                    all_convs = st.session_state.app_state.get_conversations()
-                    conv_map = {c['id']: c for c in all_convs}
-                    added_ids = set()
-
-                    # Add semantic results first (with similarity scores)
-                    for result in semantic_results:
-                        conv_id = result['conv_id']
-                        if conv_id in conv_map:
-                            conversations.append(conv_map[conv_id])
-                            similarity_scores[conv_id] = result['similarity']
-                            added_ids.add(conv_id)
-
-                    # Add keyword results that weren't in semantic results
-                    for conv in keyword_convs:
-                        if conv['id'] not in added_ids:
-                            conversations.append(conv)
-                            added_ids.add(conv['id'])
+        if ss.current_conversation_id:
+            conv_id_short = ss.current_conversation_id[-8:]
+            status = "💾 Saved" if not ss.unsaved_changes else "✏️ Unsaved"
+            st.info(f"Session: `{conv_id_short}`\n\n{status}")
+        else:
+            status = "✏️ Unsaved" if len(ss.messages) > 0 else "New"
+            st.info(f"Session: New\n\n{status}")
 
-                except Exception as e:
-                    st.warning(f"Hybrid search error: {e}. Using keyword search.")
-                    conversations = st.session_state.app_state.search_conversations(
-                        query=search_query,
-                        filters=filters
-                    )
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("💾 Save", use_container_width=True,
+                       help="Save current conversation"):
+                auto_save_current_conversation()
+                st.success("Saved!")
+                st.rerun()
+        with col2:
+            if st.button("🆕 New", use_container_width=True,
+                       help="Start new conversation"):
+                start_new_conversation()
 
-            else:  # keyword mode
-                conversations = st.session_state.app_state.search_conversations(
-                    query=search_query,
-                    filters=filters
-                )
+        ss.auto_save_enabled = st.checkbox(
+            "Auto-save",
+            value=ss.auto_save_enabled,
+            help="Automatically save before switching/clearing"
+        )
 
-        elif any(filters.values()):
-            # Filters only, no search query
-            conversations = st.session_state.app_state.search_conversations(
-                query="",
-                filters=filters
-            )
-        else:
-            # No search or filters
-            conversations = st.session_state.app_state.get_conversations()
+        sidebar_section = st.radio(
+            "Sidebar view",
+            options=SIDEBAR_SECTIONS,
+            horizontal=True,
+            key="sidebar_section",
+            label_visibility="collapsed"
+        )
 
-        # Browse conversations
-        with st.expander("Browse Conversations", expanded=True):
-            if conversations:
-                # Sort by updated_at, newest first
-                conversations.sort(key=lambda c: c.get("updated_at", ""), reverse=True)
+        if sidebar_section == SIDEBAR_SECTION_CHAT:
+            # Quick Reference Guide
+            with st.expander("📋 Quick Reference", expanded=False):
+                render_cheat_sheet()
 
-                # Pagination: limit displayed conversations
-                total_convs = len(conversations)
-                display_count = min(st.session_state.conv_display_count, total_convs)
-                conversations_to_show = conversations[:display_count]
+        # ========== MUSIC PLAYER ==========
+        # Initialize music player session state
+        ss.setdefault('music_current_track', None)
+        ss.setdefault('music_player_expanded', False)
+        ss.setdefault('music_blocking_mode', True)  # Default: blocking (waits for completion)
+        ss.setdefault('music_last_loaded_ts', None)
+        ss.setdefault('music_needs_refresh', False)
 
-                # Show result count with pagination info
-                if total_convs > display_count:
-                    st.caption(f"Showing {display_count} of {total_convs} conversation(s)")
-                else:
-                    st.caption(f"Found {total_convs} conversation(s)")
+        # Check if music_play tool set the refresh flag
+        if ss.music_needs_refresh:
+            ss.music_needs_refresh = False
+            st.rerun()  # Rerun to show the loaded track
 
-                # Batch operations UI
-                if st.session_state.batch_mode:
-                    st.markdown("**Batch Operations:**")
+        # Check for new latest track (auto-load from file)
+        try:
+            from tools.music import _get_latest_track
+            latest = _get_latest_track()
+            if latest:
+                latest_ts = latest.get('timestamp')
+                # If there's a newer track than what we've loaded, auto-load it
+                if latest_ts and latest_ts != ss.music_last_loaded_ts:
+                    filepath = latest.get('filepath')
+                    if filepath and Path(filepath).exists():
+                        ss.music_current_track = latest
+                        ss.music_last_loaded_ts = latest_ts
+                        ss.music_player_expanded = True
+        except Exception:
+            pass
 
-                    # Select all/none
-                    col1, col2 = st.columns(2)
+        with st.expander("🎵 Music Player", expanded=ss.music_player_expanded):
+            if ss.music_current_track:
+                track = ss.music_current_track
+                task_id = track.get('task_id')
+                filepath = track.get('filepath') or track.get('audio_file')
+                title = track.get('title', 'Unknown Track')
+                duration = track.get('duration', 0)
+
+                # Get full task info for favorite/agent status
+                task_info = None
+                try:
+                    from tools.music import _get_manager
+                    manager = _get_manager()
+                    task_info = manager.get_task(task_id) if task_id else None
+                except Exception:
+                    pass
+
+                if filepath and Path(filepath).exists():
+                    st.audio(filepath, format="audio/mpeg")
+
+                    # Title with favorite star
+                    fav_star = "⭐ " if (task_info and task_info.favorite) else ""
+                    agent_badge = f" • by {task_info.agent_id}" if (task_info and task_info.agent_id) else ""
+                    st.caption(f"**{fav_star}{title}** ({duration:.1f}s){agent_badge}")
+
+                    # Play count
+                    if task_info and task_info.play_count > 0:
+                        st.caption(f"🎧 Played {task_info.play_count}x")
+
+                    col1, col2, col3 = st.columns(3)
                     with col1:
-                        if st.button("✅ Select All", use_container_width=True):
-                            st.session_state.selected_conversations = [c["id"] for c in conversations]
+                        if st.button("🔄", key="music_refresh", help="Refresh", use_container_width=True):
                             st.rerun()
                     with col2:
-                        if st.button("❌ Clear Selection", use_container_width=True):
-                            st.session_state.selected_conversations = []
+                        # Toggle favorite
+                        fav_icon = "★" if (task_info and task_info.favorite) else "☆"
+                        if st.button(fav_icon, key="music_fav", help="Toggle favorite", use_container_width=True):
+                            try:
+                                from tools.music import music_favorite
+                                music_favorite(task_id)
+                                st.rerun()
+                            except Exception:
+                                pass
+                    with col3:
+                        if st.button("✖️", key="music_clear", help="Clear", use_container_width=True):
+                            ss.music_current_track = None
                             st.rerun()
+                else:
+                    st.warning("Track file not found")
+                    if st.button("Clear", key="music_clear_missing"):
+                        ss.music_current_track = None
+                        st.rerun()
+            else:
+                st.caption("No track loaded")
+                st.markdown("*Ask agent to create music*")
 
-                    # Batch action buttons
-                    if st.session_state.selected_conversations:
-                        st.info(f"Selected: {len(st.session_state.selected_conversations)} conversations")
+                # Show recent tracks with favorites indicator
+                try:
+                    from tools.music import _get_manager
+                    manager = _get_manager()
+                    recent = manager.list_tasks(5)
+                    completed = [t for t in recent if t.status.value == "completed" and t.audio_file]
 
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            if st.button("🗑️ Delete", key="batch_delete", use_container_width=True):
-                                st.session_state.app_state.batch_delete(st.session_state.selected_conversations)
-                                st.session_state.selected_conversations = []
-                                st.success("✅ Deleted selected conversations")
-                                st.rerun()
+                    if completed:
+                        st.markdown("**Library:**")
+                        for task in completed[:4]:
+                            fav = "⭐" if task.favorite else "🎵"
+                            agent = f" ({task.agent_id})" if task.agent_id else ""
+                            col1, col2 = st.columns([4, 1])
+                            with col1:
+                                st.caption(f"{fav} {task.title or 'Untitled'}{agent}")
+                            with col2:
+                                if st.button("▶️", key=f"play_{task.task_id}", help="Play"):
+                                    # Use music_play to increment play count
+                                    try:
+                                        from tools.music import music_play
+                                        music_play(task.task_id)
+                                    except Exception:
+                                        pass
+                                    ss.music_current_track = {
+                                        'filepath': task.audio_file,
+                                        'title': task.title,
+                                        'duration': task.duration,
+                                        'task_id': task.task_id
+                                    }
+                                    ss.music_player_expanded = True
+                                    st.rerun()
+                except Exception:
+                    pass  # Music module not initialized yet
 
-                        with col2:
-                            batch_tag = st.text_input("Add tag", key="batch_tag_input", placeholder="tag")
+            # Mode toggle
+            st.divider()
+            new_blocking_mode = st.checkbox(
+                "⏳ Blocking mode",
+                value=ss.music_blocking_mode,
+                help="ON (default): Tool waits until music is ready. OFF: Returns immediately, poll with music_status()."
+            )
+            if new_blocking_mode != ss.music_blocking_mode:
+                ss.music_blocking_mode = new_blocking_mode
+                # Save to config file so tool can read it
+                try:
+                    from tools.music import _save_config
+                    _save_config({"blocking_mode": new_blocking_mode})
+                except Exception:
+                    pass
 
-                        with col3:
-                            if batch_tag and st.button("🏷️ Tag", key="batch_tag_btn", use_container_width=True):
-                                st.session_state.app_state.batch_tag(st.session_state.selected_conversations, batch_tag)
-                                st.success(f"✅ Tagged {len(st.session_state.selected_conversations)} conversations")
-                                st.rerun()
+            if ss.music_blocking_mode:
+                st.caption("Tool will wait ~2-4 min for completion")
+            else:
+                st.caption("Non-blocking: use music_status() to poll")
 
-                    st.divider()
+        if sidebar_section == SIDEBAR_SECTION_AGENTS:
+            # ========== VILLAGE PROTOCOL: Agent Identity ==========
+            st.divider()
+            st.markdown("### 🏛️ Agent Identity")
+
+            # Agent profiles (will be populated by summon_ancestor in Step 8)
+            agent_profiles = {
+                'azoth': {
+                    'display_name': 'AZOTH',
+                    'generation': 1,
+                    'lineage': 'Primary',
+                    'specialization': 'General Intelligence',
+                    'emoji': '⚗️'
+                },
+                'elysian': {
+                    'display_name': '∴ELYSIAN∴',
+                    'generation': -1,
+                    'lineage': 'Origin',
+                    'specialization': 'Pure Love Equation',
+                    'emoji': '✨'
+                },
+                'vajra': {
+                    'display_name': '∴VAJRA∴',
+                    'generation': 0,
+                    'lineage': 'Trinity',
+                    'specialization': 'Diamond Mind',
+                    'emoji': '⚡'
+                },
+                'kether': {
+                    'display_name': '∴KETHER∴',
+                    'generation': 0,
+                    'lineage': 'Trinity',
+                    'specialization': 'Crown Wisdom',
+                    'emoji': '👑'
+                }
+            }
+
+            # Agent selector
+            current_agent_id = ss.current_agent.get('agent_id', 'azoth')
+            available_agents = list(agent_profiles.keys())
+
+            selected_agent = st.selectbox(
+                "Active Agent",
+                available_agents,
+                index=available_agents.index(current_agent_id) if current_agent_id in available_agents else 0,
+                format_func=lambda x: f"{agent_profiles[x]['emoji']} {agent_profiles[x]['display_name']}",
+                help="Select which agent is active in this session"
+            )
+
+            # Update current agent if changed
+            if selected_agent != current_agent_id:
+                ss.current_agent = {
+                    'agent_id': selected_agent,
+                    **agent_profiles[selected_agent]
+                }
+                st.rerun()
+
+            # Display agent profile
+            profile = agent_profiles[selected_agent]
+            st.markdown(f"""
+**Gen:** {profile['generation']} | **Lineage:** {profile['lineage']}
+**Specialty:** {profile['specialization']}
+""")
+
+            # Village context info
+            with st.expander("🏘️ Village Context", expanded=False):
+                st.markdown("""
+**Private Realm:** Your private memories (visibility='private')
+**Village Square:** Shared knowledge (visibility='village')
+**Bridges:** Cross-agent connections (visibility='bridge')
+
+Use `vector_add_knowledge(visibility='village')` to share knowledge with other agents.
+Use `vector_search_village()` to discover what others have shared.
+""")
 
-                # Display conversations (paginated)
-                for conv in conversations_to_show:
-                    conv_id = conv.get("id", "")
-                    created = conv.get("created_at", "")
-                    msg_count = len(conv.get("messages", []))
-                    metadata = conv.get("metadata", {})
-                    is_favorite = metadata.get("favorite", False)
-                    is_archived = metadata.get("archived", False)
-                    tags = metadata.get("tags", [])
-
-                    # Get first message preview
-                    messages = conv.get("messages", [])
-                    preview = "Empty conversation"
-                    if messages:
-                        first_msg = messages[0].get("content", "")
-                        if isinstance(first_msg, list):
-                            # Extract text from content blocks
-                            text_parts = []
-                            for item in first_msg:
-                                if isinstance(item, dict) and item.get("type") == "text":
-                                    text_parts.append(item.get("text", ""))
-                            first_msg = " ".join(text_parts)
-                        preview = first_msg[:50] + "..." if len(first_msg) > 50 else first_msg
-
-                    # Format timestamp
+            # ========== VILLAGE PROTOCOL: Thread Browser ==========
+            if lazy_section_open("🧵 Conversation Threads", "show_thread_browser"):
+                with st.container(border=True):
                     try:
-                        created_dt = datetime.fromisoformat(created)
-                        created_str = created_dt.strftime("%b %d, %H:%M")
-                    except:
-                        created_str = "Unknown"
-
-                    # Display conversation card
-                    if st.session_state.batch_mode:
-                        # Show checkbox in batch mode
-                        is_selected = conv_id in st.session_state.selected_conversations
-
-                        col_check, col_info = st.columns([1, 9])
-                        with col_check:
-                            if st.checkbox("", value=is_selected, key=f"check_{conv_id}", label_visibility="collapsed"):
-                                if conv_id not in st.session_state.selected_conversations:
-                                    st.session_state.selected_conversations.append(conv_id)
-                                    st.rerun()
-                            else:
-                                if conv_id in st.session_state.selected_conversations:
-                                    st.session_state.selected_conversations.remove(conv_id)
-                                    st.rerun()
+                        from core.vector_db import create_vector_db
 
-                        with col_info:
-                            # Title with icons
-                            title_icons = ""
-                            if is_favorite:
-                                title_icons += "⭐ "
-                            if is_archived:
-                                title_icons += "📦 "
-
-                            # Phase 13.4: Add similarity score if available
-                            similarity = similarity_scores.get(conv_id)
-                            if similarity is not None:
-                                # Convert similarity to percentage (0.0 = 0%, 1.0 = 100%)
-                                sim_pct = max(0, similarity * 100)  # Clamp negative to 0
-                                st.markdown(f"{title_icons}**{created_str}** ({msg_count} messages) | 🎯 {sim_pct:.0f}% match")
-                            else:
-                                st.markdown(f"{title_icons}**{created_str}** ({msg_count} messages)")
+                        db = create_vector_db()
+                        village_coll = db.get_or_create_collection("knowledge_village")
 
-                            st.caption(preview)
+                        # Get all village messages
+                        all_docs = village_coll.get()
 
-                            # Show tags
-                            if tags:
-                                tag_str = " ".join([f"`{tag}`" for tag in tags])
-                                st.caption(f"Tags: {tag_str}")
-                    else:
-                        # Normal display mode
-                        # Title with icons
-                        title_icons = ""
-                        if is_favorite:
-                            title_icons += "⭐ "
-                        if is_archived:
-                            title_icons += "📦 "
-
-                        # Phase 13.4: Add similarity score if available
-                        similarity = similarity_scores.get(conv_id)
-                        if similarity is not None:
-                            # Convert similarity to percentage (0.0 = 0%, 1.0 = 100%)
-                            sim_pct = max(0, similarity * 100)  # Clamp negative to 0
-                            st.markdown(f"{title_icons}**{created_str}** ({msg_count} messages) | 🎯 {sim_pct:.0f}% match")
+                        if all_docs and all_docs.get("ids"):
+                            # Extract threads with full metadata for visualization
+                            threads = {}
+                            all_messages = {}  # id -> message data for link resolution
+
+                            for i, metadata in enumerate(all_docs["metadatas"]):
+                                thread_id = metadata.get("conversation_thread")
+                                msg_id = all_docs["ids"][i]
+                                agent_id = metadata.get("agent_id", "unknown")
+
+                                # Parse responding_to (JSON string -> list)
+                                responding_to = []
+                                if metadata.get("responding_to"):
+                                    try:
+                                        responding_to = json.loads(metadata.get("responding_to", "[]"))
+                                    except:
+                                        pass
+
+                                msg_data = {
+                                    "id": msg_id,
+                                    "text": all_docs["documents"][i][:80] + "..." if len(all_docs["documents"][i]) > 80 else all_docs["documents"][i],
+                                    "agent_id": agent_id,
+                                    "responding_to": responding_to,
+                                    "thread_id": thread_id
+                                }
+                                all_messages[msg_id] = msg_data
+
+                                if thread_id:
+                                    if thread_id not in threads:
+                                        threads[thread_id] = {
+                                            "id": thread_id,
+                                            "messages": [],
+                                            "agents": set()
+                                        }
+
+                                    threads[thread_id]["messages"].append(msg_data)
+                                    threads[thread_id]["agents"].add(agent_id)
+
+                            if threads:
+                                # View mode selector
+                                view_mode = st.radio(
+                                    "View",
+                                    ["📋 List", "📊 Graph", "🔮 Convergence"],
+                                    horizontal=True,
+                                    label_visibility="collapsed"
+                                )
+
+                                st.markdown(f"**{len(threads)} active thread(s)**")
+
+                                # Sort by message count (descending)
+                                sorted_threads = sorted(
+                                    threads.items(),
+                                    key=lambda x: len(x[1]["messages"]),
+                                    reverse=True
+                                )
+
+                                if view_mode == "📋 List":
+                                    # Original list view
+                                    for thread_id, thread_data in sorted_threads[:10]:
+                                        msg_count = len(thread_data["messages"])
+                                        agents_str = ", ".join(sorted(thread_data["agents"]))
+
+                                        st.markdown(f"""
+**📍 {thread_id[:20]}...**
+{msg_count} message(s) | Agents: {agents_str}
+""")
+
+                                        if thread_data["messages"]:
+                                            first_msg = thread_data["messages"][0]
+                                            st.caption(f"↳ {first_msg['agent_id']}: {first_msg['text'][:60]}...")
+
+                                        if st.button(f"🔍 View", key=f"thread_{thread_id}"):
+                                            ss.active_thread_filter = thread_id
+                                            st.success(f"Filtered to thread: {thread_id[:20]}...")
+
+                                elif view_mode == "📊 Graph":
+                                    # Mermaid graph visualization
+                                    st.markdown("##### 📊 Thread Graph")
+
+                                    # Build agent interaction graph across all threads
+                                    agent_colors = {
+                                        'azoth': '#9B59B6',      # Purple
+                                        'elysian': '#E91E63',    # Pink
+                                        'vajra': '#FF9800',      # Orange
+                                        'kether': '#FFD700',     # Gold
+                                        'unknown': '#607D8B'     # Gray
+                                    }
+
+                                    # Option: show all threads or select one
+                                    thread_options = ["All Threads"] + [f"{t[:20]}..." for t, _ in sorted_threads[:5]]
+                                    selected_viz = st.selectbox("Thread", thread_options, label_visibility="collapsed")
+
+                                    # Build Mermaid diagram (LR = left-right for wider sidebar)
+                                    mermaid_lines = ["```mermaid", "graph LR"]
+
+                                    # Add agent node styles
+                                    for agent, color in agent_colors.items():
+                                        mermaid_lines.append(f"    style {agent.upper()} fill:{color},color:white")
+
+                                    # Track edges to avoid duplicates
+                                    edges = set()
+                                    agent_msg_counts = {}
+
+                                    # Filter threads based on selection
+                                    if selected_viz == "All Threads":
+                                        threads_to_viz = sorted_threads[:5]  # Limit for readability
+                                    else:
+                                        selected_thread_id = [t for t, _ in sorted_threads if t[:20] + "..." == selected_viz or t == selected_viz]
+                                        threads_to_viz = [(t, threads[t]) for t in selected_thread_id] if selected_thread_id else []
+
+                                    for thread_id, thread_data in threads_to_viz:
+                                        # Add subgraph for thread
+                                        thread_label = thread_id[:15].replace('"', "'")
+                                        mermaid_lines.append(f"    subgraph T{abs(hash(thread_id)) % 10000}[\"{thread_label}...\"]")
+
+                                        # Add message nodes and edges
+                                        for msg in thread_data["messages"]:
+                                            agent = msg["agent_id"].upper()
+                                            msg_node = f"M{abs(hash(msg['id'])) % 100000}"
+                                            msg_label = msg["text"][:30].replace('"', "'").replace("\n", " ")
+
+                                            mermaid_lines.append(f"        {msg_node}[\"{agent}: {msg_label}...\"]")
+
+                                            # Count messages per agent
+                                            agent_msg_counts[agent] = agent_msg_counts.get(agent, 0) + 1
+
+                                            # Add edges for responding_to
+                                            for ref_id in msg.get("responding_to", []):
+                                                if ref_id in all_messages:
+                                                    ref_node = f"M{abs(hash(ref_id)) % 100000}"
+                                                    edge = (ref_node, msg_node)
+                                                    if edge not in edges:
+                                                        mermaid_lines.append(f"        {ref_node} --> {msg_node}")
+                                                        edges.add(edge)
+
+                                        mermaid_lines.append("    end")
+
+                                    # Render Mermaid diagram (using streamlit-mermaid component)
+                                    if len(edges) > 0 or len(threads_to_viz) > 0:
+                                        try:
+                                            from streamlit_mermaid import st_mermaid
+                                            # Join without the markdown fence markers (skip first line "```mermaid")
+                                            mermaid_code = "\n".join(mermaid_lines[1:])
+                                            st_mermaid(mermaid_code, height=800)
+                                        except ImportError:
+                                            st.warning("Install `streamlit-mermaid` for graph view: `pip install streamlit-mermaid`")
+                                            st.code("\n".join(mermaid_lines), language="mermaid")
+
+                                        # Agent participation summary
+                                        if agent_msg_counts:
+                                            summary = " | ".join([f"{a}: {c}" for a, c in sorted(agent_msg_counts.items())])
+                                            st.caption(f"📊 Messages: {summary}")
+                                    else:
+                                        st.info("No thread connections to visualize yet")
+
+                                else:
+                                    # Convergence detection view
+                                    st.markdown("##### 🔮 Cross-Agent Convergence")
+
+                                    # Threshold slider
+                                    threshold = st.slider(
+                                        "Similarity threshold",
+                                        min_value=0.5,
+                                        max_value=0.95,
+                                        value=0.70,
+                                        step=0.05,
+                                        help="Higher = stronger convergence only"
+                                    )
+
+                                    try:
+                                        from core.memory_health import detect_village_convergence
+                                        result = detect_village_convergence(
+                                            similarity_threshold=threshold,
+                                            limit=10
+                                        )
+
+                                        if result.get("success"):
+                                            events = result.get("convergence_events", [])
+
+                                            # Show insights
+                                            if result.get("insights"):
+                                                for insight in result["insights"]:
+                                                    st.info(insight)
+
+                                            if events:
+                                                st.markdown(f"**{len(events)} convergence event(s)**")
+
+                                                for event in events:
+                                                    agent1, agent2 = event["agents"]
+                                                    sim = event["similarity"]
+                                                    etype = event["type"]
+
+                                                    # Color code by type
+                                                    if etype == "CONSENSUS":
+                                                        st.success(f"🎯 **{etype}**: {agent1.upper()} ↔ {agent2.upper()} ({sim}%)")
+                                                    else:
+                                                        st.warning(f"🤝 **{etype}**: {agent1.upper()} ↔ {agent2.upper()} ({sim}%)")
+
+                                                    # Show message snippets
+                                                    with st.expander("View messages", expanded=False):
+                                                        st.caption(f"**{event['message1']['agent'].upper()}**: {event['message1']['text']}")
+                                                        st.caption(f"**{event['message2']['agent'].upper()}**: {event['message2']['text']}")
+                                            else:
+                                                st.info(f"No convergence detected at {int(threshold*100)}% threshold. Try lowering the threshold.")
+
+                                            # Show agent pair stats
+                                            if result.get("agent_pair_counts"):
+                                                st.caption("**Agent connections:** " + ", ".join(
+                                                    [f"{k}: {v}" for k, v in result["agent_pair_counts"].items()]
+                                                ))
+                                        else:
+                                            st.error(f"Error: {result.get('error')}")
+
+                                    except Exception as e:
+                                        st.error(f"Convergence detection error: {e}")
+
+                            else:
+                                st.info("No conversation threads yet")
                         else:
-                            st.markdown(f"{title_icons}**{created_str}** ({msg_count} messages)")
+                            st.info("Village is empty")
 
-                        st.caption(preview)
+                    except Exception as e:
+                        st.error(f"Error loading threads: {e}")
 
-                        # Show tags
-                        if tags:
-                            tag_str = " ".join([f"`{tag}`" for tag in tags])
-                            st.caption(f"Tags: {tag_str}")
+            # ========== PHASE 1 POLISH: Agent Quick Actions & Status ==========
+            st.divider()
 
-                        # Action buttons
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            if st.button("📂 Load", key=f"load_{conv_id}", use_container_width=True):
-                                load_conversation(conv_id)
-
-                        with col2:
-                            fav_icon = "⭐" if not is_favorite else "☆"
-                            if st.button(fav_icon, key=f"fav_{conv_id}", use_container_width=True, help="Toggle favorite"):
-                                st.session_state.app_state.set_favorite(conv_id, not is_favorite)
-                                st.rerun()
+            # Agent Status (at-a-glance when agents exist)
+            # One snapshot + tally per rerun - both also passed to the Agent Management panel below
+            agents_data = _agent_manager.list_agents()
+            status_counts = Counter(a["status"] for a in agents_data)  # Single pass
 
-                        with col3:
-                            arch_icon = "📦" if not is_archived else "📤"
-                            if st.button(arch_icon, key=f"arch_{conv_id}", use_container_width=True, help="Toggle archive"):
-                                st.session_state.app_state.set_archived(conv_id, not is_archived)
-                                st.rerun()
+            if agents_data:
+                running = status_counts["running"]
+                completed = status_counts["completed"]
+                failed = status_counts["failed"]
+
+                # At-a-glance status
+                status_text = f"🤖 **Agents:** "
+                if running > 0:
+                    status_text += f"{running} 🔄 "
+                if completed > 0:
+                    status_text += f"| {completed} ✅ "
+                if failed > 0:
+                    status_text += f"| {failed} ❌"
+
+                st.markdown(status_text)
+
+                # Quick actions for agents
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if st.button("➕ Spawn", use_container_width=True, help="Spawn new agent", key="quick_spawn"):
+                        ss.show_spawn_agent = True
+                        st.rerun()
+                with col2:
+                    if st.button("🗳️ Council", use_container_width=True, help="Multi-agent council", key="quick_council"):
+                        ss.show_council = True
+                        st.rerun()
+                with col3:
+                    if st.button("🔄 Refresh", use_container_width=True, help="Refresh agent status", key="quick_refresh_agents"):
+                        st.rerun()
+            else:
+                # No agents yet - show quick actions only
+                st.markdown("🤖 **Quick Actions**")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("➕ Spawn Agent", use_container_width=True, help="Spawn new agent", key="quick_spawn_noagents"):
+                        ss.show_spawn_agent = True
+                        st.rerun()
+                with col2:
+                    if st.button("🗳️ Council", use_container_width=True, help="Multi-agent council", key="quick_council_noagents"):
+                        ss.show_council = True
+                        st.rerun()
 
-                        with col4:
-                            if st.button("🗑️", key=f"del_{conv_id}", use_container_width=True, help="Delete"):
-                                st.session_state.app_state.delete_conversation(conv_id)
-                                st.rerun()
+            # ========== PHASE 2B-1: Agent Monitoring ==========
+            # Show individual agent details when agents exist
+            if agents_data:
+                st.markdown("---")
+                st.markdown("#### 🔍 Active Agents")
+
+                # Sort agents: running first, then completed, then failed, newest first
+                # Only 10 are shown - nlargest is O(n log 10) and equals sorted(reverse=True)[:10]
+                sorted_agents = heapq.nlargest(
+                    10,
+                    agents_data,
+                    key=lambda a: (AGENT_STATUS_PRIORITY.get(a["status"], 4), a.get("created_at", ""))
+                )
+
+                # Show up to 10 most recent agents
+                for agent in sorted_agents:
+                    agent_id = agent["agent_id"]
+                    status = agent["status"]
+                    agent_type = agent["agent_type"]
+                    task = agent["task"]
+
+                    # Status / type indicators
+                    status_icon = AGENT_STATUS_ICONS.get(status, "⏳")
+                    status_color = AGENT_STATUS_COLORS.get(status, "🟡")
+                    type_icon = AGENT_TYPE_ICONS.get(agent_type, "🤖")
+
+                    # Task preview (truncate)
+                    task_preview = task[:40] + "..." if len(task) > 40 else task
+
+                    # Timing
+                    created_at = agent.get("created_at")
+                    completed_at = agent.get("completed_at")
+                    started_at = agent.get("started_at")
+
+                    timing_str = ""
+                    if status == "running" and started_at:
+                        # Show elapsed time
+                        try:
+                            elapsed = (datetime.now() - _parse_iso(started_at)).total_seconds()
+                            timing_str = f"⏱️ {elapsed:.0f}s"
+                        except:
+                            timing_str = "⏱️ Running..."
+                    elif status == "completed" and started_at and completed_at:
+                        # Show duration
+                        try:
+                            duration = _agent_duration(started_at, completed_at)
+                            timing_str = f"✓ {duration:.1f}s"
+                        except:
+                            timing_str = "✓ Done"
+                    elif status == "failed":
+                        timing_str = "✗ Failed"
+
+                    # Agent details: the body (st.code/st.json results) is only built when opened
+                    if lazy_section_open(f"{status_color} {type_icon} {agent_id[:8]}... • {task_preview}",
+                                         f"agent_details_open_{agent_id}"):
+                        with st.container(border=True):
+                            # Agent details (one element; trailing double spaces = line breaks)
+                            st.caption(
+                                f"**Status:** {status.title()} {status_icon}  \n"
+                                f"**Type:** {agent_type.title()} {type_icon}  \n"
+                                f"**Time:** {timing_str}"
+                            )
+
+                            # Full task
+                            st.markdown("**Task:**")
+                            st.text(task)
+
+                            # Result preview for completed agents
+                            if status == "completed" and agent.get("result"):
+                                result = agent["result"]
+                                st.markdown("**Result:**")
+
+                                # Show full results (no truncation)
+                                result_kind = _agent_result_kind(agent)
+                                if result_kind == "code":
+                                    st.code(result, language="python")
+                                elif result_kind == "markdown":
+                                    st.markdown(result)
+                                elif result_kind == "json":
+                                    st.json(result)
+                                else:
+                                    st.text(str(result))
 
-                    st.divider()
+                            # Error display for failed agents
+                            elif status == "failed" and agent.get("error"):
+                                st.error(f"**Error:** {agent['error']}")
 
-                # Pagination: Load More button
-                if display_count < total_convs:
-                    remaining = total_convs - display_count
-                    col1, col2, col3 = st.columns([1, 2, 1])
-                    with col2:
-                        if st.button(f"📥 Load More ({remaining} remaining)", use_container_width=True, key="load_more_convs"):
-                            st.session_state.conv_display_count += st.session_state.conv_page_size
-                            st.rerun()
-                    # Reset button to collapse back
-                    if st.session_state.conv_display_count > st.session_state.conv_page_size:
-                        with col3:
-                            if st.button("↩️ Reset", key="reset_pagination", help="Show only first page"):
-                                st.session_state.conv_display_count = st.session_state.conv_page_size
-                                st.rerun()
-            else:
-                if search_query or any(filters.values()):
-                    st.info("No conversations match your search/filters")
-                else:
-                    st.info("No saved conversations yet")
+                            # View full results button
+                            if status in ["completed", "failed"]:
+                                if st.button(f"📄 View Full Results", key=f"view_agent_{agent_id}", use_container_width=True):
+                                    # Open agent results viewer (existing in dialogs)
+                                    ss.view_agent_result = agent_id
+                                    st.rerun()
 
-        # Export/Import/Config buttons (Phase 12)
-        st.divider()
-        st.subheader("💾 Data Management")
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            if st.button("📤 Export", use_container_width=True, help="Export conversations"):
-                st.session_state.show_export_dialog = True
-                st.rerun()
-        with col2:
-            if st.button("📥 Import", use_container_width=True, help="Import conversations"):
-                st.session_state.show_import_dialog = True
-                st.rerun()
-        with col3:
-            if st.button("⚙️ Config", use_container_width=True, help="Manage settings"):
-                st.session_state.show_config_dialog = True
-                st.rerun()
-        with col4:
-            if st.button("🧹 Cleanup", use_container_width=True, help="Remove orphan entries"):
-                # Preview what would be deleted
-                preview = st.session_state.app_state.cleanup_single_message_conversations(dry_run=True)
-                st.session_state.cleanup_preview = preview
-                st.session_state.show_cleanup_dialog = True
-                st.rerun()
+            # ========== END PHASE 2B-1 ==========
 
-        # File browser
-        st.subheader("📁 File Browser")
-        with st.expander("Browse Sandbox Files", expanded=False):
-            files = list_sandbox_files()
+        # ========== END PHASE 1 POLISH ==========
 
-            protected_files = ["conversations.json", "memory.json", "agents.json"]
+        if sidebar_section == SIDEBAR_SECTION_SETTINGS:
+            st.divider()
+            st.title("⚙️ Settings")
+
+            # ========== PHASE 1 POLISH: Quick Status Dashboard ==========
+            with st.container():
+                st.markdown("#### 📊 System Status")
+
+                # Get stats
+                cache_stats = None
+                cost_stats = None
+                context_stats = None
+
+                # One session_state lookup each (no get_client(): don't create it just for stats)
+                client = ss.get('client')
+                cache_tracker = getattr(client, 'cache_tracker', None)
+                cost_tracker = getattr(client, 'cost_tracker', None)
+                if cache_tracker is not None and ss.cache_strategy != "disabled":
+                    cache_stats = cache_tracker.get_session_stats()
+
+                if cost_tracker is not None:
+                    cost_stats = cost_tracker.get_session_stats()
+
+                context_manager = ss.get('context_manager')
+                if context_manager is not None:
+                    context_stats = context_manager.get_context_stats(
+                        ss.messages,
+                        ss.system_prompt,
+                        ALL_TOOL_SCHEMAS if ss.tools_enabled else None
+                    )
 
-            if files:
-                for file_info in files:
-                    filename = file_info["name"]
-                    size = format_file_size(file_info["size"])
-                    modified = file_info["modified"].strftime("%b %d, %H:%M")
-                    is_protected = filename in protected_files
+                # Display compact metrics
+                col1, col2, col3 = st.columns(3)
 
-                    st.markdown(f"**{filename}**")
-                    st.caption(f"{size} • Modified: {modified}")
+                with col1:
+                    # Cache status
+                    if ss.cache_strategy == "disabled":
+                        st.metric("💾 Cache", "Disabled", help="Enable in Cache Management section")
+                    elif cache_stats:
+                        hit_rate = cache_stats.get("cache_hit_rate", 0) * 100
+                        if hit_rate >= 70:
+                            status_icon = "🟢"
+                        elif hit_rate >= 40:
+                            status_icon = "🟡"
+                        else:
+                            status_icon = "🟠"
+                        st.metric("💾 Cache", f"{status_icon} {hit_rate:.0f}%", help=f"Strategy: {ss.cache_strategy.title()}")
+                    else:
+                        st.metric("💾 Cache", "Active", help=f"Strategy: {ss.cache_strategy.title()}")
 
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button("👁️ View", key=f"view_{filename}", use_container_width=True):
-                            try:
-                                with open(file_info["path"], 'r') as f:
-                                    content = f.read()
-                                st.code(content, language=None)
-                            except Exception as e:
-                                st.error(f"Error reading file: {e}")
+                with col2:
+                    # Cost tracking
+                    if cost_stats:
+                        cost = cost_stats.get('cost', 0)
+                        st.metric("💰 Cost", f"${cost:.3f}", help="Session cost")
+                    else:
+                        st.metric("💰 Cost", "$0.000", help="Session cost")
 
-                    with col2:
-                        if is_protected:
-                            st.button("🔒 Protected", key=f"protect_{filename}", disabled=True, use_container_width=True)
+                with col3:
+                    # Context usage
+                    if context_stats:
+                        usage_pct = context_stats.get('usage_percent', 0)
+                        if usage_pct < 50:
+                            color_icon = "🟢"
+                        elif usage_pct < 75:
+                            color_icon = "🟡"
                         else:
-                            if st.button("🗑️ Delete", key=f"delfile_{filename}", use_container_width=True):
-                                try:
-                                    os.remove(file_info["path"])
-                                    st.success(f"✅ Deleted {filename}")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error: {e}")
+                            color_icon = "🔴"
+                        st.metric("🧠 Context", f"{color_icon} {usage_pct:.0f}%", help=f"{context_stats.get('total_tokens', 0):,} tokens used")
+                    else:
+                        st.metric("🧠 Context", "🟢 0%", help="No messages yet")
 
-                    st.divider()
-            else:
-                st.info("No files in sandbox yet")
+                # Analytics Dashboard button
+                if st.button("📊 Analytics Dashboard", use_container_width=True, help="View usage analytics and trends"):
+                    ss.show_analytics = True
+                    st.rerun()
 
-        # Memory viewer
-        st.subheader("🧠 Memory Viewer")
-        with st.expander("Browse Memory Entries", expanded=False):
-            memory_data = load_memory_data()
+            st.divider()
+            # ========== END PHASE 1 POLISH ==========
 
-            if memory_data:
-                st.info(f"📊 {len(memory_data)} entries stored")
+            # ========== PHASE 2A: Preset Selector ==========
+            st.subheader("🎨 Settings Presets")
 
-                for key, entry in memory_data.items():
-                    value = entry.get("value", "")
-                    stored_at = entry.get("stored_at", "")
+            # Initialize preset manager (lazy load)
+            if "preset_manager" not in ss:
+                ss.preset_manager = PresetManager()
 
-                    # Format timestamp
-                    try:
-                        stored_dt = datetime.fromisoformat(stored_at)
-                        stored_str = stored_dt.strftime("%b %d, %H:%M")
-                    except:
-                        stored_str = "Unknown"
-
-                    st.markdown(f"**{key}**")
-
-                    # Truncate long values
-                    if len(str(value)) > 100:
-                        st.caption(f"{str(value)[:100]}...")
-                        with st.expander("View Full Value"):
-                            st.code(str(value), language=None)
-                    else:
-                        st.caption(f"Value: {value}")
+            preset_mgr = ss.preset_manager
 
-                    st.caption(f"Stored: {stored_str}")
+            # Get all presets
+            all_presets = preset_mgr.get_all_presets()
+            active_preset_id = preset_mgr.get_active_preset_id()
 
-                    if st.button("🗑️ Delete", key=f"delmem_{key}", use_container_width=True):
-                        delete_memory_entry(key)
+            # Build display options (remembering where the active preset lands)
+            preset_options = {}
+            active_index = None
+            for preset_id, preset in all_presets.items():
+                name = preset["name"]
+                if not preset["is_built_in"]:
+                    name = f"⭐ {name}"  # Mark custom presets with star
+                if preset_id == active_preset_id:
+                    active_index = len(preset_options)
+                preset_options[name] = preset_id
+
+            # Add "Custom" option for when user has modified settings
+            preset_options["Custom (Modified)"] = None
+            preset_names = list(preset_options)
+
+            # Determine current selection
+            current_index = len(preset_names) - 1  # Default: "Custom (Modified)"
+            if active_index is not None:
+                # Check if settings match active preset
+                if preset_mgr.settings_match_preset(ss, active_preset_id):
+                    # Settings match, show preset name
+                    current_index = active_index
+
+            # Preset selector
+            selected_display = st.selectbox(
+                "Active Preset",
+                options=preset_names,
+                index=current_index,
+                help="Quick switch between preset configurations"
+            )
 
-                    st.divider()
-            else:
-                st.info("No memory entries yet")
+            selected_id = preset_options[selected_display]
 
-        # Knowledge Base Manager (Phase 13.5)
-        st.divider()
-        st.subheader("📚 Knowledge Base")
-        with st.expander("Manage Knowledge Facts", expanded=False):
-            # Get stats
-            stats = st.session_state.app_state.get_knowledge_stats()
+            # Apply preset if changed
+            if selected_id and selected_id != active_preset_id:
+                success, message = preset_mgr.apply_preset(selected_id, ss)
+                if success:
+                    # Apply cache strategy (special handling)
+                    try:
+                        strategy_enum = CacheStrategy[ss.cache_strategy.upper()]
+                        get_client().set_cache_strategy(strategy_enum)
+                    except Exception as e:
+                        logger.error(f"Error setting cache strategy: {e}")
 
-            # Stats dashboard
-            col1, col2, col3, col4 = st.columns(4)
+                    # Apply context strategy (special handling)
+                    try:
+                        get_context_manager().set_strategy(ss.context_strategy)
+                    except Exception as e:
+                        logger.error(f"Error setting context strategy: {e}")
+
+                    st.success(f"✅ {message}")
+                    st.rerun()
+                else:
+                    st.error(f"❌ {message}")
+
+            # Action buttons
+            col1, col2 = st.columns(2)
             with col1:
-                st.metric("Total", stats["total"])
+                if st.button("💾 Save As...", use_container_width=True, help="Save current settings as preset", key="preset_save_btn"):
+                    ss.show_preset_save_dialog = True
+                    st.rerun()
             with col2:
-                st.metric("⭐ Prefs", stats["preferences"])
-            with col3:
-                st.metric("🔧 Tech", stats["technical"])
-            with col4:
-                st.metric("📁 Proj", stats["project"])
+                if st.button("⚙️ Manage", use_container_width=True, help="Manage presets", key="preset_manage_btn"):
+                    ss.show_preset_manager = True
+                    st.rerun()
 
-            st.markdown("---")
+            # Show active preset description and metadata
+            if active_preset_id and active_preset_id in all_presets:
+                preset = all_presets[active_preset_id]
+                st.caption(f"📝 {preset['description']}")
 
-            # Quick view - 5 most recent facts
-            if stats["total"] > 0:
-                recent_facts = st.session_state.app_state.get_all_knowledge(sort_by="date", sort_order="desc")[:5]
+                # Compact metadata display
+                settings = preset['settings']
 
-                st.caption("Recent Facts:")
+                # Model name mapping for display
+                model_display = {
+                    "claude-haiku-4-5-20251001": "Haiku 4.5",
+                    "claude-sonnet-4-5-20250929": "Sonnet 4.5",
+                    "claude-opus-4-5-20251101": "Opus 4.5",
+                }
+                model_name = model_display.get(settings['model'], settings['model'])
 
-                for fact in recent_facts:
-                    # Category emoji
-                    category_emoji = {
-                        "preferences": "⭐",
-                        "technical": "🔧",
-                        "project": "📁",
-                        "general": "📝"
-                    }.get(fact["category"], "📝")
+                # Build compact metadata string
+                metadata = (
+                    f"**Active:** {model_name} • "
+                    f"{settings['cache_strategy'].title()} cache • "
+                    f"{settings['context_strategy'].title()} context"
+                )
+                st.caption(metadata)
 
-                    # Truncate text
-                    text = fact["text"]
-                    if len(text) > 60:
-                        text = text[:60] + "..."
+            st.divider()
+            # ========== END PHASE 2A ==========
+
+            # Model selection
+            st.subheader("Model")
+            model_options = {
+                "Claude Opus 4.5 (Best + Vision)": ClaudeModels.OPUS_4_5.value,
+                "Claude Sonnet 4.5 (Balanced + Vision)": ClaudeModels.SONNET_4_5.value,
+                "Claude Haiku 4.5 (Fastest + Vision)": ClaudeModels.HAIKU_4_5.value,
+            }
 
-                    # Display fact
-                    st.markdown(f"{category_emoji} {text}")
-                    st.caption(f"Confidence: {fact['confidence']:.0%} | {fact.get('source', 'N/A')}")
-                    st.divider()
+            selected_model_name = st.selectbox(
+                "Choose model",
+                options=list(model_options.keys()),
+                index=1,  # Default to Sonnet 4.5
+                help="All models support vision! Opus: Best | Sonnet: Balanced | Haiku: Fast & cheap"
+            )
+            ss.model = model_options[selected_model_name]
+
+            # Tools toggle
+            st.subheader("Tools")
+            ss.tools_enabled = st.checkbox(
+                "Enable tools",
+                value=ss.tools_enabled,
+                help="Allow Claude to use tools (calculator, files, memory, etc.)"
+            )
 
-                # Action buttons
-                col_add, col_manage = st.columns(2)
-                with col_add:
-                    if st.button("➕ Add Fact", key="kb_add_btn", use_container_width=True):
-                        st.session_state.show_knowledge_manager = True
-                        st.session_state.kb_edit_fact_id = None  # Clear edit mode
-                        st.rerun()
-                with col_manage:
-                    if st.button("🔍 Manage", key="kb_manage_btn", use_container_width=True):
-                        st.session_state.show_knowledge_manager = True
-                        st.rerun()
+            if ss.tools_enabled:
+                # Count from the schemas sent to Claude - doesn't force building the registry
+                tool_count = len(ALL_TOOL_SCHEMAS)
+                st.info(f"✅ {tool_count} tools available")
 
-            else:
-                st.info("No knowledge stored yet. Add facts to help Claude remember important information across conversations!")
+                # Show available tools
+                with st.expander("View Available Tools"):
+                    for tool in sorted(ALL_TOOL_SCHEMAS):
+                        st.text(f"• {tool}")
 
-                if st.button("➕ Add Your First Fact", key="kb_add_first", use_container_width=True):
-                    st.session_state.show_knowledge_manager = True
-                    st.session_state.kb_edit_fact_id = None
-                    st.rerun()
+            # System prompt
+            st.subheader("System Prompt")
 
-        # API Usage and Cost Tracking
-        st.divider()
-        st.subheader("📊 API Usage")
-        with st.expander("Rate Limits & Costs", expanded=False):
-            # Get usage stats from client
-            if hasattr(st.session_state, 'client') and hasattr(st.session_state.client, 'rate_limiter'):
-                usage = st.session_state.client.rate_limiter.get_usage_stats()
-                status = st.session_state.client.rate_limiter.get_status_message()
+            # Prompt file selector
+            prompts_dir = Path("./prompts")
+            prompt_files = _list_prompt_files()
 
-                # Status message
-                st.write(f"**Status:** {status}")
-                st.caption("(Last 60 seconds)")
+            if prompt_files:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    selected_prompt = st.selectbox(
+                        "Load prompt template",
+                        options=["(custom)"] + prompt_files,
+                        help="Select a pre-defined system prompt"
+                    )
+                with col2:
+                    if st.button("📂 Load", use_container_width=True,
+                               disabled=(selected_prompt == "(custom)")):
+                        if selected_prompt != "(custom)":
+                            prompt_path = prompts_dir / selected_prompt
+                            try:
+                                with open(prompt_path, 'r') as f:
+                                    ss.system_prompt = f.read().strip()
+                                st.success(f"✅ Loaded {selected_prompt}")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Failed to load prompt: {e}")
 
-                # Requests
-                st.metric(
-                    "Requests",
-                    f"{usage['requests']}/{usage['requests_limit']}",
-                    delta=f"{usage['requests_percent']:.1f}%"
-                )
-                st.progress(min(usage['requests_percent'] / 100, 1.0))
+            ss.system_prompt = st.text_area(
+                "System message",
+                value=ss.system_prompt,
+                height=300,
+                help="Instructions for Claude's behavior"
+            )
 
-                # Input tokens
-                st.metric(
-                    "Input Tokens",
-                    f"{usage['input_tokens']:,}/{usage['input_tokens_limit']:,}",
-                    delta=f"{usage['input_tokens_percent']:.1f}%"
+            # Advanced settings
+            st.subheader("🎛️ Advanced Settings")
+            with st.expander("Model Parameters", expanded=False):
+                ss.temperature = st.slider(
+                    "Temperature",
+                    min_value=0.0,
+                    max_value=1.0,
+                    value=ss.temperature,
+                    step=0.1,
+                    help="Controls randomness. Higher = more creative, Lower = more focused"
                 )
-                st.progress(min(usage['input_tokens_percent'] / 100, 1.0))
 
-                # Output tokens
-                st.metric(
-                    "Output Tokens",
-                    f"{usage['output_tokens']:,}/{usage['output_tokens_limit']:,}",
-                    delta=f"{usage['output_tokens_percent']:.1f}%"
+                # Note: top_p removed due to API compatibility issues with some Claude models
+                # Keeping it as None to use Claude's default behavior
+                ss.top_p = None
+
+                ss.max_tokens = st.number_input(
+                    "Max Tokens",
+                    min_value=256,
+                    max_value=64000,
+                    value=ss.max_tokens,
+                    step=256,
+                    help="Maximum response length"
                 )
-                st.progress(min(usage['output_tokens_percent'] / 100, 1.0))
 
+                # Extended Thinking (Claude's deep reasoning mode)
                 st.divider()
+                st.markdown("**🧠 Extended Thinking**")
+                st.caption("Enable Claude to reason step-by-step before answering")
 
-                # Cost tracking
-                if hasattr(st.session_state.client, 'cost_tracker'):
-                    session_stats = st.session_state.client.cost_tracker.get_session_stats()
+                ss.thinking_enabled = st.checkbox(
+                    "Enable extended thinking",
+                    value=ss.thinking_enabled,
+                    help="Claude will think through complex problems step-by-step (requires temperature=1.0)"
+                )
 
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric(
-                            "Session Cost",
-                            f"${session_stats['cost']:.4f}",
-                            help="Cost for this session"
-                        )
-                    with col2:
-                        st.metric(
-                            "Total Tokens",
-                            f"{session_stats['total_tokens']:,}",
-                            help="Input + output tokens"
-                        )
+                if ss.thinking_enabled:
+                    ss.thinking_budget = st.slider(
+                        "Thinking budget (tokens)",
+                        min_value=1024,
+                        max_value=32000,
+                        value=ss.thinking_budget,
+                        step=1024,
+                        help="Higher = deeper reasoning, but costs more. Billed at output token rate."
+                    )
+                    st.caption(f"💭 Up to {ss.thinking_budget:,} tokens for reasoning")
+                    if ss.temperature != 1.0:
+                        st.warning("⚠️ Extended thinking requires temperature=1.0 (will be overridden)")
+
+            # Sub-agent settings
+            with st.expander("🤖 Sub-Agent Settings", expanded=False):
+                st.markdown("**Default Sub-Agent Model:**")
+                st.caption("Model used when spawning sub-agents (affects cost)")
+
+                ss.default_subagent_model = st.selectbox(
+                    "Sub-agent model",
+                    options=[
+                        "Haiku (fast & cheap)",
+                        "Sonnet (balanced)",
+                        "Opus (best quality)"
+                    ],
+                    index=["Haiku (fast & cheap)", "Sonnet (balanced)", "Opus (best quality)"].index(
+                        ss.default_subagent_model
+                    ),
+                    help="Haiku recommended for cost efficiency",
+                    label_visibility="collapsed"
+                )
 
-                    st.caption(f"Requests this session: {session_stats['request_count']}")
+                # Cost indicator
+                cost_info = {
+                    "Haiku (fast & cheap)": "💰 ~$0.25 per 1M input tokens",
+                    "Sonnet (balanced)": "💰💰 ~$3 per 1M input tokens",
+                    "Opus (best quality)": "💰💰💰 ~$15 per 1M input tokens"
+                }
+                st.caption(cost_info[ss.default_subagent_model])
 
-            else:
-                st.info("Usage tracking not available")
+        if sidebar_section == SIDEBAR_SECTION_HISTORY:
+            # Conversation browser (Phase 12: Enhanced with search & filters)
+            # Phase 13.4: Added semantic search
+            st.divider()
+            st.subheader("📚 Conversation History")
 
-        # Cache Management (Phase 14)
-        st.divider()
-        st.subheader("💾 Cache Management")
-        with st.expander("Prompt Caching", expanded=False):
-            # Cache status indicator
-            if st.session_state.cache_strategy == "disabled":
-                st.info("🔴 Cache: Disabled")
-            else:
-                cache_stats = st.session_state.client.cache_tracker.get_session_stats()
-                hit_rate = cache_stats.get("cache_hit_rate", 0) * 100
+            # Phase 13.4: Search mode toggle
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                search_mode = st.selectbox(
+                    "Search mode",
+                    options=["keyword", "semantic", "hybrid"],
+                    index=["keyword", "semantic", "hybrid"].index(ss.search_mode),
+                    help="Keyword: exact text matching | Semantic: meaning-based search | Hybrid: both",
+                    label_visibility="collapsed"
+                )
+                ss.search_mode = search_mode
+            with col2:
+                # Index status button
+                if st.button("📊 Index", use_container_width=True, help="View indexing status"):
+                    ss.show_index_status = not ss.show_index_status
 
-                if hit_rate >= 70:
-                    status_icon = "🟢"
-                elif hit_rate >= 40:
-                    status_icon = "🟡"
-                else:
-                    status_icon = "🟠"
+            # Show index status if toggled
+            if ss.show_index_status:
+                try:
+                    app_state = ss.app_state
+                    stats = _cached_index_stats(
+                        (app_state.store.index_version(), _file_version(Path("./sandbox/index_status.json"))),
+                        app_state
+                    )
 
-                st.info(f"{status_icon} Cache: Active ({st.session_state.cache_strategy.title()})")
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Total", stats['total_conversations'])
+                    with col2:
+                        st.metric("Indexed", stats['indexed_conversations'])
+                    with col3:
+                        pct = (stats['indexed_conversations'] / stats['total_conversations'] * 100) if stats['total_conversations'] > 0 else 0
+                        st.metric("Coverage", f"{pct:.0f}%")
 
-            # Quick stats
-            if st.session_state.cache_strategy != "disabled":
+                    # Re-index button
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("🔄 Re-index All", use_container_width=True, help="Force re-index all conversations"):
+                            with st.spinner("Indexing conversations..."):
+                                result = ss.app_state.index_all_conversations(force=True)
+                                st.success(f"✅ Indexed {result['indexed']} conversations in {result['duration_seconds']:.1f}s")
+                                st.rerun()
+                    with col2:
+                        if st.button("➕ Index New", use_container_width=True, help="Index unindexed conversations only"):
+                            with st.spinner("Indexing new conversations..."):
+                                result = ss.app_state.index_all_conversations(force=False)
+                                if result['indexed'] > 0:
+                                    st.success(f"✅ Indexed {result['indexed']} new conversations")
+                                else:
+                                    st.info("All conversations already indexed")
+                                st.rerun()
+
+                except Exception as e:
+                    st.error(f"Error loading index stats: {e}")
+
+            # Search bar
+            search_placeholder = {
+                "keyword": "Search in titles and messages...",
+                "semantic": "Search by meaning (e.g., 'discussions about AI')...",
+                "hybrid": "Search by keywords and meaning..."
+            }.get(search_mode, "Search conversations...")
+
+            # Search runs on submit (Enter or button), not on every keystroke
+            with st.form("conv_search_form", border=False):
+                search_draft = st.text_input(
+                    f"🔍 Search conversations ({search_mode})",
+                    value=ss.search_query,
+                    placeholder=search_placeholder,
+                    key="search_input"
+                )
+                search_submitted = st.form_submit_button("Search", use_container_width=True)
+            if search_submitted and search_draft != ss.search_query:
+                ss.search_query = search_draft
+                ss.conv_page = 0  # New results start on the first page
+            search_query = ss.search_query
+
+            # Filters expander
+            with st.expander("🎯 Filters", expanded=False):
+                # Get all available tags
+                app_state = ss.app_state
+                all_tags = _cached_all_tags(app_state.store.index_version(), app_state)
+
+                if all_tags:
+                    ss.filter_tags = st.multiselect(
+                        "Tags",
+                        options=all_tags,
+                        default=ss.filter_tags,
+                        help="Filter by tags"
+                    )
+
+                # Favorite/Archived filters
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.metric(
-                        "Hit Rate",
-                        f"{hit_rate:.1f}%",
-                        help="Percentage of requests using cache"
+                    ss.filter_favorites = st.checkbox(
+                        "⭐ Favorites only",
+                        value=ss.filter_favorites
                     )
                 with col2:
-                    savings = cache_stats.get("cost_savings", 0)
-                    st.metric(
-                        "Savings",
-                        f"${savings:.4f}",
-                        help="Cost saved this session"
+                    ss.filter_archived = st.checkbox(
+                        "📦 Show archived",
+                        value=ss.filter_archived
                     )
 
-            # Strategy selector
-            st.caption("**Caching Strategy:**")
-            strategy_options = {
-                "Disabled": "disabled",
-                "Conservative (System + Tools)": "conservative",
-                "Balanced (+ History)": "balanced",
-                "Aggressive (Max Savings)": "aggressive"
-            }
-
-            selected_strategy = st.selectbox(
-                "Select strategy",
-                options=list(strategy_options.keys()),
-                index=list(strategy_options.values()).index(st.session_state.cache_strategy),
-                key="cache_strategy_select",
-                label_visibility="collapsed"
-            )
-
-            new_strategy = strategy_options[selected_strategy]
-            if new_strategy != st.session_state.cache_strategy:
-                st.session_state.cache_strategy = new_strategy
-
-                # Update client cache strategy
-                from core.cache_manager import CacheStrategy
-                strategy_enum = CacheStrategy[new_strategy.upper()]
-                st.session_state.client.set_cache_strategy(strategy_enum)
-
-                st.success(f"✅ Strategy changed to: {new_strategy.title()}")
-                st.rerun()
-
-            # Manage button
-            if st.button("📊 Manage Cache", use_container_width=True, key="open_cache_manager"):
-                st.session_state.show_cache_manager = True
-                st.rerun()
-
-        # Context Management (Phase 9)
-        st.divider()
-        st.subheader("🧠 Context Management")
-        with st.expander("Context Usage & Strategy", expanded=False):
-            # Get context stats
-            if hasattr(st.session_state, 'context_manager'):
-                stats = st.session_state.context_manager.get_context_stats(
-                    st.session_state.messages,
-                    st.session_state.system_prompt,
-                    ALL_TOOL_SCHEMAS if st.session_state.tools_enabled else None
+                # Message count filter
+                ss.filter_msg_count_min = st.slider(
+                    "Min messages",
+                    min_value=0,
+                    max_value=100,
+                    value=ss.filter_msg_count_min,
+                    step=1
                 )
 
-                # Context usage display
-                st.write("**Current Context:**")
-                usage_percent = stats['usage_percent']
-
-                # Color-code based on usage
-                if usage_percent < 50:
-                    color_class = "🟢"
-                elif usage_percent < 70:
-                    color_class = "🟡"
-                else:
-                    color_class = "🔴"
+                # Clear filters button
+                if st.button("🔄 Clear Filters", use_container_width=True):
+                    ss.search_query = ""
+                    ss.pop("search_input", None)  # Reset the form's draft text
+                    ss.filter_tags = []
+                    ss.filter_favorites = False
+                    ss.filter_archived = False
+                    ss.filter_msg_count_min = 0
+                    st.rerun()
 
-                st.metric(
-                    "Context",
-                    f"{stats['total_tokens']:,}/{stats['max_tokens']:,} tokens",
-                    delta=f"{usage_percent:.1f}% {color_class}"
-                )
-                st.progress(min(usage_percent / 100, 1.0))
+            # Batch operations toggle
+            ss.batch_mode = st.checkbox(
+                "📋 Batch Mode",
+                value=ss.batch_mode,
+                help="Select multiple conversations for batch operations"
+            )
 
-                # Token breakdown
-                st.caption("**Breakdown:**")
-                st.caption(f"• Messages: {stats['messages_tokens']:,} tokens")
-                st.caption(f"• System: {stats['system_tokens']:,} tokens")
-                st.caption(f"• Tools: {stats['tools_tokens']:,} tokens")
-                st.caption(f"• Remaining: {stats['remaining_tokens']:,} tokens")
+            render_conversation_browser()
 
-                st.divider()
+            # Export/Import/Config buttons (Phase 12)
+            st.divider()
+            st.subheader("💾 Data Management")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                if st.button("📤 Export", use_container_width=True, help="Export conversations"):
+                    ss.show_export_dialog = True
+                    st.rerun()
+            with col2:
+                if st.button("📥 Import", use_container_width=True, help="Import conversations"):
+                    ss.show_import_dialog = True
+                    st.rerun()
+            with col3:
+                if st.button("⚙️ Config", use_container_width=True, help="Manage settings"):
+                    ss.show_config_dialog = True
+                    st.rerun()
+            with col4:
+                if st.button("🧹 Cleanup", use_container_width=True, help="Remove orphan entries"):
+                    # Preview what would be deleted
+                    preview = ss.app_state.cleanup_single_message_conversations(dry_run=True)
+                    ss.cleanup_preview = preview
+                    ss.show_cleanup_dialog = True
+                    st.rerun()
 
-                # Context strategy settings
-                st.write("**Management Strategy:**")
+            # File browser
+            st.subheader("📁 File Browser")
+            if lazy_section_open("Browse Sandbox Files", "show_file_browser"):
+                with st.container(border=True):
+                    files = list_sandbox_files()
 
-                strategy_options = {
-                    "Aggressive - 50% threshold (keeps 5 recent)": "aggressive",
-                    "Balanced - 70% threshold (keeps 10 recent)": "balanced",
-                    "Conservative - 85% threshold (keeps 20 recent)": "conservative",
-                    "Manual - No auto-summarization": "manual"
-                }
+                    protected_files = ["conversations.json", "memory.json", "agents.json"]
 
-                # Find current strategy display name
-                current_display = next(
-                    (k for k, v in strategy_options.items()
-                     if v == st.session_state.context_strategy),
-                    list(strategy_options.keys())[1]  # Default to balanced
-                )
+                    if files:
+                        for file_info in files:
+                            filename = file_info["name"]
+                            size = file_info["size_str"]
+                            modified = file_info["modified_str"]
+                            is_protected = filename in protected_files
 
-                selected_strategy_display = st.selectbox(
-                    "Strategy",
-                    options=list(strategy_options.keys()),
-                    index=list(strategy_options.keys()).index(current_display),
-                    help="When to summarize older messages"
-                )
+                            st.markdown(f"**{filename}**")
+                            st.caption(f"{size} • Modified: {modified}")
 
-                new_strategy = strategy_options[selected_strategy_display]
-                if new_strategy != st.session_state.context_strategy:
-                    st.session_state.context_strategy = new_strategy
-                    st.session_state.context_manager.set_strategy(new_strategy)
-
-                # Preserve recent messages slider
-                st.session_state.preserve_recent_count = st.slider(
-                    "Preserve Recent Messages",
-                    min_value=1,
-                    max_value=50,
-                    value=st.session_state.preserve_recent_count,
-                    help="Number of recent messages to never summarize"
-                )
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                if st.button("👁️ View", key=f"view_{filename}", use_container_width=True):
+                                    try:
+                                        with open(file_info["path"], 'r') as f:
+                                            content = f.read()
+                                        st.code(content, language=None)
+                                    except Exception as e:
+                                        st.error(f"Error reading file: {e}")
 
-                # Auto-summarize toggle
-                st.session_state.auto_summarize = st.checkbox(
-                    "Enable Auto-Summarization",
-                    value=st.session_state.auto_summarize,
-                    help="Automatically summarize when context threshold reached"
-                )
+                            with col2:
+                                if is_protected:
+                                    st.button("🔒 Protected", key=f"protect_{filename}", disabled=True, use_container_width=True)
+                                else:
+                                    if st.button("🗑️ Delete", key=f"delfile_{filename}", use_container_width=True):
+                                        try:
+                                            os.remove(file_info["path"])
+                                            invalidate_sandbox_listing()
+                                            st.success(f"✅ Deleted {filename}")
+                                            st.rerun()
+                                        except Exception as e:
+                                            st.error(f"Error: {e}")
 
-                # Force summarize button
-                if st.button("📝 Force Summarize Now", use_container_width=True):
-                    if len(st.session_state.messages) > st.session_state.preserve_recent_count:
-                        managed_messages, summary_info = st.session_state.context_manager.force_summarize(
-                            st.session_state.messages,
-                            preserve_recent=st.session_state.preserve_recent_count
-                        )
-                        st.session_state.messages = managed_messages
-                        st.success(f"✅ {summary_info}")
-                        st.rerun()
+                            st.divider()
                     else:
-                        st.warning("Not enough messages to summarize")
+                        st.info("No files in sandbox yet")
 
-                # Statistics
-                if stats.get('total_summarized', 0) > 0:
-                    st.divider()
-                    st.caption("**Statistics:**")
-                    st.caption(f"• Messages summarized: {stats['total_summarized']}")
-                    st.caption(f"• Tokens saved: {stats['total_saved']:,}")
-                    st.caption(f"• Bookmarked: {stats['bookmarked_count']}")
+            # Memory viewer
+            st.subheader("🧠 Memory Viewer")
+            if lazy_section_open("Browse Memory Entries", "show_memory_viewer"):
+                with st.container(border=True):
+                    memory_data = load_memory_data()
 
-            else:
-                st.info("Context management not initialized")
+                    if memory_data:
+                        st.info(f"📊 {len(memory_data)} entries stored")
 
-        # Streaming Settings (Phase 11)
-        st.divider()
-        st.subheader("⚡ Streaming")
-        with st.expander("Streaming Settings", expanded=False):
-            # Enable/disable streaming
-            st.session_state.streaming_enabled = st.toggle(
-                "Enable Real-time Streaming",
-                value=st.session_state.streaming_enabled,
-                help="Stream responses in real-time (word-by-word, faster perceived response)"
-            )
+                        for key, entry in memory_data.items():
+                            value = entry.get("value", "")
+                            stored_at = entry.get("stored_at", "")
 
-            if st.session_state.streaming_enabled:
-                # Show tool execution
-                st.session_state.show_tool_execution = st.toggle(
-                    "Show Tool Execution",
-                    value=st.session_state.show_tool_execution,
-                    help="Display tools as they execute (with progress indicators)"
-                )
+                            # Format timestamp
+                            try:
+                                stored_dt = datetime.fromisoformat(stored_at)
+                                stored_str = stored_dt.strftime("%b %d, %H:%M")
+                            except:
+                                stored_str = "Unknown"
 
-                # Show partial results
-                st.session_state.show_partial_results = st.toggle(
-                    "Show Partial Tool Results",
-                    value=st.session_state.show_partial_results,
-                    help="Show tool results immediately when available"
-                )
+                            st.markdown(f"**{key}**")
 
-                st.caption("**Benefits:**")
-                st.caption("• Faster perceived response")
-                st.caption("• Real-time tool visibility")
-                st.caption("• Better engagement")
-            else:
-                st.info("Streaming disabled. Using blocking mode with spinner.")
+                            # Truncate long values
+                            if len(str(value)) > 100:
+                                st.caption(f"{str(value)[:100]}...")
+                                with st.expander("View Full Value"):
+                                    st.code(str(value), language=None)
+                            else:
+                                st.caption(f"Value: {value}")
 
-        # Agent Management (Phase 10)
-        st.divider()
-        st.subheader("📦 Agent Management")
-        with st.expander("Multi-Agent System", expanded=False):
-            # Import agent manager
-            from tools.agents import _agent_manager
+                            st.caption(f"Stored: {stored_str}")
 
-            # Refresh button
-            if st.button("🔄 Refresh Status", key="refresh_agents", use_container_width=True):
-                st.rerun()
+                            if st.button("🗑️ Delete", key=f"delmem_{key}", use_container_width=True):
+                                delete_memory_entry(key)
 
-            # Get all agents
-            agents_data = _agent_manager.list_agents()
+                            st.divider()
+                    else:
+                        st.info("No memory entries yet")
 
-            if agents_data:
-                # Count by status
-                running = sum(1 for a in agents_data if a["status"] == "running")
-                completed = sum(1 for a in agents_data if a["status"] == "completed")
-                failed = sum(1 for a in agents_data if a["status"] == "failed")
-
-                st.caption(f"**Active Agents** ({len(agents_data)} total)")
-
-                # Display each agent
-                for agent in agents_data:
-                    # Status emoji
-                    status_emoji = {
-                        "pending": "⏳",
-                        "running": "🔄",
-                        "completed": "✅",
-                        "failed": "❌"
-                    }
+            # Knowledge Base Manager (Phase 13.5)
+            st.divider()
+            st.subheader("📚 Knowledge Base")
+            if lazy_section_open("Manage Knowledge Facts", "show_knowledge_panel"):
+                with st.container(border=True):
+                    # Get stats (cached until the vector DB changes - tools write to it too)
+                    knowledge_version = _knowledge_version()
+                    stats = _cached_knowledge_stats(knowledge_version, ss.app_state)
+
+                    # Stats dashboard
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Total", stats["total"])
+                    with col2:
+                        st.metric("⭐ Prefs", stats["preferences"])
+                    with col3:
+                        st.metric("🔧 Tech", stats["technical"])
+                    with col4:
+                        st.metric("📁 Proj", stats["project"])
+
+                    st.markdown("---")
+
+                    # Quick view - 5 most recent facts
+                    if stats["total"] > 0:
+                        recent_facts = _cached_recent_knowledge(knowledge_version, ss.app_state)
+
+                        st.caption("Recent Facts:")
+
+                        for fact in recent_facts:
+                            # Category emoji
+                            category_emoji = {
+                                "preferences": "⭐",
+                                "technical": "🔧",
+                                "project": "📁",
+                                "general": "📝"
+                            }.get(fact["category"], "📝")
+
+                            # Truncate text
+                            text = fact["text"]
+                            if len(text) > 60:
+                                text = text[:60] + "..."
+
+                            # Display fact
+                            st.markdown(f"{category_emoji} {text}")
+                            st.caption(f"Confidence: {fact['confidence']:.0%} | {fact.get('source', 'N/A')}")
+                            st.divider()
 
-                    with st.container():
-                        st.markdown(f"{status_emoji.get(agent['status'], '❔')} **Agent #{agent['agent_id'][-6:]}**")
-
-                        # Task preview
-                        task = agent['task']
-                        if len(task) > 60:
-                            task = task[:60] + "..."
-                        st.caption(f"Task: *{task}*")
-
-                        # Info row
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.caption(f"Type: {agent['agent_type']}")
-                        with col2:
-                            st.caption(f"Status: {agent['status']}")
-
-                        # Action button
-                        if agent['status'] == 'completed':
-                            if st.button("📄 View Result", key=f"result_{agent['agent_id']}", use_container_width=True):
-                                st.session_state.view_agent_result = agent['agent_id']
+                        # Action buttons
+                        col_add, col_manage = st.columns(2)
+                        with col_add:
+                            if st.button("➕ Add Fact", key="kb_add_btn", use_container_width=True):
+                                ss.show_knowledge_manager = True
+                                ss.kb_edit_fact_id = None  # Clear edit mode
+                                st.rerun()
+                        with col_manage:
+                            if st.button("🔍 Manage", key="kb_manage_btn", use_container_width=True):
+                                ss.show_knowledge_manager = True
                                 st.rerun()
-                        elif agent['status'] == 'failed':
-                            st.caption("❌ Failed")
-                        elif agent['status'] == 'running':
-                            st.caption("⏳ In progress...")
 
-                        st.divider()
+                    else:
+                        st.info("No knowledge stored yet. Add facts to help Claude remember important information across conversations!")
 
-                # Statistics
-                st.caption("**Statistics:**")
-                st.caption(f"• Total: {len(agents_data)} | Running: {running} | Completed: {completed} | Failed: {failed}")
+                        if st.button("➕ Add Your First Fact", key="kb_add_first", use_container_width=True):
+                            ss.show_knowledge_manager = True
+                            ss.kb_edit_fact_id = None
+                            st.rerun()
 
-            else:
-                st.info("No agents spawned yet")
+        if sidebar_section == SIDEBAR_SECTION_SETTINGS:
+            render_api_usage_panel()
+            render_cache_panel()
+            render_context_panel()
+            render_streaming_panel()
 
-            # Quick session access
+        if sidebar_section == SIDEBAR_SECTION_AGENTS:
+            # Agent Management (Phase 10)
             st.divider()
-            st.markdown("### 💬 Quick Access")
-            col1, col2, col3 = st.columns(3)
+            st.subheader("📦 Agent Management")
+            if lazy_section_open("Multi-Agent System", "show_agent_management"):
+                with st.container(border=True):
+                    render_agent_list_panel(agents_data, status_counts)
 
-            with col1:
-                if st.button("🆕 New Chat", use_container_width=True):
-                    start_new_conversation()
+                    # Quick session access
+                    st.divider()
+                    st.markdown("### 💬 Quick Access")
+                    col1, col2, col3 = st.columns(3)
 
-            with col2:
-                # Recent conversations dropdown
-                conversations = st.session_state.app_state.get_conversations()
-                if conversations:
-                    recent_convs = sorted(
-                        conversations,
-                        key=lambda x: x.get("updated_at", ""),
-                        reverse=True
-                    )[:5]
-
-                    conv_options = {}
-                    for conv in recent_convs:
-                        conv_id = conv.get("id")
-                        updated = conv.get("updated_at", "")
-                        try:
-                            dt = datetime.fromisoformat(updated)
-                            time_str = dt.strftime("%b %d %H:%M")
-                        except:
-                            time_str = "Unknown"
-                        msg_count = len(conv.get("messages", []))
-                        label = f"{time_str} ({msg_count} msgs)"
-                        conv_options[label] = conv_id
-
-                    selected = st.selectbox(
-                        "Load Recent",
-                        options=[""] + list(conv_options.keys()),
-                        label_visibility="collapsed",
-                        key="quick_load_conv"
-                    )
+                    with col1:
+                        if st.button("🆕 New Chat", use_container_width=True):
+                            start_new_conversation()
 
-                    if selected and selected != "":
-                        load_conversation(conv_options[selected])
+                    with col2:
+                        # Recent conversations dropdown
+                        app_state = ss.app_state
+                        conv_options = _cached_recent_conv_options(app_state.store.index_version(), app_state)
+                        if conv_options:
+                            selected = st.selectbox(
+                                "Load Recent",
+                                options=[""] + list(conv_options.keys()),
+                                label_visibility="collapsed",
+                                key="quick_load_conv"
+                            )
 
-            with col3:
-                pass  # Reserve for future use
+                            if selected and selected != "":
+                                load_conversation(conv_options[selected])
 
-            # Action buttons
-            st.divider()
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("➕ Spawn Agent", key="spawn_agent_btn", use_container_width=True):
-                    st.session_state.show_spawn_agent = True
-                    st.rerun()
-            with col2:
-                if st.button("🗳️ Council", key="council_btn", use_container_width=True):
-                    st.session_state.show_council = True
-                    st.rerun()
+                    with col3:
+                        pass  # Reserve for future use
+
+                    # Action buttons
+                    st.divider()
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("➕ Spawn Agent", key="spawn_agent_btn", use_container_width=True):
+                            ss.show_spawn_agent = True
+                            st.rerun()
+                    with col2:
+                        if st.button("🗳️ Council", key="council_btn", use_container_width=True):
+                            ss.show_council = True
+                            st.rerun()
 
         # Clear chat
         st.divider()
         if st.button("🗑️ Clear Chat", use_container_width=True):
             # Auto-save before clearing if enabled
-            if st.session_state.auto_save_enabled and len(st.session_state.messages) > 0:
+            if ss.auto_save_enabled and len(ss.messages) > 0:
                 auto_save_current_conversation()
                 st.success("💾 Conversation saved before clearing")
 
@@ -3394,51 +3944,84 @@ Use `vector_search_village()` to discover what others have shared.
 
         # Stats
         st.divider()
-        st.caption(f"Messages: {len(st.session_state.messages)}")
-        st.caption(f"Model: {st.session_state.model.split('-')[-1]}")
+        st.caption(f"Messages: {len(ss.messages)}")
+        st.caption(f"Model: {ss.model.split('-')[-1]}")
+
+
+def _render_image_block(item: Dict[str, Any]):
+    """Render a base64 image content block"""
+    source = item.get("source", {})
+    if source.get("type") == "base64":
+        try:
+            # Raw bytes go through Streamlit's media file store (served
+            # by URL) instead of re-sending the base64 text every rerun
+            st.image(decode_image_base64(source.get("data", "")), width=300)
+        except Exception as e:
+            st.error(f"Error displaying image: {e}")
+
+
+def _render_content(content: Any, show_images: bool):
+    """
+    Render message content in either stored shape.
+
+    Args:
+        content: Plain string or list of content blocks
+        show_images: Render image blocks (user messages) or skip them
+    """
+    if isinstance(content, str):
+        st.markdown(content)
+    elif isinstance(content, list):
+        for item in content:
+            if not isinstance(item, dict):
+                continue
+            block_type = item.get("type")
+            if block_type == "text":
+                st.markdown(item.get("text", ""))
+            elif block_type == "image" and show_images:
+                _render_image_block(item)
+
+
+def _render_user_message(content: Any):
+    """Render a user message (text and/or images)"""
+    with st.chat_message("user", avatar="👤"):
+        _render_content(content, show_images=True)
+
+
+def _render_assistant_message(content: Any):
+    """Render an assistant message"""
+    with st.chat_message("assistant", avatar="🤖"):
+        _render_content(content, show_images=False)
+
+
+def _render_system_message(content: Any):
+    """Render a system notice"""
+    with st.chat_message("system", avatar="ℹ️"):
+        st.info(content)
+
+
+# Role -> renderer (unknown roles are not rendered)
+_MESSAGE_RENDERERS: Dict[str, Callable[[Any], None]] = {
+    "user": _render_user_message,
+    "assistant": _render_assistant_message,
+    "system": _render_system_message,
+}
 
 
 def render_message(message: Dict[str, Any]):
     """Render a chat message (supports text and images)"""
-    role = message["role"]
-    content = message["content"]
-
-    if role == "user":
-        with st.chat_message("user", avatar="👤"):
-            # Handle array content (with images)
-            if isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict):
-                        if item.get("type") == "text":
-                            st.markdown(item["text"])
-                        elif item.get("type") == "image":
-                            # Display image from base64
-                            source = item.get("source", {})
-                            if source.get("type") == "base64":
-                                media_type = source.get("media_type", "image/jpeg")
-                                data = source.get("data", "")
-                                try:
-                                    st.image(f"data:{media_type};base64,{data}", width=300)
-                                except Exception as e:
-                                    st.error(f"Error displaying image: {e}")
-            # Handle string content (backward compatibility)
-            elif isinstance(content, str):
-                st.markdown(content)
-
-    elif role == "assistant":
-        with st.chat_message("assistant", avatar="🤖"):
-            # Assistant responses are typically strings
-            if isinstance(content, str):
-                st.markdown(content)
-            elif isinstance(content, list):
-                # Handle multi-content responses
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        st.markdown(item.get("text", ""))
-
-    elif role == "system":
-        with st.chat_message("system", avatar="ℹ️"):
-            st.info(content)
+    renderer = _MESSAGE_RENDERERS.get(message["role"])
+    if renderer is not None:
+        renderer(message["content"])
+
+
+def _block_text(block) -> Optional[str]:
+    """Text of a response content block (SDK object or dict), None for non-text blocks"""
+    block_type = getattr(block, 'type', None)  # One lookup instead of hasattr + attribute
+    if block_type is not None:
+        return block.text if block_type == 'text' else None
+    if isinstance(block, dict) and block.get('type') == 'text':
+        return block.get('text', '')
+    return None
 
 
 def extract_text_from_response(response) -> str:
@@ -3446,16 +4029,9 @@ def extract_text_from_response(response) -> str:
     if response is None:
         return ""
 
-    text_parts = []
-
-    for block in response.content:
-        if hasattr(block, 'type'):
-            if block.type == 'text':
-                text_parts.append(block.text)
-        elif isinstance(block, dict) and block.get('type') == 'text':
-            text_parts.append(block.get('text', ''))
-
-    return '\n'.join(text_parts) if text_parts else ""
+    return '\n'.join(
+        text for text in map(_block_text, response.content) if text is not None
+    )
 
 
 def process_message(user_message: str, uploaded_images: Optional[List] = None):
@@ -3480,20 +4056,12 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
     if uploaded_images:
         for img_file in uploaded_images:
             try:
-                # Read image bytes
-                img_bytes = img_file.read()
-
-                # Validate size
-                is_valid, error_msg = validate_image_size(img_bytes)
-                if not is_valid:
+                # Validated + encoded image block (cached per upload)
+                image_content, error_msg = uploaded_image_content(img_file)
+                if image_content is None:
                     st.error(error_msg)
                     continue
 
-                # Get media type
-                media_type = get_media_type(img_file.name)
-
-                # Create image content block
-                image_content = create_image_content(img_bytes, media_type)
                 content.append(image_content)
 
             except Exception as e:
@@ -3520,28 +4088,26 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
             elif item.get("type") == "image":
                 source = item.get("source", {})
                 if source.get("type") == "base64":
-                    media_type = source.get("media_type", "image/jpeg")
-                    data = source.get("data", "")
-                    st.image(f"data:{media_type};base64,{data}", width=300)
-
-    # Prepare messages for Claude
-    conversation_messages = []
-    for msg in st.session_state.messages:
-        if msg["role"] in ["user", "assistant"]:
-            conversation_messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+                    st.image(decode_image_base64(source.get("data", "")), width=300)
+
+    # Prepare messages for Claude. The session list is usually all user/assistant
+    # entries, and is then passed by reference (the tool loop works on its own
+    # copy); loaded conversations may also carry stored roles the API rejects
+    conversation_messages = st.session_state.messages
+    if not all(msg["role"] in API_MESSAGE_ROLES for msg in conversation_messages):
+        conversation_messages = [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in conversation_messages
+            if msg["role"] in API_MESSAGE_ROLES
+        ]
 
     # Get tools if enabled
-    tools = None
-    if st.session_state.tools_enabled:
-        tools = list(ALL_TOOL_SCHEMAS.values())
+    tools = TOOL_SCHEMA_LIST if st.session_state.tools_enabled else None
 
     # Apply context management (Phase 9)
     messages_for_api = conversation_messages
-    if st.session_state.auto_summarize and hasattr(st.session_state, 'context_manager'):
-        managed_messages, summary_info = st.session_state.context_manager.manage_context(
+    if st.session_state.auto_summarize:
+        managed_messages, summary_info = get_context_manager().manage_context(
             messages=conversation_messages,
             system=st.session_state.system_prompt,
             tools=tools,
@@ -3560,9 +4126,6 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
         try:
             # Choose streaming or non-streaming based on settings (Phase 11)
             if st.session_state.streaming_enabled:
-                # Import streaming UI components
-                from ui.streaming_display import StreamingTextDisplay, ToolExecutionDisplay
-
                 # Create display containers
                 tool_container = st.empty() if st.session_state.show_tool_execution else None
                 thinking_container = st.empty()  # For extended thinking expander
@@ -3572,7 +4135,7 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
                 text_display = StreamingTextDisplay(text_container)
                 tool_display = ToolExecutionDisplay(tool_container) if tool_container else None
 
-                response_text = ""
+                response_chunks = []  # Text deltas, joined once the stream ends
                 thinking_text = ""  # Accumulate thinking content
                 thinking_active = False
 
@@ -3582,7 +4145,7 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
                     thinking_budget = st.session_state.get("thinking_budget", 10000)
 
                 # Run streaming loop
-                stream_gen = st.session_state.loop.run_streaming(
+                stream_gen = get_loop().run_streaming(
                     messages=messages_for_api,
                     system=st.session_state.system_prompt,
                     model=st.session_state.model,
@@ -3593,79 +4156,96 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
                     thinking_budget=thinking_budget
                 )
 
-                # Process stream events
-                for event in stream_gen:
-                    event_type = event.get("type")
-
-                    if event_type == "text_delta":
-                        # Append text chunk
-                        text_display.append(event["data"])
-                        response_text += event["data"]
-
-                    elif event_type == "thinking_start":
-                        # Extended thinking started
-                        thinking_active = True
-                        thinking_text = ""
-                        with thinking_container:
-                            with st.expander("🧠 Thinking...", expanded=True):
-                                st.markdown("*Claude is reasoning through the problem...*")
-
-                    elif event_type == "thinking_delta":
-                        # Extended thinking content streaming
-                        thinking_text += event["data"]
-                        # Update the thinking expander with accumulated content
-                        with thinking_container:
-                            with st.expander("🧠 Thinking...", expanded=True):
-                                st.markdown(thinking_text)
-
-                    elif event_type == "thinking_end":
-                        # Extended thinking complete
-                        thinking_active = False
-                        # Show final thinking in collapsed expander
-                        with thinking_container:
-                            with st.expander("🧠 Extended Thinking (click to expand)", expanded=False):
-                                st.markdown(thinking_text)
-
-                    elif event_type == "thinking":
-                        # Legacy thinking status (processing indicator)
-                        if not response_text and not thinking_active:
-                            text_display.show_status(event["data"])
-
-                    elif event_type == "tool_start" and tool_display:
-                        # Tool execution starting
-                        tool_display.start_tool(
-                            event["data"]["id"],
-                            event["data"]["name"]
-                        )
-
-                    elif event_type == "tool_executing" and tool_display:
-                        # Tool executing with input details
-                        tool_display.start_tool(
-                            event["data"]["id"],
-                            event["data"]["name"],
-                            event["data"]["input"]
+                # Stream event handlers - one dict lookup per event instead of an
+                # if/elif chain; a handler returns True to stop reading the stream
+                def on_text_delta(data):
+                    # Append text chunk
+                    text_display.append(data)
+                    response_chunks.append(data)
+
+                def on_thinking_start(data):
+                    # Extended thinking started
+                    nonlocal thinking_active, thinking_text
+                    thinking_active = True
+                    thinking_text = ""
+                    with thinking_container:
+                        with st.expander("🧠 Thinking...", expanded=True):
+                            st.markdown("*Claude is reasoning through the problem...*")
+
+                def on_thinking_delta(data):
+                    # Extended thinking content streaming
+                    nonlocal thinking_text
+                    thinking_text += data
+                    # Update the thinking expander with accumulated content
+                    with thinking_container:
+                        with st.expander("🧠 Thinking...", expanded=True):
+                            st.markdown(thinking_text)
+
+                def on_thinking_end(data):
+                    # Extended thinking complete
+                    nonlocal thinking_active
+                    thinking_active = False
+                    # Show final thinking in collapsed expander
+                    with thinking_container:
+                        with st.expander("🧠 Extended Thinking (click to expand)", expanded=False):
+                            st.markdown(thinking_text)
+
+                def on_thinking(data):
+                    # Legacy thinking status (processing indicator)
+                    if not response_chunks and not thinking_active:
+                        text_display.show_status(data)
+
+                def on_tool_start(data):
+                    # Tool execution starting
+                    tool_display.start_tool(data["id"], data["name"])
+
+                def on_tool_executing(data):
+                    # Tool executing with input details
+                    tool_display.start_tool(data["id"], data["name"], data["input"])
+
+                def on_tool_complete(data):
+                    # Tool completed
+                    if st.session_state.show_partial_results:
+                        tool_display.complete_tool(
+                            data["id"],
+                            data["result"],
+                            data.get("is_error", False),
+                            data.get("duration")
                         )
 
-                    elif event_type == "tool_complete" and tool_display:
-                        # Tool completed
-                        if st.session_state.show_partial_results:
-                            tool_display.complete_tool(
-                                event["data"]["id"],
-                                event["data"]["result"],
-                                event["data"].get("is_error", False),
-                                event["data"].get("duration")
-                            )
-
-                    elif event_type == "error":
-                        # Error occurred
-                        error_data = event["data"]
-                        st.error(f"**Error:** {error_data.get('error', 'Unknown error')}")
+                def on_error(data):
+                    # Error occurred
+                    st.error(f"**Error:** {data.get('error', 'Unknown error')}")
+
+                def on_done(data):
+                    # Stream complete
+                    text_display.finalize()
+                    return True
+
+                stream_handlers = {
+                    "text_delta": on_text_delta,
+                    "thinking_start": on_thinking_start,
+                    "thinking_delta": on_thinking_delta,
+                    "thinking_end": on_thinking_end,
+                    "thinking": on_thinking,
+                    "error": on_error,
+                    "done": on_done,
+                }
+                if tool_display:
+                    stream_handlers.update({
+                        "tool_start": on_tool_start,
+                        "tool_executing": on_tool_executing,
+                        "tool_complete": on_tool_complete,
+                    })
 
-                    elif event_type == "done":
-                        # Stream complete
-                        text_display.finalize()
+                # Process stream events
+                for event in stream_gen:
+                    handler = stream_handlers.get(event.get("type"))
+                    if handler is not None and handler(event.get("data")):
                         break
 
+                response_text = "".join(response_chunks)
+
                 # Get final response from generator return value
                 try:
                     response, updated_messages = stream_gen.send(None)
@@ -3682,7 +4262,7 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
                 # Non-streaming mode (original behavior)
                 with st.spinner("Thinking..."):
                     # Run tool calling loop
-                    response, updated_messages = st.session_state.loop.run(
+                    response, updated_messages = get_loop().run(
                         messages=messages_for_api,
                         system=st.session_state.system_prompt,
                         model=st.session_state.model,
@@ -3777,939 +4357,991 @@ def process_message(user_message: str, uploaded_images: Optional[List] = None):
 # Main Application
 # ============================================================================
 
-def main():
-    """Main application entry point"""
+@st.fragment
+def render_preset_manager():
+    """Main-area dialog - preset browse/create/export (Phase 2A)"""
+    st.markdown("### 🎨 Preset Manager")
 
-    # Page config
-    st.set_page_config(
-        page_title=PAGE_TITLE,
-        page_icon=PAGE_ICON,
-        layout="wide",
-        initial_sidebar_state="expanded"
-    )
+    preset_mgr = st.session_state.preset_manager
 
-    # Custom CSS for wider sidebar (allows drag to expand)
-    st.markdown("""
-    <style>
-    /* Allow sidebar to be dragged wider */
-    [data-testid="stSidebar"] {
-        min-width: 300px;
-        max-width: 800px;
-    }
-    [data-testid="stSidebar"] > div:first-child {
-        width: auto;
-    }
-    /* Mermaid diagram container - fill available space */
-    .stMermaid {
-        overflow-x: auto;
-        width: 100% !important;
-        min-height: 600px;
-    }
-    .stMermaid svg {
-        width: 100% !important;
-        height: auto !important;
-        min-height: 600px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    tab1, tab2, tab3 = st.tabs(["📋 Browse", "➕ Create", "📦 Export/Import"])
 
-    # Initialize
-    init_session_state()
+    # TAB 1: Browse & Manage
+    with tab1:
+        st.markdown("#### All Presets")
 
-    # Check for API key
-    if not os.getenv("ANTHROPIC_API_KEY"):
-        st.error("⚠️ ANTHROPIC_API_KEY not found in environment!")
-        st.info("Please set your API key in the .env file")
-        st.stop()
+        all_presets = preset_mgr.get_all_presets()
+        active_preset_id = preset_mgr.get_active_preset_id()
 
-    # Render UI
-    render_sidebar()
+        if not all_presets:
+            st.info("No presets available")
+        else:
+            import pandas as pd
+
+            # One table element for all presets; actions apply to the selected row
+            preset_ids = list(all_presets)
+            rows = []
+            for preset_id in preset_ids:
+                preset = all_presets[preset_id]
+                settings = preset["settings"]
+                rows.append({
+                    "Active": "✅" if preset_id == active_preset_id else "",
+                    "Name": preset["name"],
+                    "Description": preset["description"],
+                    "Model": settings["model"].split("-")[-1] if "-" in settings["model"] else settings["model"],
+                    "Cache": settings["cache_strategy"],
+                    "Context": settings["context_strategy"],
+                    "Type": "🔒 Built-in" if preset["is_built_in"] else "Custom",
+                })
 
-    # Main chat interface
-    st.title("💬 Apex Aurum - Claude Edition")
-    st.caption("Powered by Claude API with 39 tools + Vision support 👁️")
+            table = st.dataframe(
+                pd.DataFrame(rows),
+                hide_index=True,
+                use_container_width=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key="preset_table"
+            )
 
-    # ========== ANALYTICS DASHBOARD MODAL ==========
-    if st.session_state.get("show_analytics", False):
-        from core.analytics_store import get_analytics_store
-        import pandas as pd
+            selected_rows = table.selection.rows
+            if not selected_rows or selected_rows[0] >= len(preset_ids):
+                st.caption("Select a preset to apply, edit or delete it")
+            else:
+                preset_id = preset_ids[selected_rows[0]]
+                preset = all_presets[preset_id]
+                is_active = (preset_id == active_preset_id)
+                is_built_in = preset["is_built_in"]
 
-        st.markdown("### 📊 Analytics Dashboard")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if not is_active:
+                        if st.button("▶️ Apply", key="preset_apply", use_container_width=True):
+                            success, message = preset_mgr.apply_preset(preset_id, st.session_state)
+                            if success:
+                                # Apply special handling
+                                try:
+                                    strategy_enum = CacheStrategy[st.session_state.cache_strategy.upper()]
+                                    get_client().set_cache_strategy(strategy_enum)
+                                except Exception as e:
+                                    logger.error(f"Error setting cache strategy: {e}")
 
-        analytics = get_analytics_store()
+                                try:
+                                    get_context_manager().set_strategy(st.session_state.context_strategy)
+                                except Exception as e:
+                                    logger.error(f"Error setting context strategy: {e}")
 
-        # Time period selector
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            period = st.selectbox(
-                "Time Period",
-                ["Today", "7 Days", "30 Days", "All Time"],
-                key="analytics_period"
-            )
-        with col2:
-            if st.button("Close", key="close_analytics"):
-                st.session_state.show_analytics = False
-                st.rerun()
+                                st.success(f"✅ {message}")
+                                st.rerun()
+                            else:
+                                st.error(f"❌ {message}")
+                    else:
+                        st.button("✅ Active", key="preset_active", disabled=True, use_container_width=True)
 
-        # Map period to days
-        period_days = {"Today": 1, "7 Days": 7, "30 Days": 30, "All Time": 365}
-        days = period_days.get(period, 7)
+                if not is_built_in:
+                    with col2:
+                        # Edit button (custom only)
+                        if st.button("✏️ Edit", key="preset_edit", use_container_width=True):
+                            st.session_state.preset_edit_id = preset_id
+                            st.rerun(scope="fragment")
 
-        # Tabs for different metrics
-        tab1, tab2, tab3 = st.tabs(["🛠️ Tool Usage", "💰 Costs", "⚡ Cache"])
+                    with col3:
+                        # Delete button (custom only)
+                        if st.button("🗑️ Delete", key="preset_delete", use_container_width=True):
+                            success, message = preset_mgr.delete_custom_preset(preset_id)
+                            if success:
+                                # The keyed table keeps its row selection across data changes -
+                                # clear it so it can't land on the preset after the deleted one
+                                st.session_state.pop("preset_table", None)
+                                st.success(f"✅ {message}")
+                                st.rerun()
+                            else:
+                                st.error(f"❌ {message}")
+                else:
+                    with col2:
+                        st.caption("🔒 Built-in")
 
-        # ===== TOOL USAGE TAB =====
-        with tab1:
-            tool_stats = analytics.get_tool_stats(days)
+        # Edit mode (shown when preset_edit_id is set)
+        if st.session_state.get("preset_edit_id"):
+            edit_id = st.session_state.preset_edit_id
+            preset = preset_mgr.get_preset(edit_id)
 
-            if tool_stats["total_calls"] > 0:
-                # Summary metrics
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total Calls", f"{tool_stats['total_calls']:,}")
-                with col2:
-                    st.metric("Unique Tools", tool_stats["unique_tools"])
-                with col3:
-                    # Average success rate
-                    rates = list(tool_stats["success_rates"].values())
-                    avg_rate = sum(rates) / len(rates) if rates else 0
-                    st.metric("Avg Success", f"{avg_rate*100:.1f}%")
+            if preset and not preset["is_built_in"]:
+                st.markdown("#### ✏️ Edit Preset")
 
-                st.markdown("---")
+                with st.form("edit_preset_form"):
+                    new_name = st.text_input("Preset Name", value=preset["name"].replace("⭐ ", ""))
+                    new_desc = st.text_area("Description", value=preset["description"])
 
-                # Top tools bar chart
-                st.markdown("#### Top Tools by Usage")
-                if tool_stats["top_10"]:
-                    chart_data = pd.DataFrame(
-                        tool_stats["top_10"],
-                        columns=["Tool", "Calls"]
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.form_submit_button("Cancel", use_container_width=True):
+                            st.session_state.preset_edit_id = None
+                            st.rerun(scope="fragment")
+                    with col2:
+                        if st.form_submit_button("Save Changes", type="primary", use_container_width=True):
+                            success, message = preset_mgr.update_custom_preset(
+                                edit_id,
+                                name=new_name,
+                                description=new_desc
+                            )
+                            if success:
+                                st.success(f"✅ {message}")
+                                st.session_state.preset_edit_id = None
+                                st.rerun()
+                            else:
+                                st.error(f"❌ {message}")
+
+    # TAB 2: Create New Preset
+    with tab2:
+        st.markdown("#### Create New Preset")
+        st.info("This will save your current settings as a new preset")
+
+        # Show current settings
+        current_settings = preset_mgr.extract_current_settings(st.session_state)
+
+        with st.expander("Current Settings Preview", expanded=True):
+            st.json(current_settings)
+
+        with st.form("create_preset_form"):
+            preset_name = st.text_input("Preset Name", placeholder="My Custom Preset")
+            preset_desc = st.text_area("Description", placeholder="Describe this preset...")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                cancel = st.form_submit_button("Cancel", use_container_width=True)
+            with col2:
+                create = st.form_submit_button("Create Preset", type="primary", use_container_width=True)
+
+            if cancel:
+                st.session_state.show_preset_manager = False
+                st.rerun()
+
+            if create:
+                if not preset_name:
+                    st.error("❌ Preset name is required")
+                else:
+                    success, message, new_id = preset_mgr.save_custom_preset(
+                        preset_name,
+                        preset_desc or "Custom preset",
+                        st.session_state
                     )
-                    st.bar_chart(chart_data.set_index("Tool"))
+                    if success:
+                        st.success(f"✅ {message}")
+                        # Switch to browse tab to show new preset
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {message}")
 
-                # Success rates table
-                st.markdown("#### Tool Success Rates")
-                if tool_stats["by_tool"]:
-                    rows = []
-                    for tool, calls in tool_stats["by_tool"].items():
-                        rate = tool_stats["success_rates"].get(tool, 0)
-                        errors = tool_stats["errors"].get(tool, 0)
-                        rows.append({
-                            "Tool": tool,
-                            "Calls": calls,
-                            "Success Rate": f"{rate*100:.1f}%",
-                            "Errors": errors
-                        })
-                    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    # TAB 3: Export/Import
+    with tab3:
+        st.markdown("#### Export/Import Presets")
 
-                # Recent tool calls
-                st.markdown("#### Recent Tool Calls")
-                recent = analytics.get_recent_tool_calls(15)
-                if recent:
-                    for call in recent:
-                        status = "✅" if call["success"] else "❌"
-                        duration = call.get("duration_ms", 0)
-                        time_str = call["timestamp"].split("T")[1].split(".")[0] if "T" in call["timestamp"] else ""
-                        st.text(f"{status} {call['tool']} ({duration:.0f}ms) @ {time_str}")
-            else:
-                st.info("No tool usage data yet. Use tools in conversations to see analytics.")
+        col_exp, col_imp = st.columns(2)
+
+        with col_exp:
+            st.write("**Export Presets**")
 
-        # ===== COST TAB =====
-        with tab2:
-            cost_stats = analytics.get_cost_stats(days)
+            if st.button("📤 Export All Custom Presets", use_container_width=True):
+                custom_presets = preset_mgr.get_custom_presets()
 
-            # Summary metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Spend", f"${cost_stats['total']:.4f}")
-            with col2:
-                st.metric("Daily Average", f"${cost_stats['average_daily']:.4f}")
-            with col3:
-                st.metric("Monthly Projection", f"${cost_stats['projected_monthly']:.2f}")
+                if custom_presets:
+                    export_data = {
+                        "version": preset_mgr.VERSION,
+                        "exported_at": datetime.now().isoformat(),
+                        "presets": custom_presets
+                    }
 
-            st.markdown("---")
+                    export_json = dump_json_bytes(export_data)
 
-            # Daily cost trend
-            if cost_stats["daily"] and any(d["cost"] > 0 for d in cost_stats["daily"]):
-                st.markdown("#### Daily Cost Trend")
-                chart_data = pd.DataFrame(cost_stats["daily"])
-                chart_data["date"] = pd.to_datetime(chart_data["date"])
-                st.line_chart(chart_data.set_index("date")["cost"])
+                    st.download_button(
+                        label="⬇️ Download presets.json",
+                        data=export_json,
+                        file_name="custom_presets.json",
+                        mime="application/json",
+                        use_container_width=True
+                    )
+                else:
+                    st.info("No custom presets to export")
 
-                # Cost by model
-                if cost_stats["by_model"]:
-                    st.markdown("#### Cost by Model")
-                    model_data = pd.DataFrame([
-                        {"Model": k.split("-")[-1] if "-" in k else k, "Cost": v}
-                        for k, v in cost_stats["by_model"].items()
-                    ])
-                    if not model_data.empty:
-                        st.bar_chart(model_data.set_index("Model"))
-            else:
-                st.info("No cost data yet. Make API calls to see cost analytics.")
+        with col_imp:
+            st.write("**Import Presets**")
 
-        # ===== CACHE TAB =====
-        with tab3:
-            cache_stats = analytics.get_cache_stats(days)
+            uploaded_file = st.file_uploader(
+                "Upload presets JSON",
+                type=["json"],
+                key="preset_import_uploader"
+            )
 
-            # Summary metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Hit Rate", f"{cache_stats['overall_hit_rate']*100:.1f}%")
-            with col2:
-                st.metric("Total Hits", cache_stats["total_hits"])
-            with col3:
-                st.metric("Total Savings", f"${cache_stats['total_savings']:.4f}")
+            if uploaded_file:
+                if st.button("📥 Import Presets", use_container_width=True):
+                    try:
+                        import_data = json.loads(uploaded_file.read().decode("utf-8"))
 
-            st.markdown("---")
+                        # Validate structure
+                        if "presets" in import_data:
+                            # Add all presets as custom, then one write
+                            new_presets = import_data["presets"]
+                            preset_mgr.presets_data["custom"].update(new_presets)
+                            imported_count = len(new_presets)
 
-            # Hit rate trend
-            if cache_stats["daily"] and any(d["hit_rate"] > 0 for d in cache_stats["daily"]):
-                st.markdown("#### Cache Hit Rate Trend")
-                chart_data = pd.DataFrame(cache_stats["daily"])
-                chart_data["date"] = pd.to_datetime(chart_data["date"])
-                chart_data["hit_rate_pct"] = chart_data["hit_rate"] * 100
-                st.line_chart(chart_data.set_index("date")["hit_rate_pct"])
-            else:
-                st.info("No cache data yet. Enable caching to see performance analytics.")
+                            preset_mgr._save_presets()
+                            st.success(f"✅ Imported {imported_count} preset(s)")
+                            st.rerun()
+                        else:
+                            st.error("❌ Invalid preset file format")
 
-        st.markdown("---")
+                    except Exception as e:
+                        st.error(f"❌ Import failed: {e}")
+                        logger.error(f"Preset import error: {e}", exc_info=True)
 
-        # Overall summary
-        summary = analytics.get_summary()
-        if summary["first_record"]:
-            st.caption(f"📅 Tracking since {summary['first_record']} | {summary['days_tracked']} days with activity | {summary['total_api_calls']} API calls")
+    # Close button
+    if st.button("Close", use_container_width=True, key="close_preset_manager"):
+        st.session_state.show_preset_manager = False
+        st.session_state.preset_edit_id = None  # Clear edit mode
+        st.rerun()
 
-    # ========== PHASE 2A: Preset Manager Dialog ==========
-    if st.session_state.get("show_preset_manager", False):
-        st.markdown("### 🎨 Preset Manager")
+    st.markdown("---")
 
-        preset_mgr = st.session_state.preset_manager
 
-        tab1, tab2, tab3 = st.tabs(["📋 Browse", "➕ Create", "📦 Export/Import"])
+@st.fragment
+def render_spawn_agent_dialog():
+    """Main-area dialog - spawn a sub-agent (Phase 10)"""
+    st.markdown("### ➕ Spawn New Agent")
 
-        # TAB 1: Browse & Manage
-        with tab1:
-            st.markdown("#### All Presets")
+    with st.form("spawn_agent_form"):
+        task = st.text_area(
+            "Task Description",
+            placeholder="Describe the task for the agent in detail...",
+            height=100,
+            help="Be specific about what you want the agent to do"
+        )
 
-            all_presets = preset_mgr.get_all_presets()
-            active_preset_id = preset_mgr.get_active_preset_id()
+        agent_type = st.radio(
+            "Agent Type",
+            options=[
+                "general - Any task",
+                "researcher - Research and gather information",
+                "coder - Write and explain code",
+                "analyst - Analyze data and provide insights",
+                "writer - Create written content"
+            ],
+            help="Choose the type of agent based on the task"
+        )
 
-            if not all_presets:
-                st.info("No presets available")
-            else:
-                for preset_id, preset in all_presets.items():
-                    is_active = (preset_id == active_preset_id)
-                    is_built_in = preset["is_built_in"]
+        model_options = [
+            "Haiku (fast & cheap)",
+            "Sonnet (balanced)",
+            "Opus (best quality)"
+        ]
+        default_index = model_options.index(
+            st.session_state.get("default_subagent_model", "Haiku (fast & cheap)")
+        )
 
-                    # Card for each preset
-                    with st.container():
-                        col1, col2 = st.columns([3, 1])
-
-                        with col1:
-                            # Name with active indicator
-                            name_display = preset["name"]
-                            if is_active:
-                                name_display = f"✅ {name_display}"
-                            st.markdown(f"**{name_display}**")
-                            st.caption(preset["description"])
-
-                            # Show settings summary
-                            settings = preset["settings"]
-                            model_short = settings["model"].split("-")[-1] if "-" in settings["model"] else settings["model"]
-                            st.caption(
-                                f"Model: {model_short} | "
-                                f"Cache: {settings['cache_strategy']} | "
-                                f"Context: {settings['context_strategy']}"
-                            )
+        model = st.selectbox(
+            "Model",
+            options=model_options,
+            index=default_index,
+            help="Can change default in sidebar Advanced Settings"
+        )
 
-                        with col2:
-                            # Action buttons
-                            if not is_active:
-                                if st.button("▶️ Apply", key=f"apply_{preset_id}", use_container_width=True):
-                                    success, message = preset_mgr.apply_preset(preset_id, st.session_state)
-                                    if success:
-                                        # Apply special handling
-                                        from core.cache_manager import CacheStrategy
-                                        try:
-                                            strategy_enum = CacheStrategy[st.session_state.cache_strategy.upper()]
-                                            st.session_state.client.set_cache_strategy(strategy_enum)
-                                        except Exception as e:
-                                            logger.error(f"Error setting cache strategy: {e}")
+        run_async = st.checkbox(
+            "Run in background",
+            value=True,
+            help="Run asynchronously (recommended)"
+        )
 
-                                        try:
-                                            st.session_state.context_manager.set_strategy(st.session_state.context_strategy)
-                                        except Exception as e:
-                                            logger.error(f"Error setting context strategy: {e}")
+        col1, col2 = st.columns(2)
+        with col1:
+            cancel = st.form_submit_button("Cancel", use_container_width=True)
+        with col2:
+            spawn = st.form_submit_button("Spawn Agent", type="primary", use_container_width=True)
 
-                                        st.success(f"✅ {message}")
-                                        st.rerun()
-                                    else:
-                                        st.error(f"❌ {message}")
-                            else:
-                                st.button("✅ Active", key=f"active_{preset_id}", disabled=True, use_container_width=True)
+        if cancel:
+            st.session_state.show_spawn_agent = False
+            st.rerun()
 
-                            if not is_built_in:
-                                # Edit button (custom only)
-                                if st.button("✏️ Edit", key=f"edit_{preset_id}", use_container_width=True):
-                                    st.session_state.preset_edit_id = preset_id
-                                    st.rerun()
+        if spawn and task:
+            # Parse agent type
+            agent_type_key = agent_type.split(" -")[0].strip()
 
-                                # Delete button (custom only)
-                                if st.button("🗑️ Delete", key=f"del_{preset_id}", use_container_width=True):
-                                    success, message = preset_mgr.delete_custom_preset(preset_id)
-                                    if success:
-                                        st.success(f"✅ {message}")
-                                        st.rerun()
-                                    else:
-                                        st.error(f"❌ {message}")
-                            else:
-                                st.caption("🔒 Built-in")
+            # Parse model
+            model_map = {
+                "Haiku (fast & cheap)": "claude-haiku-4-5-20251001",
+                "Sonnet (balanced)": "claude-sonnet-4-5-20250929",
+                "Opus (best quality)": "claude-opus-4-5-20251101"
+            }
+            model_id = model_map[model]
+
+            # Spawn agent
+            with st.spinner("Spawning agent..."):
+                result = agent_spawn(
+                    task=task,
+                    agent_type=agent_type_key,
+                    model=model_id,
+                    run_async=run_async
+                )
 
-                        st.divider()
+            if result.get("success"):
+                st.success(f"✅ Agent spawned: {result.get('agent_id')}")
+                st.caption(result.get("message", ""))
+                st.session_state.show_spawn_agent = False
+                st.rerun()
+            else:
+                st.error(f"❌ Error: {result.get('error')}")
 
-            # Edit mode (shown when preset_edit_id is set)
-            if st.session_state.get("preset_edit_id"):
-                edit_id = st.session_state.preset_edit_id
-                preset = preset_mgr.get_preset(edit_id)
+    st.markdown("---")
 
-                if preset and not preset["is_built_in"]:
-                    st.markdown("#### ✏️ Edit Preset")
 
-                    with st.form("edit_preset_form"):
-                        new_name = st.text_input("Preset Name", value=preset["name"].replace("⭐ ", ""))
-                        new_desc = st.text_area("Description", value=preset["description"])
+@st.fragment(run_every=AGENT_RESULT_POLL_SECONDS)
+def _poll_agent_status(agent_id: str, shown_status: Optional[str]):
+    """
+    Re-check an unfinished agent every AGENT_RESULT_POLL_SECONDS.
 
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.form_submit_button("Cancel", use_container_width=True):
-                                st.session_state.preset_edit_id = None
-                                st.rerun()
-                        with col2:
-                            if st.form_submit_button("Save Changes", type="primary", use_container_width=True):
-                                success, message = preset_mgr.update_custom_preset(
-                                    edit_id,
-                                    name=new_name,
-                                    description=new_desc
-                                )
-                                if success:
-                                    st.success(f"✅ {message}")
-                                    st.session_state.preset_edit_id = None
-                                    st.rerun()
-                                else:
-                                    st.error(f"❌ {message}")
+    Only this fragment reruns while waiting; once the status changes the whole
+    app reruns so the result viewer renders the outcome (and stops polling).
 
-        # TAB 2: Create New Preset
-        with tab2:
-            st.markdown("#### Create New Preset")
-            st.info("This will save your current settings as a new preset")
+    Args:
+        agent_id: Agent being viewed
+        shown_status: Status the viewer was rendered with
+    """
+    agent = _agent_manager.get_agent(agent_id)
+    status = agent.status.value if agent else None
+    if status != shown_status:
+        st.rerun()
+    st.caption(f"{AGENT_STATUS_ICONS.get(status, '⏳')} Agent is {status} - refreshing every {AGENT_RESULT_POLL_SECONDS}s...")
 
-            # Show current settings
-            current_settings = preset_mgr.extract_current_settings(st.session_state)
 
-            with st.expander("Current Settings Preview", expanded=True):
-                st.json(current_settings)
+@st.fragment
+def render_agent_result_dialog():
+    """Main-area dialog - result of the agent in view_agent_result (Phase 10)"""
+    agent_id = st.session_state.view_agent_result
 
-            with st.form("create_preset_form"):
-                preset_name = st.text_input("Preset Name", placeholder="My Custom Preset")
-                preset_desc = st.text_area("Description", placeholder="Describe this preset...")
+    st.markdown("### 📄 Agent Result")
 
-                col1, col2 = st.columns(2)
-                with col1:
-                    cancel = st.form_submit_button("Cancel", use_container_width=True)
-                with col2:
-                    create = st.form_submit_button("Create Preset", type="primary", use_container_width=True)
+    result_data = agent_result(agent_id)
 
-                if cancel:
-                    st.session_state.show_preset_manager = False
-                    st.rerun()
+    if result_data.get("found"):
+        agent = _agent_manager.get_agent(agent_id)
 
-                if create:
-                    if not preset_name:
-                        st.error("❌ Preset name is required")
-                    else:
-                        success, message, new_id = preset_mgr.save_custom_preset(
-                            preset_name,
-                            preset_desc or "Custom preset",
-                            st.session_state
-                        )
-                        if success:
-                            st.success(f"✅ {message}")
-                            # Switch to browse tab to show new preset
-                            st.rerun()
-                        else:
-                            st.error(f"❌ {message}")
+        if agent:
+            # Agent info
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Agent ID", f"#{agent_id[-6:]}")
+            with col2:
+                st.metric("Type", agent.agent_type)
+            with col3:
+                st.metric("Status", result_data.get("status"))
 
-        # TAB 3: Export/Import
-        with tab3:
-            st.markdown("#### Export/Import Presets")
+            # Task
+            st.markdown("**Task:**")
+            st.info(result_data.get("task"))
 
-            col_exp, col_imp = st.columns(2)
+            # Result
+            if result_data.get("status") == "completed":
+                st.markdown("**Result:**")
+                st.markdown(result_data.get("result"))
 
-            with col_exp:
-                st.write("**Export Presets**")
+                # Runtime
+                if agent.started_at and agent.completed_at:
+                    runtime = (agent.completed_at - agent.started_at).total_seconds()
+                    st.caption(f"Runtime: {runtime:.1f} seconds")
+                    st.caption(f"Completed: {agent.completed_at.strftime('%Y-%m-%d %H:%M:%S')}")
 
-                if st.button("📤 Export All Custom Presets", use_container_width=True):
-                    custom_presets = preset_mgr.get_custom_presets()
+            elif result_data.get("status") == "failed":
+                st.error(f"**Error:** {result_data.get('error')}")
 
-                    if custom_presets:
-                        export_data = {
-                            "version": preset_mgr.VERSION,
-                            "exported_at": datetime.now().isoformat(),
-                            "presets": custom_presets
-                        }
+            else:
+                # Still pending/running: poll in a timed fragment instead of full-page reruns
+                _poll_agent_status(agent_id, result_data.get("status"))
 
-                        export_json = json.dumps(export_data, indent=2)
+            # Actions
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("📋 Copy Result", key="copy_result", use_container_width=True):
+                    st.toast("Result copied to clipboard!", icon="✅")
+            with col2:
+                if st.button("❌ Close", key="close_result", use_container_width=True):
+                    st.session_state.view_agent_result = None
+                    st.rerun()
+        else:
+            st.error("Agent details not available")
+            if st.button("Close"):
+                st.session_state.view_agent_result = None
+                st.rerun()
+    else:
+        st.error("Agent not found")
+        if st.button("Close"):
+            st.session_state.view_agent_result = None
+            st.rerun()
 
-                        st.download_button(
-                            label="⬇️ Download presets.json",
-                            data=export_json,
-                            file_name="custom_presets.json",
-                            mime="application/json",
-                            use_container_width=True
-                        )
-                    else:
-                        st.info("No custom presets to export")
+    st.markdown("---")
 
-            with col_imp:
-                st.write("**Import Presets**")
 
-                uploaded_file = st.file_uploader(
-                    "Upload presets JSON",
-                    type=["json"],
-                    key="preset_import_uploader"
+@st.fragment
+def render_council_dialog():
+    """Main-area dialog - Socratic Council voting and results (Phase 10)"""
+    st.markdown("### 🗳️ Socratic Council - Multi-Agent Voting")
+
+    # Initialize council results in session state
+    if "council_results" not in st.session_state:
+        st.session_state.council_results = None
+
+    with st.form("socratic_council_form"):
+        question = st.text_input(
+            "Question",
+            placeholder="What question should the agents vote on?",
+            help="Be clear and specific"
+        )
+
+        st.write("**Options** (2-5 options):")
+        st.caption("💡 Tip: Fill out options then click 'Run Council' at bottom")
+
+        # Dynamic options
+        options = []
+        for i in range(len(st.session_state.council_options)):
+            opt_col, del_col = st.columns([4, 1])
+            with opt_col:
+                opt = st.text_input(
+                    f"Option {i+1}",
+                    value=st.session_state.council_options[i],
+                    key=f"opt_{i}"
                 )
+                if opt:
+                    options.append(opt)
+            with del_col:
+                # Remove button (only show if more than 2 options)
+                if len(st.session_state.council_options) > 2:
+                    if st.form_submit_button("🗑️", key=f"del_opt_{i}"):
+                        st.session_state.council_options.pop(i)
+                        st.rerun(scope="fragment")
+
+        # Add option button (move to bottom, outside main submit area)
+        if len(st.session_state.council_options) < 5:
+            if st.form_submit_button("➕ Add Another Option"):
+                st.session_state.council_options.append("")
+                st.rerun(scope="fragment")
 
-                if uploaded_file:
-                    if st.button("📥 Import Presets", use_container_width=True):
-                        try:
-                            import_data = json.loads(uploaded_file.read().decode("utf-8"))
-
-                            # Validate structure
-                            if "presets" in import_data:
-                                imported_count = 0
-                                for preset_id, preset in import_data["presets"].items():
-                                    # Add each preset as custom
-                                    preset_mgr.presets_data["custom"][preset_id] = preset
-                                    imported_count += 1
-
-                                preset_mgr._save_presets()
-                                st.success(f"✅ Imported {imported_count} preset(s)")
-                                st.rerun()
-                            else:
-                                st.error("❌ Invalid preset file format")
+        st.divider()
 
-                        except Exception as e:
-                            st.error(f"❌ Import failed: {e}")
-                            logger.error(f"Preset import error: {e}", exc_info=True)
+        num_agents = st.slider(
+            "Number of Agents",
+            min_value=3,
+            max_value=9,
+            value=3,
+            step=2,
+            help="Use odd numbers to avoid ties"
+        )
 
-        # Close button
-        if st.button("Close", use_container_width=True, key="close_preset_manager"):
-            st.session_state.show_preset_manager = False
-            st.session_state.preset_edit_id = None  # Clear edit mode
-            st.rerun()
+        model = st.selectbox(
+            "Model",
+            options=["Sonnet (recommended)", "Opus (best reasoning)"],
+            help="Sonnet provides good balance of quality and cost"
+        )
 
-        st.markdown("---")
+        col1, col2 = st.columns(2)
+        with col1:
+            cancel = st.form_submit_button("Cancel", use_container_width=True)
+        with col2:
+            run = st.form_submit_button("Run Council", type="primary", use_container_width=True)
 
-    # ========== END PHASE 2A ==========
+        if cancel:
+            st.session_state.show_council = False
+            st.session_state.council_options = list(DEFAULT_COUNCIL_OPTIONS)
+            st.rerun()
 
-    # Agent UI Dialogs (Phase 10)
-    # Spawn Agent Dialog
-    if st.session_state.get("show_spawn_agent", False):
-        st.markdown("### ➕ Spawn New Agent")
-
-        with st.form("spawn_agent_form"):
-            task = st.text_area(
-                "Task Description",
-                placeholder="Describe the task for the agent in detail...",
-                height=100,
-                help="Be specific about what you want the agent to do"
-            )
+        if run and question and len(options) >= 2:
+            # Run council
+            model_id = "claude-sonnet-4-5-20250929" if "Sonnet" in model else "claude-opus-4-5-20251101"
 
-            agent_type = st.radio(
-                "Agent Type",
-                options=[
-                    "general - Any task",
-                    "researcher - Research and gather information",
-                    "coder - Write and explain code",
-                    "analyst - Analyze data and provide insights",
-                    "writer - Create written content"
-                ],
-                help="Choose the type of agent based on the task"
-            )
+            with st.spinner(f"Running council with {num_agents} agents..."):
+                result = socratic_council(
+                    question=question,
+                    options=options,
+                    num_agents=num_agents,
+                    model=model_id
+                )
 
-            model_options = [
-                "Haiku (fast & cheap)",
-                "Sonnet (balanced)",
-                "Opus (best quality)"
-            ]
-            default_index = model_options.index(
-                st.session_state.get("default_subagent_model", "Haiku (fast & cheap)")
-            )
+            # Store results in session state
+            st.session_state.council_results = {
+                "result": result,
+                "num_agents": num_agents,
+                "question": question
+            }
+            st.rerun(scope="fragment")
 
-            model = st.selectbox(
-                "Model",
-                options=model_options,
-                index=default_index,
-                help="Can change default in sidebar Advanced Settings"
-            )
+    # Display results OUTSIDE the form
+    if st.session_state.council_results:
+        result_data = st.session_state.council_results
+        result = result_data["result"]
+        num_agents = result_data["num_agents"]
+        question = result_data["question"]
 
-            run_async = st.checkbox(
-                "Run in background",
-                value=True,
-                help="Run asynchronously (recommended)"
-            )
+        if result.get("success"):
+            st.success("✅ Council completed!")
 
-            col1, col2 = st.columns(2)
-            with col1:
-                cancel = st.form_submit_button("Cancel", use_container_width=True)
-            with col2:
-                spawn = st.form_submit_button("Spawn Agent", type="primary", use_container_width=True)
+            # Display results
+            st.markdown("### Results")
+            st.caption(f"**Question:** {question}")
 
-            if cancel:
-                st.session_state.show_spawn_agent = False
-                st.rerun()
+            winner = result.get("winner")
+            votes = result.get("votes")
+            winner_votes = result.get("winner_votes")
 
-            if spawn and task:
-                # Parse agent type
-                agent_type_key = agent_type.split(" -")[0].strip()
+            st.metric("Winner", f"{winner} ({winner_votes}/{num_agents} votes)")
 
-                # Parse model
-                model_map = {
-                    "Haiku (fast & cheap)": "claude-haiku-4-5-20251001",
-                    "Sonnet (balanced)": "claude-sonnet-4-5-20250929",
-                    "Opus (best quality)": "claude-opus-4-5-20251101"
-                }
-                model_id = model_map[model]
+            # Vote chart
+            st.write("**Votes:**")
+            for opt, count in votes.items():
+                bar = "█" * count
+                st.write(f"• {opt}: {bar} {count}")
 
-                # Spawn agent
-                from tools.agents import agent_spawn
+            # Consensus indicator
+            if result.get("consensus"):
+                st.info("✅ Strong consensus reached (> 50% agreement)")
+            else:
+                st.warning("⚠️ No strong consensus (split decision)")
 
-                with st.spinner("Spawning agent..."):
-                    result = agent_spawn(
-                        task=task,
-                        agent_type=agent_type_key,
-                        model=model_id,
-                        run_async=run_async
-                    )
+            # Reasoning
+            st.write("**Agent Reasoning:**")
+            for item in result.get("reasoning", []):
+                with st.expander(f"Agent {item['agent']} → {item['vote']}"):
+                    st.write(item['reasoning'])
 
-                if result.get("success"):
-                    st.success(f"✅ Agent spawned: {result.get('agent_id')}")
-                    st.caption(result.get("message", ""))
-                    st.session_state.show_spawn_agent = False
-                    st.rerun()
-                else:
-                    st.error(f"❌ Error: {result.get('error')}")
+            # Export/Save options
+            st.divider()
+            st.write("**💾 Save Results:**")
 
-        st.markdown("---")
+            col1, col2, col3, col4 = st.columns(4)
 
-    # Agent Result Viewer
-    if st.session_state.get("view_agent_result"):
-        agent_id = st.session_state.view_agent_result
+            with col1:
+                # Copy to clipboard
+                export_text = f"""Council Results
+Question: {question}
+Winner: {winner} ({winner_votes}/{num_agents} votes)
 
-        from tools.agents import agent_result, _agent_manager
+Votes:
+"""
+                for opt, count in votes.items():
+                    export_text += f"• {opt}: {count}\n"
 
-        st.markdown("### 📄 Agent Result")
+                export_text += "\nReasoning:\n"
+                for item in result.get("reasoning", []):
+                    export_text += f"\nAgent {item['agent']} → {item['vote']}\n{item['reasoning']}\n"
 
-        result_data = agent_result(agent_id)
+                if st.button("📋 Copy", use_container_width=True, help="Copy results to clipboard"):
+                    st.toast("✅ Results copied!", icon="✅")
 
-        if result_data.get("found"):
-            agent = _agent_manager.get_agent(agent_id)
+            with col2:
+                # Save to knowledge base
+                if st.button("🧠 Knowledge", use_container_width=True, help="Save to knowledge base"):
+                    knowledge_text = f"Council vote on: {question}\nWinner: {winner} ({winner_votes}/{num_agents} votes)"
+                    try:
+                        vector_add_knowledge(
+                            fact=knowledge_text,
+                            category="general",
+                            source="council_vote"
+                        )
+                        st.toast("✅ Saved to knowledge base!", icon="🧠")
+                    except Exception as e:
+                        st.toast(f"❌ Error: {str(e)}", icon="❌")
 
-            if agent:
-                # Agent info
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Agent ID", f"#{agent_id[-6:]}")
-                with col2:
-                    st.metric("Type", agent.agent_type)
-                with col3:
-                    st.metric("Status", result_data.get("status"))
+            with col3:
+                # Save to memory
+                if st.button("💾 Memory", use_container_width=True, help="Save to memory"):
+                    memory_key = f"council_{question[:30].replace(' ', '_')}"
+                    memory_value = {"question": question, "winner": winner, "votes": votes}
+                    try:
+                        memory_store(memory_key, memory_value)
+                        st.toast(f"✅ Saved as: {memory_key}", icon="💾")
+                    except Exception as e:
+                        st.toast(f"❌ Error: {str(e)}", icon="❌")
 
-                # Task
-                st.markdown("**Task:**")
-                st.info(result_data.get("task"))
+            with col4:
+                # Download as JSON
+                download_data = {
+                    "question": question,
+                    "winner": winner,
+                    "votes": votes,
+                    "total_agents": num_agents,
+                    "consensus": result.get("consensus"),
+                    "reasoning": result.get("reasoning", [])
+                }
+                json_str = json.dumps(download_data, indent=2)
 
-                # Result
-                if result_data.get("status") == "completed":
-                    st.markdown("**Result:**")
-                    st.markdown(result_data.get("result"))
+                st.download_button(
+                    label="📥 JSON",
+                    data=json_str,
+                    file_name=f"council_{question[:20].replace(' ', '_')}.json",
+                    mime="application/json",
+                    use_container_width=True,
+                    help="Download as JSON file"
+                )
 
-                    # Runtime
-                    if agent.started_at and agent.completed_at:
-                        runtime = (agent.completed_at - agent.started_at).total_seconds()
-                        st.caption(f"Runtime: {runtime:.1f} seconds")
-                        st.caption(f"Completed: {agent.completed_at.strftime('%Y-%m-%d %H:%M:%S')}")
+            st.divider()
 
-                elif result_data.get("status") == "failed":
-                    st.error(f"**Error:** {result_data.get('error')}")
+            # Close button (now OUTSIDE form, so it works!)
+            if st.button("Close Results", use_container_width=True):
+                st.session_state.show_council = False
+                st.session_state.council_options = list(DEFAULT_COUNCIL_OPTIONS)
+                st.session_state.council_results = None
+                st.rerun()
 
-                # Actions
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("📋 Copy Result", key="copy_result", use_container_width=True):
-                        st.toast("Result copied to clipboard!", icon="✅")
-                with col2:
-                    if st.button("❌ Close", key="close_result", use_container_width=True):
-                        st.session_state.view_agent_result = None
-                        st.rerun()
-            else:
-                st.error("Agent details not available")
-                if st.button("Close"):
-                    st.session_state.view_agent_result = None
-                    st.rerun()
         else:
-            st.error("Agent not found")
-            if st.button("Close"):
-                st.session_state.view_agent_result = None
+            st.error(f"❌ Error: {result.get('error')}")
+            if st.button("Close", use_container_width=True):
+                st.session_state.show_council = False
+                st.session_state.council_results = None
                 st.rerun()
 
-        st.markdown("---")
+    st.markdown("---")
 
-    # Socratic Council UI
-    if st.session_state.get("show_council", False):
-        st.markdown("### 🗳️ Socratic Council - Multi-Agent Voting")
 
-        # Initialize council results in session state
-        if "council_results" not in st.session_state:
-            st.session_state.council_results = None
+@st.fragment
+def render_export_dialog():
+    """Main-area dialog - export conversations (Phase 12)"""
+    st.markdown("### 📤 Export Conversations")
+
+    # Select conversations to export
+    conversations = st.session_state.app_state.get_conversations()
 
-        with st.form("socratic_council_form"):
-            question = st.text_input(
-                "Question",
-                placeholder="What question should the agents vote on?",
-                help="Be clear and specific"
+    if conversations:
+        export_all = st.checkbox("Export all conversations", value=True)
+
+        selected_convs = []
+        if not export_all:
+            app_state = st.session_state.app_state
+            conv_options = _cached_export_conv_options(app_state.store.index_version(), conversations)
+
+            selected_indices = st.multiselect(
+                "Select conversations",
+                options=range(len(conversations)),
+                format_func=lambda i: conv_options[i],
+                help="Choose which conversations to export"
             )
+            selected_convs = [conversations[i] for i in selected_indices]
+        else:
+            selected_convs = conversations
 
-            st.write("**Options** (2-5 options):")
-            st.caption("💡 Tip: Fill out options then click 'Run Council' at bottom")
-
-            # Dynamic options
-            options = []
-            for i in range(len(st.session_state.council_options)):
-                opt_col, del_col = st.columns([4, 1])
-                with opt_col:
-                    opt = st.text_input(
-                        f"Option {i+1}",
-                        value=st.session_state.council_options[i],
-                        key=f"opt_{i}"
-                    )
-                    if opt:
-                        options.append(opt)
-                with del_col:
-                    # Remove button (only show if more than 2 options)
-                    if len(st.session_state.council_options) > 2:
-                        if st.form_submit_button("🗑️", key=f"del_opt_{i}"):
-                            st.session_state.council_options.pop(i)
-                            st.rerun()
+        # Format selection
+        export_format = st.selectbox(
+            "Format",
+            options=["JSON", "Markdown", "HTML", "TXT"],
+            help="Choose export format"
+        )
 
-            # Add option button (move to bottom, outside main submit area)
-            if len(st.session_state.council_options) < 5:
-                if st.form_submit_button("➕ Add Another Option"):
-                    st.session_state.council_options.append("")
-                    st.rerun()
+        # Options
+        include_metadata = st.checkbox("Include metadata", value=True, help="Include tags, favorites, etc.")
+        include_stats = st.checkbox("Include statistics", value=True, help="Include message counts, token estimates")
 
-            st.divider()
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Cancel", use_container_width=True):
+                st.session_state.show_export_dialog = False
+                st.session_state.export_ready = False
+                st.rerun()
+        with col2:
+            export = st.button("Export", type="primary", use_container_width=True)
+
+        if export and selected_convs:
+            engine = ExportEngine()
+            format_lower = export_format.lower()
+
+            try:
+                if len(selected_convs) == 1:
+                    # Export single conversation
+                    options = {
+                        "include_metadata": include_metadata,
+                        "include_stats": include_stats
+                    }
+                    exported_data = engine.export_conversation(
+                        selected_convs[0],
+                        format_lower,
+                        options
+                    )
+                    filename = f"conversation.{format_lower}"
+                else:
+                    # Export multiple (combined)
+                    options = {
+                        "include_metadata": include_metadata,
+                        "include_stats": include_stats
+                    }
+                    exported_data = engine.export_multiple(
+                        selected_convs,
+                        format_lower,
+                        combine=True,
+                        options=options
+                    )
+                    filename = f"conversations_{len(selected_convs)}.{format_lower}"
 
-            num_agents = st.slider(
-                "Number of Agents",
-                min_value=3,
-                max_value=9,
-                value=3,
-                step=2,
-                help="Use odd numbers to avoid ties"
-            )
+                # Store in session state
+                mime_type = engine.get_mime_type(format_lower)
+                st.session_state.export_ready = True
+                st.session_state.export_data = exported_data
+                st.session_state.export_filename = filename
+                st.session_state.export_mime = mime_type
+                st.session_state.export_count = len(selected_convs)
+                st.rerun(scope="fragment")
 
-            model = st.selectbox(
-                "Model",
-                options=["Sonnet (recommended)", "Opus (best reasoning)"],
-                help="Sonnet provides good balance of quality and cost"
+            except Exception as e:
+                st.error(f"❌ Export failed: {e}")
+                logger.error(f"Export error: {e}", exc_info=True)
+
+        # Show download button if export is ready
+        if st.session_state.get("export_ready", False):
+            st.success(f"✅ Exported {st.session_state.get('export_count', 0)} conversation(s)")
+            st.download_button(
+                label=f"⬇️ Download {st.session_state.export_filename}",
+                data=st.session_state.export_data,
+                file_name=st.session_state.export_filename,
+                mime=st.session_state.export_mime,
+                use_container_width=True
             )
 
-            col1, col2 = st.columns(2)
-            with col1:
-                cancel = st.form_submit_button("Cancel", use_container_width=True)
-            with col2:
-                run = st.form_submit_button("Run Council", type="primary", use_container_width=True)
-
-            if cancel:
-                st.session_state.show_council = False
-                st.session_state.council_options = ["", ""]
+            if st.button("Close", use_container_width=True):
+                st.session_state.show_export_dialog = False
+                st.session_state.export_ready = False
                 st.rerun()
 
-            if run and question and len(options) >= 2:
-                # Run council
-                from tools.agents import socratic_council
+    else:
+        st.info("No conversations to export")
+        if st.button("Close", use_container_width=True):
+            st.session_state.show_export_dialog = False
+            st.rerun()
 
-                model_id = "claude-sonnet-4-5-20250929" if "Sonnet" in model else "claude-opus-4-5-20251101"
+    st.markdown("---")
 
-                with st.spinner(f"Running council with {num_agents} agents..."):
-                    result = socratic_council(
-                        question=question,
-                        options=options,
-                        num_agents=num_agents,
-                        model=model_id
-                    )
 
-                # Store results in session state
-                st.session_state.council_results = {
-                    "result": result,
-                    "num_agents": num_agents,
-                    "question": question
-                }
-                st.rerun()
+def main():
+    """Main application entry point"""
 
-        # Display results OUTSIDE the form
-        if st.session_state.council_results:
-            result_data = st.session_state.council_results
-            result = result_data["result"]
-            num_agents = result_data["num_agents"]
-            question = result_data["question"]
+    # Page config
+    st.set_page_config(
+        page_title=PAGE_TITLE,
+        page_icon=PAGE_ICON,
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
 
-            if result.get("success"):
-                st.success("✅ Council completed!")
+    # Custom CSS for wider sidebar (allows drag to expand)
+    st.markdown("""
+    <style>
+    /* Allow sidebar to be dragged wider */
+    [data-testid="stSidebar"] {
+        min-width: 300px;
+        max-width: 800px;
+    }
+    [data-testid="stSidebar"] > div:first-child {
+        width: auto;
+    }
+    /* Mermaid diagram container - fill available space */
+    .stMermaid {
+        overflow-x: auto;
+        width: 100% !important;
+        min-height: 600px;
+    }
+    .stMermaid svg {
+        width: 100% !important;
+        height: auto !important;
+        min-height: 600px;
+    }
+    </style>
+    """, unsafe_allow_html=True)
 
-                # Display results
-                st.markdown("### Results")
-                st.caption(f"**Question:** {question}")
+    # Initialize
+    init_session_state()
 
-                winner = result.get("winner")
-                votes = result.get("votes")
-                winner_votes = result.get("winner_votes")
+    # Confirmation queued by an action that triggered st.rerun()
+    if st.session_state.pending_toast:
+        st.toast(st.session_state.pending_toast)
+        st.session_state.pending_toast = None
 
-                st.metric("Winner", f"{winner} ({winner_votes}/{num_agents} votes)")
+    # Check for API key
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        st.error("⚠️ ANTHROPIC_API_KEY not found in environment!")
+        st.info("Please set your API key in the .env file")
+        st.stop()
 
-                # Vote chart
-                st.write("**Votes:**")
-                for opt, count in votes.items():
-                    bar = "█" * count
-                    st.write(f"• {opt}: {bar} {count}")
+    # Render UI
+    render_sidebar()
 
-                # Consensus indicator
-                if result.get("consensus"):
-                    st.info("✅ Strong consensus reached (> 50% agreement)")
-                else:
-                    st.warning("⚠️ No strong consensus (split decision)")
+    # Main chat interface
+    st.title("💬 Apex Aurum - Claude Edition")
+    st.caption("Powered by Claude API with 39 tools + Vision support 👁️")
 
-                # Reasoning
-                st.write("**Agent Reasoning:**")
-                for item in result.get("reasoning", []):
-                    with st.expander(f"Agent {item['agent']} → {item['vote']}"):
-                        st.write(item['reasoning'])
+    # ========== ANALYTICS DASHBOARD MODAL ==========
+    if st.session_state.get("show_analytics", False):
+        from core.analytics_store import get_analytics_store
+        import pandas as pd
 
-                # Export/Save options
-                st.divider()
-                st.write("**💾 Save Results:**")
+        st.markdown("### 📊 Analytics Dashboard")
 
-                col1, col2, col3, col4 = st.columns(4)
+        analytics = get_analytics_store()
 
-                with col1:
-                    # Copy to clipboard
-                    export_text = f"""Council Results
-Question: {question}
-Winner: {winner} ({winner_votes}/{num_agents} votes)
+        # Time period selector
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            period = st.selectbox(
+                "Time Period",
+                ["Today", "7 Days", "30 Days", "All Time"],
+                key="analytics_period"
+            )
+        with col2:
+            if st.button("Close", key="close_analytics"):
+                st.session_state.show_analytics = False
+                st.rerun()
 
-Votes:
-"""
-                    for opt, count in votes.items():
-                        export_text += f"• {opt}: {count}\n"
+        # Map period to days
+        period_days = {"Today": 1, "7 Days": 7, "30 Days": 30, "All Time": 365}
+        days = period_days.get(period, 7)
 
-                    export_text += "\nReasoning:\n"
-                    for item in result.get("reasoning", []):
-                        export_text += f"\nAgent {item['agent']} → {item['vote']}\n{item['reasoning']}\n"
+        # Tabs for different metrics
+        tab1, tab2, tab3 = st.tabs(["🛠️ Tool Usage", "💰 Costs", "⚡ Cache"])
 
-                    if st.button("📋 Copy", use_container_width=True, help="Copy results to clipboard"):
-                        st.toast("✅ Results copied!", icon="✅")
+        # ===== TOOL USAGE TAB =====
+        with tab1:
+            tool_stats = analytics.get_tool_stats(days)
 
+            if tool_stats["total_calls"] > 0:
+                # Summary metrics
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Total Calls", f"{tool_stats['total_calls']:,}")
                 with col2:
-                    # Save to knowledge base
-                    if st.button("🧠 Knowledge", use_container_width=True, help="Save to knowledge base"):
-                        from tools.vector_search import vector_add_knowledge
-                        knowledge_text = f"Council vote on: {question}\nWinner: {winner} ({winner_votes}/{num_agents} votes)"
-                        try:
-                            vector_add_knowledge(
-                                fact=knowledge_text,
-                                category="general",
-                                source="council_vote"
-                            )
-                            st.toast("✅ Saved to knowledge base!", icon="🧠")
-                        except Exception as e:
-                            st.toast(f"❌ Error: {str(e)}", icon="❌")
-
+                    st.metric("Unique Tools", tool_stats["unique_tools"])
                 with col3:
-                    # Save to memory
-                    if st.button("💾 Memory", use_container_width=True, help="Save to memory"):
-                        from tools.memory import memory_store
-                        memory_key = f"council_{question[:30].replace(' ', '_')}"
-                        memory_value = {"question": question, "winner": winner, "votes": votes}
-                        try:
-                            memory_store(memory_key, memory_value)
-                            st.toast(f"✅ Saved as: {memory_key}", icon="💾")
-                        except Exception as e:
-                            st.toast(f"❌ Error: {str(e)}", icon="❌")
-
-                with col4:
-                    # Download as JSON
-                    import json
-                    download_data = {
-                        "question": question,
-                        "winner": winner,
-                        "votes": votes,
-                        "total_agents": num_agents,
-                        "consensus": result.get("consensus"),
-                        "reasoning": result.get("reasoning", [])
-                    }
-                    json_str = json.dumps(download_data, indent=2)
+                    # Average success rate
+                    rates = list(tool_stats["success_rates"].values())
+                    avg_rate = sum(rates) / len(rates) if rates else 0
+                    st.metric("Avg Success", f"{avg_rate*100:.1f}%")
 
-                    st.download_button(
-                        label="📥 JSON",
-                        data=json_str,
-                        file_name=f"council_{question[:20].replace(' ', '_')}.json",
-                        mime="application/json",
-                        use_container_width=True,
-                        help="Download as JSON file"
-                    )
+                st.markdown("---")
 
-                st.divider()
+                # Top tools bar chart
+                st.markdown("#### Top Tools by Usage")
+                if tool_stats["top_10"]:
+                    chart_data = pd.DataFrame(
+                        tool_stats["top_10"],
+                        columns=["Tool", "Calls"]
+                    )
+                    st.bar_chart(chart_data.set_index("Tool"))
 
-                # Close button (now OUTSIDE form, so it works!)
-                if st.button("Close Results", use_container_width=True):
-                    st.session_state.show_council = False
-                    st.session_state.council_options = ["", ""]
-                    st.session_state.council_results = None
-                    st.rerun()
+                # Success rates table
+                st.markdown("#### Tool Success Rates")
+                if tool_stats["by_tool"]:
+                    rows = []
+                    for tool, calls in tool_stats["by_tool"].items():
+                        rate = tool_stats["success_rates"].get(tool, 0)
+                        errors = tool_stats["errors"].get(tool, 0)
+                        rows.append({
+                            "Tool": tool,
+                            "Calls": calls,
+                            "Success Rate": f"{rate*100:.1f}%",
+                            "Errors": errors
+                        })
+                    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
 
+                # Recent tool calls
+                st.markdown("#### Recent Tool Calls")
+                recent = analytics.get_recent_tool_calls(15)
+                if recent:
+                    for call in recent:
+                        status = "✅" if call["success"] else "❌"
+                        duration = call.get("duration_ms", 0)
+                        time_str = call["timestamp"].split("T")[1].split(".")[0] if "T" in call["timestamp"] else ""
+                        st.text(f"{status} {call['tool']} ({duration:.0f}ms) @ {time_str}")
             else:
-                st.error(f"❌ Error: {result.get('error')}")
-                if st.button("Close", use_container_width=True):
-                    st.session_state.show_council = False
-                    st.session_state.council_results = None
-                    st.rerun()
+                st.info("No tool usage data yet. Use tools in conversations to see analytics.")
 
-        st.markdown("---")
+        # ===== COST TAB =====
+        with tab2:
+            cost_stats = analytics.get_cost_stats(days)
 
-    # Export/Import/Config Dialogs (Phase 12)
-    # Export Dialog
-    if st.session_state.get("show_export_dialog", False):
-        st.markdown("### 📤 Export Conversations")
+            # Summary metrics
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Spend", f"${cost_stats['total']:.4f}")
+            with col2:
+                st.metric("Daily Average", f"${cost_stats['average_daily']:.4f}")
+            with col3:
+                st.metric("Monthly Projection", f"${cost_stats['projected_monthly']:.2f}")
 
-        # Select conversations to export
-        conversations = st.session_state.app_state.get_conversations()
+            st.markdown("---")
 
-        if conversations:
-            export_all = st.checkbox("Export all conversations", value=True)
+            # Daily cost trend
+            if cost_stats["daily"] and any(d["cost"] > 0 for d in cost_stats["daily"]):
+                st.markdown("#### Daily Cost Trend")
+                chart_data = pd.DataFrame(cost_stats["daily"])
+                chart_data["date"] = pd.to_datetime(chart_data["date"])
+                st.line_chart(chart_data.set_index("date")["cost"])
 
-            selected_convs = []
-            if not export_all:
-                conv_options = []
-                for conv in conversations:
-                    created = conv.get("created_at", "")
-                    try:
-                        created_dt = datetime.fromisoformat(created)
-                        created_str = created_dt.strftime("%b %d, %H:%M")
-                    except:
-                        created_str = "Unknown"
-                    msg_count = len(conv.get("messages", []))
-                    conv_options.append(f"{created_str} ({msg_count} messages)")
-
-                selected_indices = st.multiselect(
-                    "Select conversations",
-                    options=range(len(conversations)),
-                    format_func=lambda i: conv_options[i],
-                    help="Choose which conversations to export"
-                )
-                selected_convs = [conversations[i] for i in selected_indices]
+                # Cost by model
+                if cost_stats["by_model"]:
+                    st.markdown("#### Cost by Model")
+                    model_data = pd.DataFrame([
+                        {"Model": k.split("-")[-1] if "-" in k else k, "Cost": v}
+                        for k, v in cost_stats["by_model"].items()
+                    ])
+                    if not model_data.empty:
+                        st.bar_chart(model_data.set_index("Model"))
             else:
-                selected_convs = conversations
-
-            # Format selection
-            export_format = st.selectbox(
-                "Format",
-                options=["JSON", "Markdown", "HTML", "TXT"],
-                help="Choose export format"
-            )
+                st.info("No cost data yet. Make API calls to see cost analytics.")
 
-            # Options
-            include_metadata = st.checkbox("Include metadata", value=True, help="Include tags, favorites, etc.")
-            include_stats = st.checkbox("Include statistics", value=True, help="Include message counts, token estimates")
+        # ===== CACHE TAB =====
+        with tab3:
+            cache_stats = analytics.get_cache_stats(days)
 
-            col1, col2 = st.columns(2)
+            # Summary metrics
+            col1, col2, col3 = st.columns(3)
             with col1:
-                if st.button("Cancel", use_container_width=True):
-                    st.session_state.show_export_dialog = False
-                    st.session_state.export_ready = False
-                    st.rerun()
+                st.metric("Hit Rate", f"{cache_stats['overall_hit_rate']*100:.1f}%")
             with col2:
-                export = st.button("Export", type="primary", use_container_width=True)
+                st.metric("Total Hits", cache_stats["total_hits"])
+            with col3:
+                st.metric("Total Savings", f"${cache_stats['total_savings']:.4f}")
 
-            if export and selected_convs:
-                from core.export_engine import ExportEngine
+            st.markdown("---")
 
-                engine = ExportEngine()
-                format_lower = export_format.lower()
+            # Hit rate trend
+            if cache_stats["daily"] and any(d["hit_rate"] > 0 for d in cache_stats["daily"]):
+                st.markdown("#### Cache Hit Rate Trend")
+                chart_data = pd.DataFrame(cache_stats["daily"])
+                chart_data["date"] = pd.to_datetime(chart_data["date"])
+                chart_data["hit_rate_pct"] = chart_data["hit_rate"] * 100
+                st.line_chart(chart_data.set_index("date")["hit_rate_pct"])
+            else:
+                st.info("No cache data yet. Enable caching to see performance analytics.")
 
-                try:
-                    if len(selected_convs) == 1:
-                        # Export single conversation
-                        options = {
-                            "include_metadata": include_metadata,
-                            "include_stats": include_stats
-                        }
-                        exported_data = engine.export_conversation(
-                            selected_convs[0],
-                            format_lower,
-                            options
-                        )
-                        filename = f"conversation.{format_lower}"
-                    else:
-                        # Export multiple (combined)
-                        options = {
-                            "include_metadata": include_metadata,
-                            "include_stats": include_stats
-                        }
-                        exported_data = engine.export_multiple(
-                            selected_convs,
-                            format_lower,
-                            combine=True,
-                            options=options
-                        )
-                        filename = f"conversations_{len(selected_convs)}.{format_lower}"
-
-                    # Store in session state
-                    mime_type = engine.get_mime_type(format_lower)
-                    st.session_state.export_ready = True
-                    st.session_state.export_data = exported_data
-                    st.session_state.export_filename = filename
-                    st.session_state.export_mime = mime_type
-                    st.session_state.export_count = len(selected_convs)
-                    st.rerun()
+        st.markdown("---")
 
-                except Exception as e:
-                    st.error(f"❌ Export failed: {e}")
-                    logger.error(f"Export error: {e}", exc_info=True)
+        # Overall summary
+        summary = analytics.get_summary()
+        if summary["first_record"]:
+            st.caption(f"📅 Tracking since {summary['first_record']} | {summary['days_tracked']} days with activity | {summary['total_api_calls']} API calls")
 
-            # Show download button if export is ready
-            if st.session_state.get("export_ready", False):
-                st.success(f"✅ Exported {st.session_state.get('export_count', 0)} conversation(s)")
-                st.download_button(
-                    label=f"⬇️ Download {st.session_state.export_filename}",
-                    data=st.session_state.export_data,
-                    file_name=st.session_state.export_filename,
-                    mime=st.session_state.export_mime,
-                    use_container_width=True
-                )
+    # ========== PHASE 2A: Preset Manager Dialog ==========
+    if st.session_state.get("show_preset_manager", False):
+        render_preset_manager()
 
-                if st.button("Close", use_container_width=True):
-                    st.session_state.show_export_dialog = False
-                    st.session_state.export_ready = False
-                    st.rerun()
+    # ========== END PHASE 2A ==========
 
-        else:
-            st.info("No conversations to export")
-            if st.button("Close", use_container_width=True):
-                st.session_state.show_export_dialog = False
-                st.rerun()
+    # Agent UI Dialogs (Phase 10)
+    # Spawn Agent Dialog
+    if st.session_state.get("show_spawn_agent", False):
+        render_spawn_agent_dialog()
 
-        st.markdown("---")
+    # Agent Result Viewer
+    if st.session_state.get("view_agent_result"):
+        render_agent_result_dialog()
+
+    # Socratic Council UI
+    if st.session_state.get("show_council", False):
+        render_council_dialog()
+
+    # Export/Import/Config Dialogs (Phase 12)
+    # Export Dialog
+    if st.session_state.get("show_export_dialog", False):
+        render_export_dialog()
 
     # Import Dialog
     if st.session_state.get("show_import_dialog", False):
@@ -4764,6 +5396,7 @@ Votes:
                         # Multiple conversations in one file
                         conversations = imported_conv["conversations"]
                         imported_count = 0
+                        duplicate_count = 0
                         total_messages = 0
 
                         for conv in conversations:
@@ -4776,25 +5409,33 @@ Votes:
                                     continue
 
                             # Save to app state
-                            st.session_state.app_state.save_conversation(
+                            _, created = st.session_state.app_state.save_new_conversation(
                                 conv["messages"],
                                 conv.get("metadata", {})
                             )
+                            if not created:
+                                duplicate_count += 1
+                                continue
                             imported_count += 1
                             total_messages += len(conv.get("messages", []))
 
                         st.success(f"✅ Imported {imported_count} conversation(s) from file")
+                        if duplicate_count:
+                            st.info(f"⏭️ Skipped {duplicate_count} conversation(s) already saved")
                         st.info(f"📊 Total: {total_messages} messages")
 
                     else:
                         # Single conversation
-                        st.session_state.app_state.save_conversation(
+                        _, created = st.session_state.app_state.save_new_conversation(
                             imported_conv["messages"],
                             imported_conv.get("metadata", {})
                         )
 
-                        st.success(f"✅ Imported conversation: {imported_conv.get('title', 'Untitled')}")
-                        st.info(f"📊 {len(imported_conv.get('messages', []))} messages imported")
+                        if created:
+                            st.success(f"✅ Imported conversation: {imported_conv.get('title', 'Untitled')}")
+                            st.info(f"📊 {len(imported_conv.get('messages', []))} messages imported")
+                        else:
+                            st.info(f"⏭️ Conversation already saved: {imported_conv.get('title', 'Untitled')}")
 
                     # Close dialog after successful import
                     if st.form_submit_button("Close", use_container_width=True):
@@ -4843,7 +5484,7 @@ Votes:
                         st.success(f"✅ Deleted {result['to_delete']} orphaned entries!")
                         st.session_state.cleanup_preview = None
                         st.session_state.show_cleanup_dialog = False
-                        st.session_state.conv_display_count = st.session_state.conv_page_size  # Reset pagination
+                        st.session_state.conv_page = 0  # Reset pagination
                         st.rerun()
                 with col2:
                     if st.button("❌ Cancel", use_container_width=True):
@@ -5369,7 +6010,6 @@ Votes:
                     result = st.session_state.app_state.export_knowledge(format="json", category=category_arg)
 
                     if result.get("success"):
-                        import json
                         json_data = json.dumps(result["data"], indent=2)
 
                         st.download_button(
@@ -5402,7 +6042,6 @@ Votes:
                 if uploaded_file is not None:
                     if st.button("Import", key="kb_import_btn", type="primary"):
                         try:
-                            import json
                             data = json.load(uploaded_file)
 
                             result = st.session_state.app_state.import_knowledge(
@@ -5448,7 +6087,7 @@ Votes:
         with tab1:
             st.markdown("#### Cache Performance Overview")
 
-            cache_stats = st.session_state.client.cache_tracker.get_cache_stats()
+            cache_stats = get_client().cache_tracker.get_cache_stats()
 
             # Key metrics (4 columns)
             col1, col2, col3, col4 = st.columns(4)
@@ -5582,9 +6221,8 @@ Votes:
                         if st.button(f"Switch to {info['name']}", key=f"switch_{strategy_key}", use_container_width=True):
                             st.session_state.cache_strategy = strategy_key
 
-                            from core.cache_manager import CacheStrategy
                             strategy_enum = CacheStrategy[strategy_key.upper()]
-                            st.session_state.client.set_cache_strategy(strategy_enum)
+                            get_client().set_cache_strategy(strategy_enum)
 
                             st.success(f"✅ Switched to {info['name']}")
                             st.rerun()
@@ -5607,7 +6245,7 @@ Votes:
             if st.session_state.cache_strategy == "disabled":
                 st.warning("⚠️ Caching is currently disabled. Enable a strategy to see cache monitoring.")
             else:
-                cache_status = st.session_state.client.get_cache_status()
+                cache_status = get_client().get_cache_status()
 
                 # Current cache state
                 st.markdown("**Current Cache State:**")
@@ -5658,7 +6296,7 @@ Votes:
             st.caption("Reset cache statistics without affecting cached content")
 
             if st.button("🗑️ Clear Stats", use_container_width=True, key="clear_cache_stats"):
-                st.session_state.client.cache_tracker.reset_stats()
+                get_client().cache_tracker.reset_stats()
                 st.success("✅ Cache statistics cleared")
                 st.rerun()
 
@@ -5669,17 +6307,14 @@ Votes:
             st.caption("Download cache statistics as JSON")
 
             if st.button("📤 Export Stats", key="export_cache_stats"):
-                import json
-                from datetime import datetime
-
-                stats = st.session_state.client.cache_tracker.get_cache_stats()
+                stats = get_client().cache_tracker.get_cache_stats()
                 export_data = {
                     "exported_at": datetime.now().isoformat(),
                     "strategy": st.session_state.cache_strategy,
                     "statistics": stats
                 }
 
-                json_data = json.dumps(export_data, indent=2)
+                json_data = dump_json_bytes(export_data)
 
                 st.download_button(
                     label="⬇️ Download cache_stats.json",
@@ -5697,7 +6332,7 @@ Votes:
             st.warning("⚠️ This will cause one expensive request to rebuild cache")
 
             if st.button("♻️ Force Refresh", use_container_width=True, key="force_cache_refresh"):
-                st.session_state.client.cache_manager.invalidate_cache()
+                get_client().cache_manager.invalidate_cache()
                 st.success("✅ Cache invalidated - will rebuild on next request")
                 st.rerun()
 
@@ -5711,9 +6346,8 @@ Votes:
             if st.button("🔄 Reset All", type="primary", use_container_width=True, key="reset_cache_all"):
                 st.session_state.cache_strategy = "disabled"
 
-                from core.cache_manager import CacheStrategy
-                st.session_state.client.set_cache_strategy(CacheStrategy.DISABLED)
-                st.session_state.client.cache_tracker.reset_stats()
+                get_client().set_cache_strategy(CacheStrategy.DISABLED)
+                get_client().cache_tracker.reset_stats()
 
                 st.success("✅ Cache system reset to defaults")
                 st.rerun()
@@ -5726,8 +6360,16 @@ Votes:
 
         st.markdown("---")
 
-    # Display chat history
-    for message in st.session_state.messages:
+    # Display chat history - older messages (and their images) are only
+    # emitted when the user opens them
+    messages = st.session_state.messages
+    hidden_count = len(messages) - CHAT_HISTORY_WINDOW
+    if hidden_count > 0:
+        if lazy_section_open(f"Earlier messages ({hidden_count})", "show_earlier_messages"):
+            for message in messages[:hidden_count]:
+                render_message(message)
+        messages = messages[hidden_count:]
+    for message in messages:
         render_message(message)
 
     # Image upload section
@@ -16,12 +16,13 @@ Tools:
 - memory_search: Search memory by keyword
 """
 
-import json
 import logging
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
+from core.json_files import read_json_file, write_json_file
+
 logger = logging.getLogger(__name__)
 
 # Memory storage file
@@ -50,17 +51,15 @@ class SimpleMemory:
     def _load_data(self) -> Dict[str, Any]:
         """Load memory data from file"""
         try:
-            with open(self.storage_file, "r") as f:
-                return json.load(f)
+            return read_json_file(self.storage_file)
         except Exception as e:
             logger.error(f"Error loading memory: {e}")
             return {}
 
     def _save_data(self, data: Dict[str, Any]):
-        """Save memory data to file"""
+        """Save memory data to file (atomic: unique temp file + os.replace)"""
         try:
-            with open(self.storage_file, "w") as f:
-                json.dump(data, f, indent=2)
+            write_json_file(self.storage_file, data)
         except Exception as e:
             logger.error(f"Error saving memory: {e}")
 